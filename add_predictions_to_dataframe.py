@@ -1,21 +1,26 @@
 import pandas as pd
 import numpy as np
 import pickle
-from sklearn.preprocessing import LabelEncoder
+from data_loader import load_csv, SUPPLEMENTARY_MODEL_COLUMNS
+from instrumentation import timed, stage, add_rows
+from prediction_cache import PredictionCache, model_artifact_hash, predict_with_cache
 import warnings
 warnings.filterwarnings('ignore')
 
+TARGET_MODEL_FILE = 'models/target_prediction_model.pkl'
+CATCH_MODEL_FILE = 'models/catch_probability_model.pkl'
+
 def load_models():
     """Load the trained models."""
     print("Loading trained models...")
     
-    with open('models/target_prediction_model.pkl', 'rb') as f:
+    with open(TARGET_MODEL_FILE, 'rb') as f:
         target_model_data = pickle.load(f)
         target_model = target_model_data['model']
         target_feature_names = target_model_data['feature_names']
         target_label_encoders = target_model_data['label_encoders']
     
-    with open('models/catch_probability_model.pkl', 'rb') as f:
+    with open(CATCH_MODEL_FILE, 'rb') as f:
         catch_model_data = pickle.load(f)
         catch_model = catch_model_data['model']
         catch_feature_names = catch_model_data['feature_names']
@@ -96,8 +101,10 @@ def engineer_features(df):
     
     return df_receivers
 
-def prepare_features_for_prediction(df, feature_names, label_encoders):
-    """Prepare features in the same way as training."""
+def encode_features(df, feature_names, label_encoders):
+    """Encode categorical features and select the model's features (NaNs left in place)."""
+    from sklearn.preprocessing import LabelEncoder
+
     # Categorical features to encode
     categorical_cols = ['player_position', 'team_coverage_type', 'offense_formation', 'play_direction']
     
@@ -126,25 +133,50 @@ def prepare_features_for_prediction(df, feature_names, label_encoders):
     available_features = [col for col in feature_names if col in df_encoded.columns]
     
     # Create feature matrix
-    X = df_encoded[available_features].copy()
+    return df_encoded[available_features].copy()
+
+def feature_fill_values(X):
+    """NaN fill value of each feature: the column median for numeric columns, else 0."""
+    return {
+        col: X[col].median() if X[col].dtype in [np.float64, np.int64] else 0
+        for col in X.columns
+    }
+
+def prepare_features_for_prediction(df, feature_names, label_encoders, fill_values=None):
+    """
+    Prepare features in the same way as training.
+
+    Args:
+        df: Receiver rows with engineered features
+        feature_names: The model's features, in training order
+        label_encoders: The model's categorical encoders
+        fill_values: Optional feature -> NaN fill value fixed for the run (e.g. from a
+            streaming warm-up pass); by default NaNs get the medians of df itself
+    """
+    X = encode_features(df, feature_names, label_encoders)
     
     # Fill remaining NaN values with median
+    fills = feature_fill_values(X)
+    if fill_values is not None:
+        fills.update(fill_values)
     for col in X.columns:
-        if X[col].dtype in [np.float64, np.int64]:
-            X[col] = X[col].fillna(X[col].median())
-        else:
-            X[col] = X[col].fillna(0)
+        X[col] = X[col].fillna(fills[col])
     
     # Ensure feature order matches training
     X = X[feature_names]
     
     return X
 
+@timed('predict')
 def add_predictions_to_dataframe(separation_file='train/input_with_separation.csv',
                                  supplementary_file='supplementary_data.csv',
-                                 output_file='train/input_with_separation.csv'):
+                                 output_file='train/input_with_separation.csv',
+                                 use_cache=True):
     """
     Load data, apply models, and add predictions to dataframe.
+
+    With use_cache, scores are reused from the prediction cache for plays whose model
+    inputs are unchanged under the same model files; only the other plays are scored.
     """
     print("="*60)
     print("Adding Model Predictions to Dataframe")
@@ -156,47 +188,55 @@ def add_predictions_to_dataframe(separation_file='train/input_with_separation.cs
     
     # Load data
     print("\nLoading data...")
-    print("  Loading separation features data...")
-    df = pd.read_csv(separation_file, low_memory=False)
-    
-    print("  Loading supplementary data...")
-    supp_df = pd.read_csv(supplementary_file, low_memory=False)
-    
-    print("  Merging data...")
-    df = df.merge(
-        supp_df[['game_id', 'play_id', 'pass_result', 'team_coverage_type', 
-                 'offense_formation', 'down', 'yards_to_go', 'yardline_number']],
-        on=['game_id', 'play_id'],
-        how='left'
-    )
+    with stage('load'):
+        print("  Loading separation features data...")
+        df = pd.read_csv(separation_file, low_memory=False)
+        
+        print("  Loading supplementary data...")
+        supp_df = load_csv(supplementary_file, columns=SUPPLEMENTARY_MODEL_COLUMNS)
+        
+        print("  Merging data...")
+        df = df.merge(
+            supp_df,
+            on=['game_id', 'play_id'],
+            how='left'
+        )
+        add_rows(len(df))
     
     print(f"  Total rows: {len(df):,}")
     
     # Engineer features for receivers
-    df_receivers = engineer_features(df)
-    
-    # Prepare features for target prediction (real-time only)
-    print("\nPreparing features for target prediction...")
-    X_target = prepare_features_for_prediction(df_receivers, target_feature_names, target_label_encoders)
-    
-    # Predict target probabilities
-    print("  Predicting target probabilities...")
-    target_probs = target_model.predict_proba(X_target)[:, 1]
+    with stage('features', rows=len(df)):
+        df_receivers = engineer_features(df)
+    
+    # Prepare features for target prediction (real-time only) and catch prediction
+    # (includes future features)
+    print("\nPreparing features for target and catch prediction...")
+    with stage('prepare', rows=len(df_receivers)):
+        X_target = prepare_features_for_prediction(df_receivers, target_feature_names, target_label_encoders)
+        X_catch = prepare_features_for_prediction(df_receivers, catch_feature_names, catch_label_encoders)
+    
+    cache = None
+    if use_cache:
+        cache = PredictionCache(model_artifact_hash([TARGET_MODEL_FILE, CATCH_MODEL_FILE]))
+    
+    print("  Predicting target and catch probabilities...")
+    with stage('predict', rows=len(df_receivers)):
+        scores, hits, misses = predict_with_cache(
+            cache, df_receivers[['game_id', 'play_id']],
+            {'target': (target_model, X_target), 'catch': (catch_model, X_catch)}
+        )
+    if cache is not None:
+        cache.save()
+        print(f"  Prediction cache: {hits:,} plays reused, {misses:,} plays scored")
+    target_probs = scores['target']
+    catch_probs = scores['catch']
     df_receivers['target_probability'] = target_probs
+    df_receivers['catch_probability'] = catch_probs
     
     print(f"  Target probabilities added for {len(df_receivers):,} receiver rows")
     print(f"  Mean target probability: {target_probs.mean():.4f}")
     print(f"  Max target probability: {target_probs.max():.4f}")
-    
-    # Prepare features for catch prediction (includes future features)
-    print("\nPreparing features for catch probability...")
-    X_catch = prepare_features_for_prediction(df_receivers, catch_feature_names, catch_label_encoders)
-    
-    # Predict catch probabilities
-    print("  Predicting catch probabilities...")
-    catch_probs = catch_model.predict_proba(X_catch)[:, 1]
-    df_receivers['catch_probability'] = catch_probs
-    
     print(f"  Catch probabilities added for {len(df_receivers):,} receiver rows")
     print(f"  Mean catch probability: {catch_probs.mean():.4f}")
     print(f"  Max catch probability: {catch_probs.max():.4f}")
@@ -247,7 +287,8 @@ def add_predictions_to_dataframe(separation_file='train/input_with_separation.cs
     
     # Save to CSV (overwrite the input file or save to new file)
     print(f"\nSaving dataframe with predictions to {output_file}...")
-    df.to_csv(output_file, index=False)
+    with stage('save', rows=len(df)):
+        df.to_csv(output_file, index=False)
     
     print("\n" + "="*60)
     print("Summary Statistics")
@@ -0,0 +1,260 @@
+import pandas as pd
+import json
+from data_loader import load_csv
+from dataset import TrackingDataset
+from instrumentation import timed, stage, add_rows
+
+# When did the best option open up? Compares each play's throw against the
+# per-frame expected yards of every receiver leading up to it.
+
+FRAMES_PER_SECOND = 10
+TIME_PER_FRAME = 1.0 / FRAMES_PER_SECOND
+
+PLAY_KEYS = ['game_id', 'play_id']
+
+# Tracking with predictions per week, as written by the pipeline's predictions stage
+PREDICTIONS_FILE_PATTERN = 'pipeline_data/input_with_predictions_{season}_w{week:02d}.csv'
+
+def compute_decision_timeline(df):
+    """
+    Compute per-play decision timing from per-frame expected yards.
+    Fully vectorized: every step is a sort/drop_duplicates or merge over the whole table.
+
+    Args:
+        df: Tracking DataFrame with predictions (expected_yards) for all plays
+
+    Returns:
+        Tuple of (plays_df, receiver_peaks_df)
+        plays_df has one row per play with throw_frame, the eventual optimal receiver,
+        the frame it first became optimal, the overall peak option and the time lost.
+        receiver_peaks_df has one row per receiver per play with its peak frame.
+    """
+    receiver_positions = ['WR', 'TE', 'RB']
+    receivers = df.loc[
+        (df['player_side'] == 'Offense') &
+        (df['player_position'].isin(receiver_positions)),
+        PLAY_KEYS + ['nfl_id', 'frame_id', 'expected_yards', 'player_role']
+    ]
+
+    # throw_frame is the last input frame of the play
+    throw_frames = df.groupby(PLAY_KEYS, sort=False)['frame_id'].max().rename('throw_frame').reset_index()
+
+    qb_info = (
+        df.loc[df['player_role'] == 'Passer', PLAY_KEYS + ['player_name']]
+        .drop_duplicates(PLAY_KEYS)
+        .rename(columns={'player_name': 'qb_name'})
+    )
+
+    # Frame at which each receiver's expected yards peaked (first frame on ties)
+    receiver_peaks = (
+        receivers.sort_values(PLAY_KEYS + ['nfl_id', 'expected_yards', 'frame_id'],
+                              ascending=[True, True, True, False, True])
+        .drop_duplicates(PLAY_KEYS + ['nfl_id'])
+        [PLAY_KEYS + ['nfl_id', 'frame_id', 'expected_yards']]
+        .rename(columns={'frame_id': 'peak_frame', 'expected_yards': 'peak_expected_yards'})
+        .reset_index(drop=True)
+    )
+
+    # Best receiver at every frame
+    frame_best = (
+        receivers.sort_values(PLAY_KEYS + ['frame_id', 'expected_yards'],
+                              ascending=[True, True, True, False])
+        .drop_duplicates(PLAY_KEYS + ['frame_id'])
+        [PLAY_KEYS + ['frame_id', 'nfl_id', 'expected_yards']]
+    )
+
+    # Eventual optimal receiver = best receiver at the throw frame
+    plays = throw_frames.merge(
+        frame_best.rename(columns={'frame_id': 'throw_frame', 'nfl_id': 'optimal_nfl_id',
+                                   'expected_yards': 'optimal_expected_yards'}),
+        on=PLAY_KEYS + ['throw_frame'], how='inner'
+    )
+
+    # First frame at which the eventual optimal receiver was the best option
+    first_optimal = (
+        frame_best.merge(plays[PLAY_KEYS + ['optimal_nfl_id']], on=PLAY_KEYS)
+        .query('nfl_id == optimal_nfl_id')
+        .groupby(PLAY_KEYS, sort=False)['frame_id'].min()
+        .rename('first_optimal_frame')
+        .reset_index()
+    )
+    plays = plays.merge(first_optimal, on=PLAY_KEYS, how='left')
+
+    # Best option at any frame of the play (the best window overall)
+    best_window = (
+        frame_best.sort_values(PLAY_KEYS + ['expected_yards', 'frame_id'],
+                               ascending=[True, True, False, True])
+        .drop_duplicates(PLAY_KEYS)
+        .rename(columns={'frame_id': 'best_window_frame', 'nfl_id': 'best_window_nfl_id',
+                         'expected_yards': 'best_window_expected_yards'})
+    )
+    plays = plays.merge(best_window, on=PLAY_KEYS, how='left')
+
+    # Actual target at the throw frame
+    actual = (
+        receivers.loc[receivers['player_role'] == 'Targeted Receiver',
+                      PLAY_KEYS + ['frame_id', 'nfl_id', 'expected_yards']]
+        .rename(columns={'frame_id': 'throw_frame', 'nfl_id': 'actual_nfl_id',
+                         'expected_yards': 'actual_expected_yards'})
+    )
+    plays = plays.merge(actual, on=PLAY_KEYS + ['throw_frame'], how='left')
+    plays = plays.merge(qb_info, on=PLAY_KEYS, how='left')
+
+    plays['frames_lost'] = plays['throw_frame'] - plays['first_optimal_frame']
+    plays['time_lost'] = plays['frames_lost'] * TIME_PER_FRAME
+    plays['held_past_best_window'] = plays['best_window_frame'] < plays['throw_frame']
+    plays['expected_yards_lost'] = plays['best_window_expected_yards'] - plays['actual_expected_yards']
+
+    return plays, receiver_peaks
+
+@timed('decision_timeline')
+def analyze_decision_timeline(input_file='train/input_2023_w01.csv',
+                              output_file='decision_timeline_2023_w01.json',
+                              per_play_file='decision_timeline_per_play_2023_w01.json',
+                              weeks=None, seasons=None):
+    """
+    Analyze when the best option opened up relative to when each QB threw,
+    aggregated per QB across all the given files.
+
+    Args:
+        input_file: Tracking CSV with predictions, or a list of them (ignored when
+            weeks or seasons is given)
+        output_file: Path to save the per-QB analysis JSON
+        per_play_file: Path to save the per-play timelines JSON
+        weeks: Optional week numbers; the matching partitions of the dataset are
+            analyzed from their PREDICTIONS_FILE_PATTERN files
+        seasons: Optional seasons (all weeks of them unless weeks is also given)
+    """
+    if weeks is not None or seasons is not None:
+        partitions = TrackingDataset().partitions(seasons=seasons, weeks=weeks)
+        input_files = [
+            PREDICTIONS_FILE_PATTERN.format(season=p['season'], week=p['week']) for p in partitions
+        ]
+        label = ', '.join(f"{p['season']} Week {p['week']}" for p in partitions)
+    else:
+        input_files = [input_file] if isinstance(input_file, str) else list(input_file)
+        label = ', '.join(input_files)
+
+    print("="*60)
+    print(f"QB Decision Timeline Analysis - {label}")
+    print("="*60)
+
+    # Timelines are computed file by file (plays never span files), so only one
+    # file's frames are in memory at a time; the per-QB statistics use all of them
+    usecols = PLAY_KEYS + ['nfl_id', 'frame_id', 'player_name', 'player_side',
+                           'player_position', 'player_role', 'expected_yards']
+    all_plays = []
+    all_peaks = []
+    for path in input_files:
+        print(f"\nLoading {path}...")
+        with stage('load'):
+            df = load_csv(path, columns=usecols)
+            add_rows(len(df))
+        print(f"  Total rows: {len(df):,}")
+
+        print("  Computing per-frame decision timeline...")
+        with stage('timeline', rows=len(df)):
+            file_plays, file_peaks = compute_decision_timeline(df)
+        all_plays.append(file_plays)
+        all_peaks.append(file_peaks)
+        del df
+
+    plays = pd.concat(all_plays, ignore_index=True)
+    receiver_peaks = pd.concat(all_peaks, ignore_index=True)
+    print(f"\n  Plays analyzed: {len(plays):,}")
+    print(f"  Receiver peaks: {len(receiver_peaks):,}")
+
+    held = plays['held_past_best_window']
+    print(f"\nOverall Statistics:")
+    print(f"  Average time lost after optimal receiver opened: {plays['time_lost'].mean():.2f}s")
+    print(f"  Plays thrown after the best window: {held.sum():,} ({held.mean() * 100:.1f}%)")
+
+    # Per-QB aggregation in one groupby
+    print("\nCalculating QB statistics...")
+    qb_stats = plays.groupby('qb_name').agg(
+        total_plays=('play_id', 'count'),
+        avg_time_lost=('time_lost', 'mean'),
+        max_time_lost=('time_lost', 'max'),
+        held_past_best_window=('held_past_best_window', 'sum'),
+        avg_expected_yards_lost=('expected_yards_lost', 'mean')
+    ).reset_index()
+    qb_stats['held_past_best_window_percentage'] = (
+        qb_stats['held_past_best_window'] / qb_stats['total_plays'] * 100
+    ).round(2)
+    qb_stats = qb_stats.sort_values('avg_time_lost').reset_index(drop=True)
+
+    # Filter QBs with at least 5 plays
+    qb_stats_filtered = qb_stats[qb_stats['total_plays'] >= 5]
+    print(f"  Found {len(qb_stats_filtered)} QBs with 5+ plays")
+
+    output_data = {
+        'total_plays': int(len(plays)),
+        'overall_avg_time_lost': round(float(plays['time_lost'].mean()), 2),
+        'held_past_best_window_plays': int(held.sum()),
+        'frames_per_second': FRAMES_PER_SECOND,
+        'time_per_frame': TIME_PER_FRAME,
+        'quarterbacks': [
+            {
+                'name': row.qb_name,
+                'total_plays': int(row.total_plays),
+                'avg_time_lost': round(float(row.avg_time_lost), 2),
+                'max_time_lost': round(float(row.max_time_lost), 2),
+                'held_past_best_window': int(row.held_past_best_window),
+                'held_past_best_window_percentage': float(row.held_past_best_window_percentage),
+                'avg_expected_yards_lost': round(float(row.avg_expected_yards_lost), 2)
+                if pd.notna(row.avg_expected_yards_lost) else None
+            }
+            for row in qb_stats_filtered.itertuples(index=False)
+        ]
+    }
+    if weeks is not None or seasons is not None:
+        output_data['weeks'] = sorted({p['week'] for p in partitions})
+        output_data['seasons'] = sorted({p['season'] for p in partitions})
+
+    print(f"\nSaving results to {output_file}...")
+    with open(output_file, 'w') as f:
+        json.dump(output_data, f, indent=2)
+
+    # Per-play timelines with each receiver's peak frame
+    peaks_by_play = {
+        key: [
+            {'nfl_id': int(nfl_id), 'peak_frame': int(frame), 'peak_expected_yards': round(float(ey), 3)}
+            for nfl_id, frame, ey in zip(group['nfl_id'], group['peak_frame'], group['peak_expected_yards'])
+        ]
+        for key, group in receiver_peaks.groupby(PLAY_KEYS, sort=False)
+    }
+
+    def optional_int(value):
+        return int(value) if pd.notna(value) else None
+
+    per_play_data = {
+        'plays': [
+            {
+                'game_id': int(row.game_id),
+                'play_id': int(row.play_id),
+                'qb_name': row.qb_name if pd.notna(row.qb_name) else None,
+                'throw_frame': int(row.throw_frame),
+                'optimal_nfl_id': int(row.optimal_nfl_id),
+                'first_optimal_frame': optional_int(row.first_optimal_frame),
+                'time_lost': round(float(row.time_lost), 2) if pd.notna(row.time_lost) else None,
+                'best_window_frame': int(row.best_window_frame),
+                'best_window_nfl_id': int(row.best_window_nfl_id),
+                'actual_nfl_id': optional_int(row.actual_nfl_id),
+                'receivers': peaks_by_play.get((row.game_id, row.play_id), [])
+            }
+            for row in plays.itertuples(index=False)
+        ]
+    }
+
+    print(f"Saving per-play timelines to {per_play_file}...")
+    with open(per_play_file, 'w') as f:
+        json.dump(per_play_data, f, indent=2)
+
+    print("\n" + "="*60)
+    print("Analysis Complete!")
+    print("="*60)
+
+    return output_data
+
+if __name__ == '__main__':
+    analyze_decision_timeline()
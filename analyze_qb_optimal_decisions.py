@@ -1,14 +1,116 @@
 import pandas as pd
 import numpy as np
 import json
+from data_loader import load_csv
+from instrumentation import timed, stage, add_rows, progress
 
-#try to beat the qb's optimal decision percentage + time in the interactive gamemode. 
+#try to beat the qb's optimal decision percentage + time in the interactive gamemode.
 
-def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv', 
-                                output_file='qb_optimal_decisions_2023_w01.json'):
+def bootstrap_optimal_rates(results_df, n_resamples=2000, confidence_level=0.95,
+                            random_state=42, chunk_size=250):
+    """
+    Bootstrap confidence intervals for every QB's optimal decision rate at once.
+
+    Plays are resampled with replacement within each QB. All QBs are handled in
+    a single batched draw: plays are sorted by QB so each QB owns a contiguous
+    block, a random offset inside each block is drawn for every resampled play,
+    and per-QB sums come from np.add.reduceat along the play axis.
+
+    Args:
+        results_df: Per-play DataFrame with 'qb_name' and 'is_optimal' columns
+        n_resamples: Number of bootstrap resamples
+        confidence_level: Width of the percentile interval
+        random_state: Seed for the random generator
+        chunk_size: Resamples drawn per batch (bounds peak memory)
+
+    Returns:
+        DataFrame indexed by qb_name with ci_low, ci_high and bootstrap_std
+        (all as fractions, not percentages)
+    """
+    ordered = results_df.sort_values('qb_name', kind='stable')
+    qb_names, starts, counts = np.unique(
+        ordered['qb_name'].values, return_index=True, return_counts=True
+    )
+    outcomes = ordered['is_optimal'].values.astype(np.float64)
+
+    # Each resampled play i draws from its own QB's block [start, start + count)
+    play_starts = np.repeat(starts, counts)
+    play_counts = np.repeat(counts, counts)
+
+    rng = np.random.default_rng(random_state)
+    rates = np.empty((n_resamples, len(qb_names)))
+    for chunk_start in range(0, n_resamples, chunk_size):
+        n_chunk = min(chunk_size, n_resamples - chunk_start)
+        offsets = (rng.random((n_chunk, len(outcomes))) * play_counts).astype(np.int64)
+        sampled = outcomes[play_starts + offsets]
+        rates[chunk_start:chunk_start + n_chunk] = np.add.reduceat(sampled, starts, axis=1) / counts
+
+    alpha = (1.0 - confidence_level) / 2.0
+    ci_low, ci_high = np.quantile(rates, [alpha, 1.0 - alpha], axis=0)
+
+    return pd.DataFrame({
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'bootstrap_std': rates.std(axis=0)
+    }, index=pd.Index(qb_names, name='qb_name'))
+
+# Upper bound on the fitted prior strength (in attempts), i.e. a floor on the skill variance
+MAX_PRIOR_STRENGTH = 500
+
+def shrink_optimal_rates(optimal_decisions, total_attempts):
+    """
+    Empirical-Bayes (beta-binomial) shrinkage of per-QB optimal decision rates.
+
+    The prior mean is the pooled rate and the prior strength is fitted by method
+    of moments: whatever spread between QBs is left after removing binomial noise
+    is treated as real skill. QBs with few attempts are pulled toward the league rate.
+    The prior strength is capped at MAX_PRIOR_STRENGTH attempts so the shrunk rates
+    keep the data's ordering when the spread is all noise.
+
+    Args:
+        optimal_decisions: Array of optimal decision counts per QB
+        total_attempts: Array of attempt counts per QB
+
+    Returns:
+        Tuple of (shrunk_rates, prior_mean, prior_strength)
+    """
+    optimal_decisions = np.asarray(optimal_decisions, dtype=np.float64)
+    total_attempts = np.asarray(total_attempts, dtype=np.float64)
+
+    prior_mean = optimal_decisions.sum() / total_attempts.sum()
+    raw_rates = optimal_decisions / total_attempts
+
+    # Every play optimal (or none): no variance to model, so nothing to shrink toward
+    if prior_mean * (1 - prior_mean) == 0:
+        return raw_rates, prior_mean, 0.0
+
+    # Between-QB variance, weighted by attempts, minus expected sampling noise
+    observed_var = np.average((raw_rates - prior_mean) ** 2, weights=total_attempts)
+    noise_var = prior_mean * (1 - prior_mean) * len(total_attempts) / total_attempts.sum()
+    skill_var = observed_var - noise_var
+
+    # Floor the skill variance so the prior strength stays finite. With no detectable
+    # spread beyond noise (common at week scale) every QB would otherwise shrink to
+    # exactly the league rate and the shrunk ranking would be one big tie; with the
+    # floor, rates are pulled hard toward the league rate but still ordered by the data.
+    min_skill_var = prior_mean * (1 - prior_mean) / (MAX_PRIOR_STRENGTH + 1)
+    skill_var = max(skill_var, min_skill_var)
+    prior_strength = max(prior_mean * (1 - prior_mean) / skill_var - 1, 0.0)
+    shrunk_rates = (optimal_decisions + prior_strength * prior_mean) / (total_attempts + prior_strength)
+
+    return shrunk_rates, prior_mean, prior_strength
+
+@timed('optimal_decisions')
+def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
+                                output_file='qb_optimal_decisions_2023_w01.json',
+                                n_bootstrap=2000, confidence_level=0.95, random_state=42,
+                                per_play_file='qb_optimal_decisions_per_play_2023_w01.json'):
     """
     Analyze how often quarterbacks make the optimal decision (highest expected yards)
     compared to their actual target choice.
+
+    Rankings by raw optimal percentage are noisy at week scale, so each QB also gets
+    a bootstrap confidence interval and a shrinkage-adjusted rate and rank.
     """
     print("="*60)
     print("QB Optimal Decision Analysis - 2023 Week 1")
@@ -16,7 +118,12 @@ def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
     
     # Load data
     print("\nLoading data...")
-    df = pd.read_csv(input_file, low_memory=False)
+    with stage('load'):
+        df = load_csv(input_file, columns=[
+            'game_id', 'play_id', 'nfl_id', 'frame_id', 'player_name', 'player_side',
+            'player_position', 'player_role', 'expected_yards'
+        ])
+        add_rows(len(df))
     print(f"  Total rows: {len(df):,}")
     
     # Filter to receivers only (WR, TE, RB) and QBs
@@ -45,7 +152,7 @@ def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
     results = []
     
     print("\nAnalyzing plays...")
-    for idx, play in plays.iterrows():
+    for idx, play in progress(plays.iterrows(), total=len(plays)):
         game_id = play['game_id']
         play_id = play['play_id']
         
@@ -110,9 +217,6 @@ def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
             'optimal_expected_yards': optimal_receiver['expected_yards'],
             'actual_expected_yards': actual_target['expected_yards'].iloc[0] if len(actual_target) > 0 else None
         })
-        
-        if (idx + 1) % 100 == 0:
-            print(f"  Processed {idx + 1}/{len(plays)} plays...")
     
     print(f"\n  Total plays analyzed: {len(results):,}")
     
@@ -142,24 +246,56 @@ def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
     # Sort by optimal percentage (descending)
     qb_stats = qb_stats.sort_values('optimal_percentage', ascending=False).reset_index(drop=True)
     qb_stats['rank'] = qb_stats.index + 1
-    
+
+    # Bootstrap confidence intervals (all QBs in one batched resample)
+    print(f"\nBootstrapping {n_bootstrap} resamples ({confidence_level:.0%} intervals)...")
+    bootstrap_stats = bootstrap_optimal_rates(
+        results_df, n_resamples=n_bootstrap,
+        confidence_level=confidence_level, random_state=random_state
+    )
+    qb_stats = qb_stats.merge(bootstrap_stats, left_on='qb_name', right_index=True, how='left')
+
+    # Shrinkage-adjusted rates toward the league rate
+    shrunk_rates, prior_mean, prior_strength = shrink_optimal_rates(
+        qb_stats['optimal_decisions'].values, qb_stats['total_attempts'].values
+    )
+    qb_stats['shrunk_optimal_percentage'] = (shrunk_rates * 100).round(2)
+    qb_stats['shrunk_rate'] = shrunk_rates
+    print(f"  Prior mean: {prior_mean * 100:.2f}%, prior strength: {prior_strength:.1f} attempts")
+
     # Filter QBs with at least 5 attempts for meaningful statistics
     qb_stats_filtered = qb_stats[qb_stats['total_attempts'] >= 5].copy()
-    
+    # Rank on the unrounded rates so the 2-decimal percentages don't create ties
+    qb_stats_filtered['shrunk_rank'] = (
+        qb_stats_filtered['shrunk_rate']
+        .rank(method='min', ascending=False).astype(int)
+    )
+
     print(f"\nQB Statistics (min 5 attempts):")
     print(f"  QBs analyzed: {len(qb_stats_filtered)}")
     print(f"\nTop 5 QBs:")
     for idx, row in qb_stats_filtered.head(5).iterrows():
         print(f"  {row['rank']}. {row['qb_name']}: {row['optimal_percentage']:.2f}% ({row['optimal_decisions']}/{row['total_attempts']})")
-    
+
+    print(f"\nTop 5 QBs (shrinkage-adjusted):")
+    for idx, row in qb_stats_filtered.sort_values('shrunk_rank').head(5).iterrows():
+        print(f"  {row['shrunk_rank']}. {row['qb_name']}: {row['shrunk_optimal_percentage']:.2f}% "
+              f"[{row['ci_low'] * 100:.1f}%, {row['ci_high'] * 100:.1f}%]")
+
     # Prepare output JSON
     output_data = {
         'overall_optimal_percentage': round(overall_optimal_percentage, 2),
         'total_plays': int(total_plays),
         'optimal_plays': int(optimal_plays),
+        'bootstrap': {
+            'n_resamples': int(n_bootstrap),
+            'confidence_level': float(confidence_level),
+            'prior_mean_percentage': round(float(prior_mean) * 100, 2),
+            'prior_strength': float(prior_strength) if np.isfinite(prior_strength) else None
+        },
         'quarterbacks': []
     }
-    
+
     # Add all QBs (with min 5 attempts)
     for idx, row in qb_stats_filtered.iterrows():
         output_data['quarterbacks'].append({
@@ -167,7 +303,11 @@ def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
             'optimal_decisions': int(row['optimal_decisions']),
             'total_attempts': int(row['total_attempts']),
             'optimal_percentage': float(row['optimal_percentage']),
-            'rank': int(row['rank'])
+            'rank': int(row['rank']),
+            'optimal_percentage_ci_low': round(float(row['ci_low']) * 100, 2),
+            'optimal_percentage_ci_high': round(float(row['ci_high']) * 100, 2),
+            'shrunk_optimal_percentage': float(row['shrunk_optimal_percentage']),
+            'shrunk_rank': int(row['shrunk_rank'])
         })
     
     # Save to JSON
@@ -178,7 +318,6 @@ def analyze_qb_optimal_decisions(input_file='train/input_2023_w01.csv',
     print(f"  Saved {len(output_data['quarterbacks'])} QBs to {output_file}")
     
     # Also save per-play results for filtering
-    per_play_file = 'qb_optimal_decisions_per_play_2023_w01.json'
     per_play_data = {
         'plays': [
             {
@@ -1,15 +1,65 @@
 import pandas as pd
 import json
-import numpy as np
+from data_loader import load_csv, load_optimal_flags, OPTIMAL_DECISIONS_FILE_PATTERN
+from dataset import TrackingDataset
+from instrumentation import timed, stage, add_rows
 
+def load_throw_frames(input_files):
+    """
+    Load throw frame and passer name for every play.
+    Only the columns needed are read from each tracking CSV.
+
+    Args:
+        input_files: List of tracking CSV paths
+
+    Returns:
+        DataFrame with one row per play: game_id, play_id, throw_frame, player_name
+    """
+    usecols = ['game_id', 'play_id', 'frame_id', 'player_role', 'player_name']
+    df = pd.concat(
+        [load_csv(f, columns=usecols) for f in input_files],
+        ignore_index=True
+    )
+    print(f"  Total rows: {len(df):,}")
+
+    throw_frames = df.groupby(['game_id', 'play_id'])['frame_id'].max().rename('throw_frame').reset_index()
+    qb_info = (
+        df.loc[df['player_role'] == 'Passer', ['game_id', 'play_id', 'player_name']]
+        .drop_duplicates(['game_id', 'play_id'])
+    )
+    return throw_frames.merge(qb_info, on=['game_id', 'play_id'], how='left')
+
+@timed('time_to_throw')
 def analyze_time_to_throw(input_file='train/input_2023_w01.csv',
                          optimal_decisions_file='qb_optimal_decisions_per_play_2023_w01.json',
-                         output_file='time_to_throw_analysis_2023_w01.json'):
+                         output_file='time_to_throw_analysis_2023_w01.json',
+                         weeks=None, seasons=None):
     """
     Analyze time to throw for each quarterback and compare with optimal/non-optimal averages.
+
+    Args:
+        input_file: Tracking CSV to analyze (ignored when weeks or seasons is given)
+        optimal_decisions_file: Per-play optimal decision JSON (ignored when weeks or
+            seasons is given)
+        output_file: Path to save the analysis JSON
+        weeks: Optional week numbers; the matching input partitions of the dataset are
+            analyzed with OPTIMAL_DECISIONS_FILE_PATTERN for their optimal decisions
+        seasons: Optional seasons (all weeks of them unless weeks is also given)
     """
+    if weeks is not None or seasons is not None:
+        partitions = TrackingDataset().partitions(seasons=seasons, weeks=weeks)
+        input_files = [p['path'] for p in partitions]
+        optimal_decisions_files = [
+            OPTIMAL_DECISIONS_FILE_PATTERN.format(season=p['season'], week=p['week']) for p in partitions
+        ]
+        label = ', '.join(f"{p['season']} Week {p['week']}" for p in partitions)
+    else:
+        input_files = [input_file]
+        optimal_decisions_files = [optimal_decisions_file]
+        label = input_file
+
     print("="*60)
-    print("Time to Throw Analysis - 2023 Week 1")
+    print(f"Time to Throw Analysis - {label}")
     print("="*60)
     
     # Constants
@@ -18,45 +68,25 @@ def analyze_time_to_throw(input_file='train/input_2023_w01.csv',
     
     # Load data
     print("\nLoading data...")
-    df = pd.read_csv(input_file, low_memory=False)
-    print(f"  Total rows: {len(df):,}")
-    
-    # Get unique plays
-    plays = df[['game_id', 'play_id']].drop_duplicates()
-    print(f"  Total plays: {len(plays):,}")
-    
-    # Calculate throw_frame for each play (max frame_id)
-    print("\nCalculating throw frames...")
-    throw_frames = df.groupby(['game_id', 'play_id'])['frame_id'].max().reset_index()
-    throw_frames.columns = ['game_id', 'play_id', 'throw_frame']
+    with stage('load'):
+        throw_frames = load_throw_frames(input_files)
+        add_rows(len(throw_frames))
+    print(f"  Total plays: {len(throw_frames):,}")
     
     # Calculate time to throw: (throw_frame - 1) * 0.1 seconds
     throw_frames['time_to_throw'] = (throw_frames['throw_frame'] - 1) * TIME_PER_FRAME
     
-    # Get QB name for each play
-    qb_info = df[df['player_role'] == 'Passer'][['game_id', 'play_id', 'player_name']].drop_duplicates()
-    throw_frames = throw_frames.merge(qb_info, on=['game_id', 'play_id'], how='left')
-    
     print(f"  Calculated time to throw for {len(throw_frames):,} plays")
     
     # Load optimal decisions data
     print("\nLoading optimal decisions data...")
     try:
-        with open(optimal_decisions_file, 'r') as f:
-            optimal_data = json.load(f)
-        
-        # Create a set of (game_id, play_id) tuples where is_optimal == True
-        optimal_plays_set = set(
-            (play['game_id'], play['play_id'])
-            for play in optimal_data['plays']
-            if play['is_optimal']
-        )
-        print(f"  Found {len(optimal_plays_set)} optimal decision plays")
+        optimal_flags = load_optimal_flags(optimal_decisions_files)
+        print(f"  Found {int(optimal_flags['is_optimal'].sum())} optimal decision plays")
         
         # Add is_optimal flag
-        throw_frames['is_optimal'] = throw_frames.apply(
-            lambda row: (row['game_id'], row['play_id']) in optimal_plays_set, axis=1
-        )
+        throw_frames = throw_frames.merge(optimal_flags, on=['game_id', 'play_id'], how='left')
+        throw_frames['is_optimal'] = throw_frames['is_optimal'].fillna(False).astype(bool)
         
         # Calculate overall averages
         overall_avg = throw_frames['time_to_throw'].mean()
@@ -68,50 +98,72 @@ def analyze_time_to_throw(input_file='train/input_2023_w01.csv',
         print(f"  Optimal decisions: {optimal_avg:.2f}s ({throw_frames['is_optimal'].sum()} plays)")
         print(f"  Non-optimal decisions: {non_optimal_avg:.2f}s ({len(throw_frames) - throw_frames['is_optimal'].sum()} plays)")
         
-    except FileNotFoundError:
-        print(f"  Warning: {optimal_decisions_file} not found.")
+    except FileNotFoundError as e:
+        print(f"  Warning: {e.filename} not found.")
         print("  Run analyze_qb_optimal_decisions.py first to generate this file.")
+        overall_avg = throw_frames['time_to_throw'].mean()
         optimal_avg = None
         non_optimal_avg = None
         throw_frames['is_optimal'] = False
     except Exception as e:
         print(f"  Error loading optimal decisions: {e}")
+        overall_avg = throw_frames['time_to_throw'].mean()
         optimal_avg = None
         non_optimal_avg = None
         throw_frames['is_optimal'] = False
     
-    # Calculate per-QB averages
-    print("\nCalculating per-QB averages...")
-    qb_stats = throw_frames.groupby('player_name').agg({
-        'time_to_throw': 'mean',
-        'play_id': 'count'
-    }).reset_index()
-    qb_stats.columns = ['name', 'avg_time_to_throw', 'total_plays']
+    # Calculate per-QB averages, distributions and optimal/non-optimal splits
+    print("\nCalculating per-QB statistics...")
+    qb_stats = throw_frames.groupby('player_name')['time_to_throw'].agg(
+        avg_time_to_throw='mean',
+        total_plays='count',
+        median_time_to_throw='median',
+        std_time_to_throw='std'
+    )
+    # Both quartiles in one vectorized pass instead of a Python lambda per group
+    quartiles = (
+        throw_frames.groupby('player_name')['time_to_throw'].quantile([0.25, 0.75])
+        .unstack()
+        .rename(columns={0.25: 'p25_time_to_throw', 0.75: 'p75_time_to_throw'})
+    )
+    qb_stats = qb_stats.merge(quartiles, left_index=True, right_index=True, how='left')
+    split_stats = (
+        throw_frames.groupby(['player_name', 'is_optimal'])['time_to_throw']
+        .agg(['mean', 'count'])
+        .unstack('is_optimal')
+        .reindex(columns=pd.MultiIndex.from_product([['mean', 'count'], [True, False]]))
+    )
+    qb_stats['optimal_avg'] = split_stats[('mean', True)]
+    qb_stats['non_optimal_avg'] = split_stats[('mean', False)]
+    qb_stats['optimal_count'] = split_stats[('count', True)].fillna(0)
+    qb_stats['non_optimal_count'] = split_stats[('count', False)].fillna(0)
+    qb_stats = qb_stats.rename_axis('name').reset_index()
     qb_stats = qb_stats.sort_values('avg_time_to_throw').reset_index(drop=True)
     
     # Filter QBs with at least 5 plays
-    qb_stats_filtered = qb_stats[qb_stats['total_plays'] >= 5].copy()
+    qb_stats_filtered = qb_stats[qb_stats['total_plays'] >= 5]
     
     print(f"  Found {len(qb_stats_filtered)} QBs with 5+ plays")
-    
-    # Calculate per-QB optimal/non-optimal averages
-    qb_optimal_stats = []
-    for _, qb_row in qb_stats_filtered.iterrows():
-        qb_name = qb_row['name']
-        qb_plays = throw_frames[throw_frames['player_name'] == qb_name]
-        
-        qb_optimal = qb_plays[qb_plays['is_optimal']]['time_to_throw']
-        qb_non_optimal = qb_plays[~qb_plays['is_optimal']]['time_to_throw']
-        
-        qb_optimal_stats.append({
-            'name': qb_name,
-            'avg_time_to_throw': round(float(qb_row['avg_time_to_throw']), 2),
-            'total_plays': int(qb_row['total_plays']),
-            'optimal_avg': round(float(qb_optimal.mean()), 2) if len(qb_optimal) > 0 else None,
-            'non_optimal_avg': round(float(qb_non_optimal.mean()), 2) if len(qb_non_optimal) > 0 else None,
-            'optimal_count': int(len(qb_optimal)),
-            'non_optimal_count': int(len(qb_non_optimal))
-        })
+
+    def rounded(value):
+        return round(float(value), 2) if pd.notna(value) else None
+
+    qb_optimal_stats = [
+        {
+            'name': row.name,
+            'avg_time_to_throw': rounded(row.avg_time_to_throw),
+            'total_plays': int(row.total_plays),
+            'optimal_avg': rounded(row.optimal_avg),
+            'non_optimal_avg': rounded(row.non_optimal_avg),
+            'optimal_count': int(row.optimal_count),
+            'non_optimal_count': int(row.non_optimal_count),
+            'median_time_to_throw': rounded(row.median_time_to_throw),
+            'std_time_to_throw': rounded(row.std_time_to_throw),
+            'p25_time_to_throw': rounded(row.p25_time_to_throw),
+            'p75_time_to_throw': rounded(row.p75_time_to_throw)
+        }
+        for row in qb_stats_filtered.itertuples(index=False)
+    ]
     
     # Prepare output data
     output_data = {
@@ -125,6 +177,9 @@ def analyze_time_to_throw(input_file='train/input_2023_w01.csv',
         'time_per_frame': TIME_PER_FRAME,
         'quarterbacks': qb_optimal_stats
     }
+    if weeks is not None or seasons is not None:
+        output_data['weeks'] = sorted({p['week'] for p in partitions})
+        output_data['seasons'] = sorted({p['season'] for p in partitions})
     
     # Save to JSON
     print(f"\nSaving results to {output_file}...")
@@ -147,4 +202,3 @@ def analyze_time_to_throw(input_file='train/input_2023_w01.csv',
 
 if __name__ == '__main__':
     analyze_time_to_throw()
-
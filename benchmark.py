@@ -0,0 +1,381 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from synthetic_data import generate_tracking
+from data_loader import INPUT_FILE_PATTERN, OUTPUT_FILE_PATTERN, SUPPLEMENTARY_FILE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Throughput and peak-memory benchmarks for the heavy stages, run on synthetic data.
+# Every stage runs in a fresh process (so peak RSS belongs to that stage alone) with
+# the synthetic work directory as its cwd. Stages whose dependencies are not
+# installed are reported as skipped.
+
+BENCHMARK_RESULTS_FILE = 'benchmark_results.json'
+
+# Slowdown versus the previous results file that is reported as a regression
+REGRESSION_THRESHOLD = 1.2
+
+PREDICTION_COLUMNS = ['target_probability', 'catch_probability', 'yards_if_caught', 'expected_yards']
+
+def benchmark_stages(season=2023, week=1):
+    """
+    Benchmarked stages, in run order. Paths are relative to the work directory.
+
+    Returns:
+        List of stage dicts: name, module, function, kwargs, requires (stages whose
+        outputs this stage reads)
+    """
+    raw_input = INPUT_FILE_PATTERN.format(season=season, week=week)
+    raw_output = OUTPUT_FILE_PATTERN.format(season=season, week=week)
+    return [
+        {
+            'name': 'separation',
+            'module': 'compute_separation_features',
+            'function': 'process_single_file',
+            'kwargs': {'input_file': raw_input, 'output_file': 'input_with_separation.csv'},
+            'requires': []
+        },
+        {
+            'name': 'feature_engineering',
+            'module': 'benchmark',
+            'function': 'run_feature_engineering',
+            'kwargs': {'separation_file': 'input_with_separation.csv'},
+            'requires': ['separation']
+        },
+        {
+            'name': 'training',
+            'module': 'train_catch_probability_model',
+            'function': 'main',
+            'kwargs': {'separation_file': 'input_with_separation.csv',
+                       'supplementary_file': SUPPLEMENTARY_FILE, 'model_dir': 'models'},
+            'requires': ['separation']
+        },
+        {
+            'name': 'inference',
+            'module': 'add_predictions_to_dataframe',
+            'function': 'add_predictions_to_dataframe',
+            'kwargs': {'separation_file': 'input_with_separation.csv',
+                       'supplementary_file': SUPPLEMENTARY_FILE,
+                       'output_file': 'input_with_model_predictions.csv',
+                       'use_cache': False},   # measure scoring, not cache lookups
+            'requires': ['separation', 'training']
+        },
+        # The analyses read the synthetic predictions so they run without trained models
+        {
+            'name': 'optimal_decisions',
+            'module': 'analyze_qb_optimal_decisions',
+            'function': 'analyze_qb_optimal_decisions',
+            'kwargs': {'input_file': 'input_with_predictions.csv',
+                       'output_file': 'qb_optimal_decisions.json',
+                       'per_play_file': 'qb_optimal_decisions_per_play.json'},
+            'requires': []
+        },
+        {
+            'name': 'decision_timeline',
+            'module': 'analyze_decision_timeline',
+            'function': 'analyze_decision_timeline',
+            'kwargs': {'input_file': 'input_with_predictions.csv',
+                       'output_file': 'decision_timeline.json',
+                       'per_play_file': 'decision_timeline_per_play.json'},
+            'requires': []
+        },
+        {
+            'name': 'time_to_throw',
+            'module': 'analyze_time_to_throw',
+            'function': 'analyze_time_to_throw',
+            'kwargs': {'input_file': 'input_with_predictions.csv',
+                       'optimal_decisions_file': 'qb_optimal_decisions_per_play.json',
+                       'output_file': 'time_to_throw_analysis.json'},
+            'requires': ['optimal_decisions']
+        },
+        {
+            'name': 'export',
+            'module': 'benchmark',
+            'function': 'run_export',
+            'kwargs': {'input_file': 'input_with_predictions.csv', 'output_file': raw_output,
+                       'out_dir': 'exported_plays'},
+            'requires': []
+        }
+    ]
+
+def run_feature_engineering(separation_file, supplementary_file=SUPPLEMENTARY_FILE):
+    """Load, label and engineer training features without fitting any model."""
+    from train_catch_probability_model import (load_and_prepare_data, create_target_variable,
+                                               engineer_features)
+    df = load_and_prepare_data(separation_file, supplementary_file)
+    df = create_target_variable(df)
+    return engineer_features(df)
+
+def run_export(input_file, output_file, out_dir, supplementary_file=SUPPLEMENTARY_FILE):
+    """Export every play in the columnar layout."""
+    from data_loader import load_csv
+    from play_exporter import export_plays
+    input_df = load_csv(input_file, use_cache=False)
+    output_df = load_csv(output_file, use_cache=False)
+    supplementary = load_csv(supplementary_file, use_cache=False)
+    return export_plays(input_df, output_df, out_dir, supplementary=supplementary,
+                        layout='columnar')
+
+def write_benchmark_data(work_dir, n_plays, frames, offense, defense, seed=0, season=2023, week=1):
+    """
+    Generate the synthetic dataset used by every stage.
+
+    Writes the raw input/output/supplementary files with the real layout, plus
+    input_with_predictions.csv (raw input with synthetic model outputs) for the analyses.
+
+    Returns:
+        Dict with the input row count and play count
+    """
+    input_df, output_df, supplementary_df = generate_tracking(
+        n_plays=n_plays, frames=frames, offense=offense, defense=defense,
+        season=season, week=week, seed=seed, with_predictions=True
+    )
+    raw_input = os.path.join(work_dir, INPUT_FILE_PATTERN.format(season=season, week=week))
+    os.makedirs(os.path.dirname(raw_input), exist_ok=True)
+    input_df.drop(columns=PREDICTION_COLUMNS).to_csv(raw_input, index=False)
+    input_df.to_csv(os.path.join(work_dir, 'input_with_predictions.csv'), index=False)
+    output_df.to_csv(os.path.join(work_dir, OUTPUT_FILE_PATTERN.format(season=season, week=week)),
+                     index=False)
+    supplementary_df.to_csv(os.path.join(work_dir, SUPPLEMENTARY_FILE), index=False)
+    return {'rows': len(input_df), 'output_rows': len(output_df), 'plays': len(supplementary_df)}
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _measure_stage(work_dir, module_name, function_name, kwargs, quiet=True):
+    """
+    Worker entry point: import the stage module, then time one call.
+
+    Returns:
+        Dict with status, seconds, peak_rss_mb and rss_growth_mb (peak during the call
+        minus the peak after imports), or status 'skipped' with the import error if a
+        dependency is missing
+    """
+    os.chdir(work_dir)
+    try:
+        function = getattr(importlib.import_module(module_name), function_name)
+        if module_name == 'benchmark':
+            # Wrapper stages import their real dependencies lazily; check them up front
+            if function_name == 'run_feature_engineering':
+                importlib.import_module('train_catch_probability_model')
+            elif function_name == 'run_export':
+                importlib.import_module('play_exporter')
+    except ImportError as e:
+        return {'status': 'skipped', 'reason': f"{type(e).__name__}: {e}"}
+
+    baseline = _peak_rss_mb()
+    stdout = sys.stdout
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+    try:
+        start = time.perf_counter()
+        function(**kwargs)
+        seconds = time.perf_counter() - start
+    except ImportError as e:
+        # Optional dependencies imported lazily inside the stage (sklearn, xgboost)
+        return {'status': 'skipped', 'reason': f"{type(e).__name__}: {e}"}
+    finally:
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = stdout
+    peak = _peak_rss_mb()
+    return {
+        'status': 'ok',
+        'seconds': seconds,
+        'peak_rss_mb': peak,
+        'rss_growth_mb': peak - baseline if peak is not None else None
+    }
+
+def _environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__
+    }
+
+def compare_results(current, previous, threshold=REGRESSION_THRESHOLD):
+    """
+    Print per-stage timing ratios against a previous results dict.
+
+    Returns:
+        List of stage names that slowed down by more than `threshold`
+    """
+    before = {r['stage']: r for r in previous.get('results', []) if r['status'] == 'ok'}
+    regressions = []
+    print("\nComparison with previous run:")
+    if previous.get('config') != current.get('config'):
+        print("  (previous run used a different configuration; ratios are indicative only)")
+    for r in current['results']:
+        old = before.get(r['stage'])
+        if r['status'] != 'ok' or old is None:
+            continue
+        ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = '  <-- REGRESSION'
+            regressions.append(r['stage'])
+        print(f"  {r['stage']:<20} {old['seconds']:>8.3f}s -> {r['seconds']:>8.3f}s "
+              f"({ratio:.2f}x){flag}")
+    return regressions
+
+def run_benchmarks(n_plays=500, frames=(15, 40), offense=6, defense=5, stages=None, repeats=1,
+                   seed=0, output_file=BENCHMARK_RESULTS_FILE, work_dir=None, quiet=True):
+    """
+    Generate synthetic data and benchmark each stage.
+
+    Args:
+        n_plays: Synthetic plays to generate
+        frames: (min, max) input frames per play
+        offense: Offensive players per play
+        defense: Defensive players per play
+        stages: Optional stage names to run (their required stages run too)
+        repeats: Runs per stage; the fastest is reported
+        seed: Random seed for the generator
+        output_file: JSON file for the results (None to skip saving); an existing file
+            is compared against before being replaced
+        work_dir: Directory for the synthetic data and stage outputs (a temporary
+            directory, removed afterwards, if None)
+        quiet: Silence stage output
+
+    Returns:
+        Results dict: config, environment, created_at and per-stage results
+    """
+    all_stages = benchmark_stages()
+    by_name = {stage['name']: stage for stage in all_stages}
+    if stages is not None:
+        unknown = set(stages) - set(by_name)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)}, expected one of {list(by_name)}")
+        wanted = set()
+        pending = list(stages)
+        while pending:
+            name = pending.pop()
+            if name not in wanted:
+                wanted.add(name)
+                pending.extend(by_name[name]['requires'])
+        all_stages = [stage for stage in all_stages if stage['name'] in wanted]
+
+    config = {'plays': n_plays, 'frames': list(frames), 'offense': offense, 'defense': defense,
+              'repeats': repeats, 'seed': seed}
+
+    print("="*60)
+    print(f"Benchmark: {n_plays:,} plays, {frames[0]}-{frames[1]} frames, "
+          f"{offense + defense} players per play")
+    print("="*60)
+
+    temporary = work_dir is None
+    work_dir = os.path.abspath(tempfile.mkdtemp(prefix='nfl_benchmark_') if temporary else work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        start = time.perf_counter()
+        sizes = write_benchmark_data(work_dir, n_plays, frames, offense, defense, seed=seed)
+        print(f"Generated {sizes['rows']:,} input rows, {sizes['output_rows']:,} output rows "
+              f"in {time.perf_counter() - start:.1f}s\n")
+
+        # A fresh interpreter per run: no import caches or memory carried between stages
+        context = multiprocessing.get_context('spawn')
+        results = []
+        status = {}
+        for stage in all_stages:
+            missing = [dep for dep in stage['requires'] if status.get(dep) != 'ok']
+            if missing:
+                result = {'status': 'skipped', 'reason': f"requires {', '.join(missing)}"}
+            else:
+                runs = []
+                for _ in range(repeats):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        try:
+                            run = executor.submit(_measure_stage, work_dir, stage['module'],
+                                                  stage['function'], stage['kwargs'], quiet).result()
+                        except Exception as e:
+                            run = {'status': 'failed', 'reason': f"{type(e).__name__}: {e}"}
+                    runs.append(run)
+                    if run['status'] != 'ok':
+                        break
+                ok = [run for run in runs if run['status'] == 'ok']
+                result = min(ok, key=lambda run: run['seconds']) if len(ok) == len(runs) else runs[-1]
+
+            status[stage['name']] = result['status']
+            entry = {'stage': stage['name'], 'status': result['status'],
+                     'reason': result.get('reason')}
+            if result['status'] == 'ok':
+                seconds = result['seconds']
+                entry.update({
+                    'seconds': round(seconds, 4),
+                    'rows': sizes['rows'],
+                    'rows_per_second': round(sizes['rows'] / seconds, 1) if seconds else None,
+                    'plays_per_second': round(sizes['plays'] / seconds, 2) if seconds else None,
+                    'peak_rss_mb': round(result['peak_rss_mb'], 1) if result['peak_rss_mb'] is not None else None,
+                    'rss_growth_mb': round(result['rss_growth_mb'], 1) if result['rss_growth_mb'] is not None else None
+                })
+                print(f"  {stage['name']:<20} {seconds:>8.3f}s  {entry['rows_per_second']:>12,.0f} rows/s  "
+                      f"peak {entry['peak_rss_mb']} MB")
+            else:
+                print(f"  {stage['name']:<20} {result['status']} ({result['reason']})")
+            results.append(entry)
+    finally:
+        if temporary:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': config,
+        'environment': _environment(),
+        'results': results
+    }
+
+    if output_file:
+        try:
+            with open(output_file, 'r') as f:
+                previous = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            previous = None
+        if previous is not None:
+            report['regressions'] = compare_results(report, previous)
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {output_file}")
+
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the heavy stages on synthetic data.')
+    parser.add_argument('stages', nargs='*', help='Stages to run (default: all)')
+    parser.add_argument('--plays', type=int, default=500)
+    parser.add_argument('--min-frames', type=int, default=15)
+    parser.add_argument('--max-frames', type=int, default=40)
+    parser.add_argument('--offense', type=int, default=6)
+    parser.add_argument('--defense', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=BENCHMARK_RESULTS_FILE)
+    parser.add_argument('--work-dir', default=None, help='Keep synthetic data and outputs here')
+    parser.add_argument('--verbose', action='store_true', help='Show stage output')
+    args = parser.parse_args()
+
+    run_benchmarks(
+        n_plays=args.plays, frames=(args.min_frames, args.max_frames), offense=args.offense,
+        defense=args.defense, stages=args.stages or None, repeats=args.repeats, seed=args.seed,
+        output_file=args.output, work_dir=args.work_dir, quiet=not args.verbose
+    )
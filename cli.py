@@ -0,0 +1,262 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from dataset import TrackingDataset
+
+# Single entry point for the workflow:
+#   python cli.py separation --weeks 1-3
+#   python cli.py train --weeks 1-18
+#   python cli.py predict --weeks 1
+#   python cli.py analyze all --weeks 1,2
+#   python cli.py export --weeks 1 --layout columnar --workers 4
+#   python cli.py list --seasons 2022-2023 --weeks all
+#   python cli.py tensors --weeks all
+#   python cli.py stream --weeks 1 --speed 4
+#   python cli.py heatmaps --weeks 1 --radius 8 --step 0.5
+# Subcommands import their modules (and with them pandas, scipy, sklearn, xgboost)
+# only when they run, so `list` and `--help` start without the heavy dependencies.
+# They run over the (season, week) partitions of the dataset that match --seasons and
+# --weeks. Intermediate files follow pipeline.pipeline_stages, under --work-dir.
+
+ANALYSES = {
+    'optimal': 'optimal_decisions',
+    'timeline': 'decision_timeline',
+    'time-to-throw': 'time_to_throw'
+}
+
+def parse_weeks(text):
+    """
+    Parse a week (or season) selection: '1', '1-4', '1,3,5-7' or 'all'.
+
+    Returns:
+        Sorted list of distinct numbers, or None for 'all'
+    """
+    if text == 'all':
+        return None
+    weeks = set()
+    for part in text.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+            if start > end:
+                raise argparse.ArgumentTypeError(f"Empty range '{part}'")
+            weeks.update(range(start, end + 1))
+        elif part:
+            weeks.add(int(part))
+    if not weeks:
+        raise argparse.ArgumentTypeError(f"Nothing selected by '{text}'")
+    return sorted(weeks)
+
+def _range_arg(text):
+    try:
+        return parse_weeks(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid selection '{text}'")
+
+def _partitions(args):
+    """(season, week) input partitions matching --seasons and --weeks."""
+    partitions = TrackingDataset().partitions(seasons=args.seasons, weeks=args.weeks)
+    if not partitions:
+        print("No input partitions match the selected seasons and weeks")
+    return [(p['season'], p['week']) for p in partitions]
+
+def _stage_kwargs(name, season, week, args):
+    """Keyword arguments of a pipeline stage for one week (same files as pipeline.py)."""
+    from pipeline import pipeline_stages
+    stages = pipeline_stages(week=week, season=season, work_dir=args.work_dir)
+    return next(stage for stage in stages if stage['name'] == name)['kwargs']
+
+def _existing(paths, what):
+    """Keep the paths that exist, reporting the ones that don't."""
+    found = []
+    for path in paths:
+        if os.path.exists(path):
+            found.append(path)
+        else:
+            print(f"Skipping missing {what} {path}")
+    return found
+
+def cmd_separation(args):
+    from compute_separation_features import process_single_file
+    os.makedirs(args.work_dir, exist_ok=True)
+    for season, week in _partitions(args):
+        process_single_file(**_stage_kwargs('separation', season, week, args))
+
+def cmd_train(args):
+    from train_catch_probability_model import main
+    partitions = _partitions(args)
+    files = [_stage_kwargs('separation', season, week, args)['output_file']
+             for season, week in partitions]
+    files = _existing(files, 'separation file')
+    if not files:
+        sys.exit("No separation files found; run `cli.py separation` first")
+    kwargs = _stage_kwargs('train', *partitions[0], args)
+    os.makedirs(kwargs['model_dir'], exist_ok=True)
+    main(separation_file=files[0] if len(files) == 1 else files,
+         supplementary_file=kwargs['supplementary_file'], model_dir=kwargs['model_dir'])
+
+def cmd_predict(args):
+    from add_predictions_to_dataframe import add_predictions_to_dataframe
+    for season, week in _partitions(args):
+        kwargs = _stage_kwargs('predict', season, week, args)
+        if _existing([kwargs['separation_file']], 'separation file'):
+            add_predictions_to_dataframe(**kwargs, use_cache=not args.no_cache)
+
+def cmd_heatmaps(args):
+    from expected_yards_heatmap import precompute_heatmaps
+    for season, week in _partitions(args):
+        kwargs = _stage_kwargs('heatmaps', season, week, args)
+        if _existing([kwargs['separation_file']], 'separation file'):
+            precompute_heatmaps(**kwargs, radius=args.radius, step=args.step)
+
+def cmd_analyze(args):
+    names = list(ANALYSES) if args.analysis == 'all' else [args.analysis]
+    for season, week in _partitions(args):
+        for name in names:
+            stage = ANALYSES[name]
+            kwargs = _stage_kwargs(stage, season, week, args)
+            if not _existing([kwargs['input_file']], 'predictions file'):
+                continue
+            if stage == 'optimal_decisions':
+                from analyze_qb_optimal_decisions import analyze_qb_optimal_decisions as analyze
+            elif stage == 'decision_timeline':
+                from analyze_decision_timeline import analyze_decision_timeline as analyze
+            else:
+                from analyze_time_to_throw import analyze_time_to_throw as analyze
+            analyze(**kwargs)
+
+def cmd_export(args):
+    partitions = _partitions(args)
+    multiple = len(partitions) > 1
+    for season, week in partitions:
+        if args.pack:
+            from play_pack import export_week_pack, PACK_FILE_PATTERN
+            pack_name = os.path.basename(PACK_FILE_PATTERN.format(season=season, week=week))
+            export_week_pack(week=week, season=season, layout=args.layout,
+                             path=os.path.join(args.out_dir, pack_name))
+            continue
+
+        from play_exporter import export_week, COMPACT_PRECISION, DEFAULT_DECIMATION
+        out_dir = os.path.join(args.out_dir, f'{season}_w{week:02d}') if multiple else args.out_dir
+        export_week(
+            week=week, out_dir=out_dir, season=season,
+            manifest_file=os.path.join(out_dir, 'manifest.json') if multiple else args.manifest,
+            layout=args.layout, precompress=args.precompress, workers=args.workers,
+            precision=COMPACT_PRECISION if args.compact else None,
+            decimation=DEFAULT_DECIMATION if args.compact else None
+        )
+
+def cmd_list(args):
+    from play_index import play_keys
+    # With the JSON on stdout, progress goes to stderr so the list can be piped
+    to_stdout = args.output is None and not args.ids
+    plays = []
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        for p in TrackingDataset().partitions(seasons=args.seasons, weeks=args.weeks):
+            keys = play_keys(p['path'])
+            print(f"{p['season']} week {p['week']}: {len(keys):,} plays")
+            plays.extend({'game_id': game_id, 'play_id': play_id} for game_id, play_id in keys.tolist())
+
+    if args.ids:
+        for play in plays:
+            print(play['game_id'], play['play_id'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(plays, f, indent=2)
+        print(f"Saved {len(plays):,} plays to {args.output}")
+    elif to_stdout:
+        print(json.dumps(plays, indent=2))
+
+def cmd_tensors(args):
+    from play_tensor import week_tensor_store
+    for season, week in _partitions(args):
+        store = week_tensor_store(week=week, season=season, rebuild=args.rebuild)
+        shape = store.meta['shape']
+        print(f"{season} week {week}: {shape['plays']:,} plays x {shape['frames']} frames x "
+              f"{shape['slots']} slots x {len(store.channels)} channels")
+
+def cmd_stream(args):
+    from streaming import run_stream
+    for season, week in _partitions(args):
+        run_stream(week=week, season=season, speed=args.speed, output_file=args.output,
+                   max_plays=args.max_plays, use_models=not args.no_models)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='NFL tracking analysis workflow.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--weeks', type=_range_arg, default=[1],
+                        help="Weeks to process: 1, 1-4, 1,3,5-7 or all (default: 1)")
+    common.add_argument('--seasons', type=_range_arg, default=None,
+                        help="Seasons to process, same syntax (default: all)")
+    common.add_argument('--work-dir', default='pipeline_data',
+                        help='Directory for separation and prediction files')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sub = subparsers.add_parser('separation', parents=[common], help='Compute separation features')
+    sub.set_defaults(handler=cmd_separation)
+
+    sub = subparsers.add_parser('train', parents=[common],
+                                help='Train the target and catch models on the selected weeks')
+    sub.set_defaults(handler=cmd_train)
+
+    sub = subparsers.add_parser('predict', parents=[common], help='Add model predictions')
+    sub.add_argument('--no-cache', action='store_true',
+                     help='Rescore every play instead of reusing cached predictions')
+    sub.set_defaults(handler=cmd_predict)
+
+    sub = subparsers.add_parser('heatmaps', parents=[common],
+                                help='Precompute catch/expected-yards heatmaps over landing points')
+    sub.add_argument('--radius', type=float, default=10.0, help='Grid half-width in yards')
+    sub.add_argument('--step', type=float, default=1.0, help='Grid spacing in yards')
+    sub.set_defaults(handler=cmd_heatmaps)
+
+    sub = subparsers.add_parser('analyze', parents=[common], help='Run QB decision analyses')
+    sub.add_argument('analysis', choices=list(ANALYSES) + ['all'])
+    sub.set_defaults(handler=cmd_analyze)
+
+    sub = subparsers.add_parser('export', parents=[common], help='Export play files for the frontend')
+    sub.add_argument('--out-dir', default='plays',
+                     help='Directory for play files, or for the packs with --pack')
+    sub.add_argument('--manifest', default=None, help='Manifest path (single week)')
+    sub.add_argument('--layout', choices=['rows', 'columnar'], default='rows')
+    sub.add_argument('--workers', type=int, default=1)
+    sub.add_argument('--precompress', action='store_true', help='Also write .gz/.br files')
+    sub.add_argument('--compact', action='store_true',
+                     help='Compact precision and frame decimation (columnar only)')
+    sub.add_argument('--pack', action='store_true', help='Write one play pack per week instead')
+    sub.set_defaults(handler=cmd_export)
+
+    sub = subparsers.add_parser('list', parents=[common], help='List available plays')
+    sub.add_argument('--output', default=None,
+                     help="JSON file for the play list (default: print it to stdout, '' to skip)")
+    sub.add_argument('--ids', action='store_true', help='Print game_id play_id per line')
+    sub.set_defaults(handler=cmd_list)
+
+    sub = subparsers.add_parser('tensors', parents=[common],
+                                help='Build memory-mapped play tensor stores')
+    sub.add_argument('--rebuild', action='store_true', help='Rebuild even if up to date')
+    sub.set_defaults(handler=cmd_tensors)
+
+    sub = subparsers.add_parser('stream', parents=[common],
+                                help='Replay weeks through the streaming engine')
+    sub.add_argument('--speed', type=float, default=0,
+                     help='Multiple of real time (default 0 = as fast as possible, 1 = 10 Hz)')
+    sub.add_argument('--max-plays', type=int, default=None)
+    sub.add_argument('--output', default=None,
+                     help="CSV for scored rows (default streaming_predictions_{season}_w{week}.csv, '' to skip)")
+    sub.add_argument('--no-models', action='store_true', help='Separation and features only')
+    sub.set_defaults(handler=cmd_stream)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    args.handler(args)
+    print(f"[{args.command}] done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,24 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from dataset import TrackingDataset, DATA_DIR
 from scipy.spatial.distance import cdist
+from instrumentation import timed, stage, add_rows, progress
+from play_tensor import tensorize
+
+SEPARATION_COLUMNS = [
+    'nearest_defender_distance', 'nearest_defender_id',
+    'nearest_defender_x', 'nearest_defender_y',
+    'separation_x', 'separation_y', 'separation_angle',
+    'second_nearest_defender_distance',
+    'receiver_speed', 'receiver_acceleration',
+    'nearest_defender_speed', 'nearest_defender_acceleration'
+]
+
+RECEIVER_POSITIONS = ['WR', 'TE', 'RB']
+
+# Plays per block in the tensor computation (bounds the (plays, frames, slots, slots) arrays)
+TENSOR_CHUNK_PLAYS = 64
 
 def calculate_separation_features_for_play(play_data):
     """
@@ -126,7 +143,124 @@ def calculate_separation_features_for_play(play_data):
     
     return play_data
 
-def process_all_plays(input_dir='train', output_file='train/input_with_separation.csv'):
+def separation_features_from_tensors(tensors, chunk_plays=TENSOR_CHUNK_PLAYS):
+    """
+    Separation features for every receiver row at once, from dense play tensors.
+
+    Same values as calculate_separation_features_for_play: receivers and defenders
+    are compared frame by frame, ties go to the defender with the lower nfl_id, and
+    frames without a defender are left out.
+
+    Args:
+        tensors: PlayTensors (see play_tensor)
+        chunk_plays: Plays per block
+
+    Returns:
+        DataFrame with game_id, play_id, nfl_id, frame_id and SEPARATION_COLUMNS
+    """
+    players = tensors.players
+    side_codes = tensors.category_codes('side', ['Offense'])
+    defense_codes = tensors.category_codes('side', ['Defense'])
+    receiver_codes = tensors.category_codes('position', RECEIVER_POSITIONS)
+    is_receiver = np.isin(players['side'], side_codes) & np.isin(players['position'], receiver_codes)
+    is_defender = np.isin(players['side'], defense_codes)
+    x, y = tensors.channels.index('x'), tensors.channels.index('y')
+    s, a = tensors.channels.index('s'), tensors.channels.index('a')
+
+    blocks = []
+    for start in range(0, len(tensors), chunk_plays):
+        block = slice(start, start + chunk_plays)
+        tracking = np.asarray(tensors.tracking[block])
+        valid = np.asarray(tensors.valid[block])
+        receiver = valid & is_receiver[block][:, None, :]     # (p, F, S)
+        defender = valid & is_defender[block][:, None, :]
+
+        # Pairwise distances (p, F, receiver slot, defender slot); inf where no pair
+        dx = tracking[:, :, :, None, x] - tracking[:, :, None, :, x]
+        dy = tracking[:, :, :, None, y] - tracking[:, :, None, :, y]
+        distances = np.sqrt(dx ** 2 + dy ** 2)
+        distances = np.where(defender[:, :, None, :], distances, np.inf)
+
+        n_defenders = defender.sum(axis=2)                    # (p, F)
+        rows = receiver & (n_defenders > 0)[:, :, None]
+        p_idx, f_idx, r_idx = np.nonzero(rows)
+        if len(p_idx) == 0:
+            continue
+
+        pair_distances = distances[p_idx, f_idx, r_idx]       # (rows, S)
+        order = np.argsort(pair_distances, axis=1, kind='stable')
+        nearest = order[:, 0]
+        row = np.arange(len(nearest))
+        nearest_distance = pair_distances[row, nearest]
+        if pair_distances.shape[1] > 1:
+            second = pair_distances[row, order[:, 1]]
+            second = np.where(n_defenders[p_idx, f_idx] > 1, second, np.nan)
+        else:
+            second = np.full(len(nearest), np.nan)
+
+        receiver_values = tracking[p_idx, f_idx, r_idx]
+        defender_values = tracking[p_idx, f_idx, nearest]
+        separation_x = defender_values[:, x] - receiver_values[:, x]
+        separation_y = defender_values[:, y] - receiver_values[:, y]
+        angles = np.degrees(np.arctan2(separation_y, separation_x))
+        angles = np.where(angles < 0, angles + 360, angles)
+
+        plays = tensors.plays[block]
+        block_players = players[block]
+        blocks.append(pd.DataFrame({
+            'game_id': plays['game_id'][p_idx],
+            'play_id': plays['play_id'][p_idx],
+            'nfl_id': block_players['nfl_id'][p_idx, r_idx],
+            'frame_id': f_idx + 1,
+            'nearest_defender_distance': nearest_distance,
+            'nearest_defender_id': block_players['nfl_id'][p_idx, nearest].astype(np.float64),
+            'nearest_defender_x': defender_values[:, x],
+            'nearest_defender_y': defender_values[:, y],
+            'separation_x': separation_x,
+            'separation_y': separation_y,
+            'separation_angle': angles,
+            'second_nearest_defender_distance': second,
+            'receiver_speed': receiver_values[:, s],
+            'receiver_acceleration': receiver_values[:, a],
+            'nearest_defender_speed': defender_values[:, s],
+            'nearest_defender_acceleration': defender_values[:, a]
+        }))
+
+    if not blocks:
+        return pd.DataFrame(columns=['game_id', 'play_id', 'nfl_id', 'frame_id'] + SEPARATION_COLUMNS)
+    return pd.concat(blocks, ignore_index=True)
+
+def add_separation_features(df, indent=''):
+    """
+    Add the separation columns to a tracking DataFrame.
+
+    Packs the rows into play tensors and computes all plays in blocks. Falls back to
+    the per-play computation when the rows can't be packed (e.g. duplicate frames).
+
+    Returns:
+        DataFrame sorted by game_id, play_id, frame_id, nfl_id
+    """
+    try:
+        tensors = tensorize(df)
+    except ValueError as e:
+        print(f"{indent}Per-play separation ({e})")
+        num_plays = len(df[['game_id', 'play_id']].drop_duplicates())
+        processed_plays = []
+        for (game_id, play_id), play_data in progress(df.groupby(['game_id', 'play_id']),
+                                                      total=num_plays, indent=indent + '  '):
+            processed_plays.append(calculate_separation_features_for_play(play_data.copy()))
+        merged_df = pd.concat(processed_plays, ignore_index=True)
+    else:
+        features = separation_features_from_tensors(tensors)
+        merged_df = df.merge(features, on=['game_id', 'play_id', 'nfl_id', 'frame_id'], how='left')
+        merged_df[SEPARATION_COLUMNS] = merged_df[SEPARATION_COLUMNS].astype(np.float64)
+        print(f"{indent}Computed separation for {len(tensors):,} plays from "
+              f"{tensors.meta['shape']['frames']}-frame play tensors")
+    return merged_df.sort_values(['game_id', 'play_id', 'frame_id', 'nfl_id']).reset_index(drop=True)
+
+@timed('separation')
+def process_all_plays(input_dir=DATA_DIR, output_file='train/input_with_separation.csv',
+                      seasons=None, weeks=None):
     """
     Process all input CSV files and add separation features.
     Optimized for performance with efficient grouping and processing.
@@ -134,11 +268,13 @@ def process_all_plays(input_dir='train', output_file='train/input_with_separatio
     Args:
         input_dir: Directory containing input CSV files
         output_file: Path to save the merged dataframe with separation features
+        seasons: Optional seasons to include (all partitions found if None)
+        weeks: Optional weeks to include
     """
     print("Loading input CSV files...")
     
-    # Find all input CSV files
-    input_files = sorted(Path(input_dir).glob('input_2023_w*.csv'))
+    # Find the input partitions for the requested seasons and weeks
+    input_files = [Path(p['path']) for p in TrackingDataset(input_dir).partitions(seasons=seasons, weeks=weeks)]
     
     if len(input_files) == 0:
         print(f"No input files found in {input_dir}")
@@ -153,7 +289,9 @@ def process_all_plays(input_dir='train', output_file='train/input_with_separatio
         print(f"Processing {input_file.name} ({file_idx}/{len(input_files)})...")
         
         # Read the CSV file
-        df = pd.read_csv(input_file)
+        with stage('load'):
+            df = pd.read_csv(input_file)
+            add_rows(len(df))
         
         # Get unique plays using more efficient method
         play_keys = df[['game_id', 'play_id']].drop_duplicates()
@@ -161,25 +299,8 @@ def process_all_plays(input_dir='train', output_file='train/input_with_separatio
         
         print(f"  Found {num_plays} plays in {input_file.name}")
         
-        # Group by play for more efficient processing
-        # This avoids repeated filtering
-        grouped = df.groupby(['game_id', 'play_id'])
-        
-        # Process each play
-        processed_plays = []
-        for play_idx, ((game_id, play_id), play_data) in enumerate(grouped, 1):
-            # Calculate separation features
-            play_data_with_separation = calculate_separation_features_for_play(play_data.copy())
-            processed_plays.append(play_data_with_separation)
-            
-            # Progress update every 100 plays
-            if play_idx % 100 == 0:
-                print(f"    Processed {play_idx}/{num_plays} plays...")
-        
-        # Combine all plays from this file (more efficient than repeated concat)
-        if processed_plays:
-            file_df = pd.concat(processed_plays, ignore_index=True)
-            all_dataframes.append(file_df)
+        with stage('features', rows=len(df)):
+            all_dataframes.append(add_separation_features(df, indent='    '))
         
         print(f"  Completed {input_file.name}")
     
@@ -192,7 +313,8 @@ def process_all_plays(input_dir='train', output_file='train/input_with_separatio
     
     # Save to CSV
     print(f"\nSaving merged dataframe with separation features to {output_file}...")
-    merged_df.to_csv(output_file, index=False)
+    with stage('save', rows=len(merged_df)):
+        merged_df.to_csv(output_file, index=False)
     
     # Print summary statistics
     print("\n" + "="*60)
@@ -225,6 +347,7 @@ def process_all_plays(input_dir='train', output_file='train/input_with_separatio
     print(f"Successfully saved merged dataframe to {output_file}")
     print("="*60)
 
+@timed('separation')
 def process_single_file(input_file, output_file=None):
     """
     Process a single input CSV file and add separation features.
@@ -244,34 +367,22 @@ def process_single_file(input_file, output_file=None):
     print()
     
     print(f"Loading {input_file}...")
-    df = pd.read_csv(input_file)
+    with stage('load'):
+        df = pd.read_csv(input_file)
+        add_rows(len(df))
     
     # Get unique plays
     play_keys = df[['game_id', 'play_id']].drop_duplicates()
     num_plays = len(play_keys)
     print(f"Found {num_plays} plays in {input_file}")
     
-    # Group by play for processing
-    grouped = df.groupby(['game_id', 'play_id'])
-    processed_plays = []
-    
-    for play_idx, ((game_id, play_id), play_data) in enumerate(grouped, 1):
-        # Calculate separation features
-        play_data_with_separation = calculate_separation_features_for_play(play_data.copy())
-        processed_plays.append(play_data_with_separation)
-        
-        # Progress update every 100 plays
-        if play_idx % 100 == 0:
-            print(f"  Processed {play_idx}/{num_plays} plays...")
-    
-    # Combine all plays
-    print("\nCombining all plays...")
-    merged_df = pd.concat(processed_plays, ignore_index=True)
-    merged_df = merged_df.sort_values(['game_id', 'play_id', 'frame_id', 'nfl_id']).reset_index(drop=True)
+    with stage('features', rows=len(df)):
+        merged_df = add_separation_features(df)
     
     # Save to CSV
     print(f"\nSaving to {output_file}...")
-    merged_df.to_csv(output_file, index=False)
+    with stage('save', rows=len(merged_df)):
+        merged_df.to_csv(output_file, index=False)
     
     # Print summary statistics
     print("\n" + "="*60)
@@ -0,0 +1,325 @@
+import pandas as pd
+import hashlib
+import json
+import os
+import re
+from data_paths import (CACHE_DIR, INPUT_FILE_PATTERN, OUTPUT_FILE_PATTERN, SUPPLEMENTARY_FILE,
+                        OPTIMAL_DECISIONS_FILE_PATTERN, input_path, output_path,
+                        optimal_decisions_path)
+
+# Shared loader for the tracking and supplementary CSVs.
+# Each CSV is parsed once with declared dtypes and cached on disk one column per file,
+# so later reads (in this process or any other script) only load the columns they ask for.
+
+# Declared dtypes for known columns. Columns not listed here are inferred by pandas.
+COLUMN_DTYPES = {
+    # Keys
+    'game_id': 'int64',
+    'play_id': 'int64',
+    'nfl_id': 'int64',
+    'frame_id': 'int64',
+
+    # Tracking
+    'x': 'float64',
+    'y': 'float64',
+    's': 'float64',
+    'a': 'float64',
+    'dir': 'float64',
+    'o': 'float64',
+    'absolute_yardline_number': 'float64',
+    'ball_land_x': 'float64',
+    'ball_land_y': 'float64',
+    'num_frames_output': 'float64',
+    'player_name': 'object',
+    'player_position': 'object',
+    'play_direction': 'object',
+    'player_side': 'category',
+    'player_role': 'category',
+
+    # Model outputs written by add_predictions_to_dataframe
+    'target_probability': 'float64',
+    'catch_probability': 'float64',
+    'yards_if_caught': 'float64',
+    'expected_yards': 'float64',
+
+    # Supplementary (play-level). Model inputs stay float64/object so feature
+    # preparation sees the same dtypes as before, exported floats stay float64 so
+    # play files keep their exact values, and teams stay object because they are
+    # compared against each other (categoricals would not allow it).
+    'season': 'Int16',
+    'week': 'Int8',
+    'quarter': 'Int8',
+    'down': 'float64',
+    'yards_to_go': 'float64',
+    'yardline_number': 'float64',
+    'pre_snap_home_score': 'Int16',
+    'pre_snap_visitor_score': 'Int16',
+    'pass_length': 'float64',
+    'dropback_distance': 'float64',
+    'defenders_in_the_box': 'Int8',
+    'yards_gained': 'Int16',
+    'expected_points': 'float64',
+    'expected_points_added': 'float64',
+    'play_action': 'boolean',
+    'game_date': 'category',
+    'game_time_eastern': 'category',
+    'home_team_abbr': 'category',
+    'visitor_team_abbr': 'category',
+    'receiver_alignment': 'category',
+    'route_of_targeted_receiver': 'category',
+    'dropback_type': 'category',
+    'pass_location_type': 'category',
+    'team_coverage_man_zone': 'category',
+    'pass_result': 'object',
+    'team_coverage_type': 'object',
+    'offense_formation': 'object',
+    'possession_team': 'object',
+    'defensive_team': 'object',
+    'yardline_side': 'object',
+}
+
+# Supplementary columns used by training and prediction
+SUPPLEMENTARY_MODEL_COLUMNS = [
+    'game_id', 'play_id', 'pass_result', 'team_coverage_type',
+    'offense_formation', 'down', 'yards_to_go', 'yardline_number'
+]
+
+# Supplementary columns written into exported play files
+SUPPLEMENTARY_EXPORT_COLUMNS = [
+    'season', 'week', 'game_date', 'game_time_eastern', 'home_team_abbr',
+    'visitor_team_abbr', 'play_description', 'quarter', 'game_clock', 'down',
+    'yards_to_go', 'possession_team', 'defensive_team', 'yardline_side',
+    'yardline_number', 'pre_snap_home_score', 'pre_snap_visitor_score',
+    'pass_result', 'pass_length', 'offense_formation', 'receiver_alignment',
+    'route_of_targeted_receiver', 'play_action', 'dropback_type',
+    'dropback_distance', 'pass_location_type', 'defenders_in_the_box',
+    'team_coverage_man_zone', 'team_coverage_type', 'yards_gained',
+    'expected_points', 'expected_points_added'
+]
+
+# In-process memo: source path -> {'fingerprint': ..., 'columns': {name: Series}}
+_memory_cache = {}
+
+# (game_id, play_id)-indexed supplementary tables: (path, columns) -> (fingerprint, DataFrame)
+_supplementary_index_cache = {}
+
+def _file_hash(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cache_dir_for(path):
+    """On-disk cache directory for a source CSV."""
+    key = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.normpath(str(path)))
+    return CACHE_DIR / key
+
+def _column_file(cache_dir, column):
+    return cache_dir / (re.sub(r'[^A-Za-z0-9_.-]', '_', column) + '.pkl')
+
+def _read_meta(cache_dir):
+    try:
+        with open(cache_dir / 'meta.json', 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _cache_is_valid(path, meta):
+    """
+    Check a cache against its source CSV.
+    Size and mtime are compared first; if only the mtime changed, the content
+    hash decides (so touching a file does not force a reparse).
+    """
+    if meta is None:
+        return False
+    stat = os.stat(path)
+    if meta['size'] != stat.st_size:
+        return False
+    if meta['mtime_ns'] == stat.st_mtime_ns:
+        return True
+    if meta['sha1'] != _file_hash(path):
+        return False
+    # Same content, new mtime: refresh the stored mtime
+    meta['mtime_ns'] = stat.st_mtime_ns
+    _write_meta(_cache_dir_for(path), meta)
+    return True
+
+def _write_meta(cache_dir, meta):
+    """Write meta.json via a temporary file so readers never see a partial file."""
+    tmp_path = cache_dir / 'meta.json.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, cache_dir / 'meta.json')
+
+def _parse_and_cache(path, cache_dir, columns=None):
+    """
+    Parse the full CSV once with declared dtypes and write one cache file per column.
+
+    Returns:
+        Tuple of (meta, dict of the requested columns); the other parsed columns are
+        released when this returns, so a miss keeps no more in memory than a hit
+    """
+    print(f"  Parsing {path} (building cache)...")
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {col: COLUMN_DTYPES[col] for col in header if col in COLUMN_DTYPES}
+    df = pd.read_csv(path, dtype=dtypes, low_memory=False)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Invalidate the old cache before touching its columns, and write meta.json last:
+    # an interrupted rebuild then leaves no meta and is rebuilt on the next load
+    # instead of pairing the old meta with a mix of old and new column files.
+    try:
+        os.remove(cache_dir / 'meta.json')
+    except FileNotFoundError:
+        pass
+    for col in df.columns:
+        column_file = _column_file(cache_dir, col)
+        tmp_path = f'{column_file}.tmp'
+        df[col].to_pickle(tmp_path)
+        os.replace(tmp_path, column_file)
+
+    stat = os.stat(path)
+    meta = {
+        'source': str(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': _file_hash(path),
+        'columns': list(df.columns),
+        'rows': len(df)
+    }
+    _write_meta(cache_dir, meta)
+
+    wanted = df.columns if columns is None else [col for col in columns if col in df.columns]
+    return meta, {col: df[col] for col in wanted}
+
+def load_csv(path, columns=None, use_cache=True):
+    """
+    Load a CSV with declared dtypes, reading only the requested columns.
+
+    The first call parses the whole file and writes a per-column binary cache under
+    CACHE_DIR; later calls (from any script) read just the cached columns they need.
+    Only the requested columns are kept in memory, on a cache miss as on a hit.
+    The cache is invalidated when the source file's size or content changes.
+
+    Args:
+        path: Path to the CSV file
+        columns: Optional list of columns to return (all columns if None)
+        use_cache: Set to False to bypass both the memory and disk caches
+
+    Returns:
+        DataFrame with the requested columns in the requested order
+    """
+    path = str(path)
+
+    if not use_cache:
+        if columns is None:
+            header = pd.read_csv(path, nrows=0).columns
+        else:
+            header = columns
+        dtypes = {col: COLUMN_DTYPES[col] for col in header if col in COLUMN_DTYPES}
+        return pd.read_csv(path, usecols=columns, dtype=dtypes, low_memory=False)
+
+    cache_dir = _cache_dir_for(path)
+    stat = os.stat(path)
+    fingerprint = (stat.st_size, stat.st_mtime_ns)
+
+    entry = _memory_cache.get(path)
+    if entry is None or entry['fingerprint'] != fingerprint:
+        meta = _read_meta(cache_dir)
+        if _cache_is_valid(path, meta):
+            entry = {'fingerprint': fingerprint, 'meta': meta, 'columns': {}}
+        else:
+            meta, parsed = _parse_and_cache(path, cache_dir, columns)
+            entry = {'fingerprint': fingerprint, 'meta': meta, 'columns': parsed}
+        _memory_cache[path] = entry
+
+    available = entry['meta']['columns']
+    if columns is None:
+        columns = available
+    missing = [col for col in columns if col not in available]
+    if missing:
+        raise KeyError(f"Columns not found in {path}: {missing}")
+
+    for col in columns:
+        if col not in entry['columns']:
+            entry['columns'][col] = pd.read_pickle(_column_file(cache_dir, col))
+
+    return pd.DataFrame({col: entry['columns'][col] for col in columns})
+
+def load_input(week=1, columns=None, season=2023):
+    """Load the weekly tracking input (pre-throw) CSV."""
+    return load_csv(input_path(week, season), columns=columns)
+
+def load_output(week=1, columns=None, season=2023):
+    """Load the weekly tracking output (post-throw) CSV."""
+    return load_csv(output_path(week, season), columns=columns)
+
+def load_supplementary(columns=None, path=SUPPLEMENTARY_FILE):
+    """Load the play-level supplementary CSV."""
+    if columns is not None:
+        columns = ['game_id', 'play_id'] + [c for c in columns if c not in ('game_id', 'play_id')]
+    return load_csv(path, columns=columns)
+
+def supplementary_index(columns=None, path=SUPPLEMENTARY_FILE):
+    """
+    Supplementary data indexed by (game_id, play_id) for O(1) play lookups.
+    The indexed table is built once per column set and kept in memory.
+
+    Args:
+        columns: Columns to include besides the keys (all columns if None)
+        path: Path to the supplementary CSV
+
+    Returns:
+        DataFrame with a unique (game_id, play_id) MultiIndex
+    """
+    stat = os.stat(path)
+    fingerprint = (stat.st_size, stat.st_mtime_ns)
+    key = (str(path), tuple(columns) if columns is not None else None)
+
+    cached = _supplementary_index_cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    indexed = (
+        load_supplementary(columns=columns, path=path)
+        .drop_duplicates(['game_id', 'play_id'])
+        .set_index(['game_id', 'play_id'])
+        .sort_index()
+    )
+    _supplementary_index_cache[key] = (fingerprint, indexed)
+    return indexed
+
+def get_play_supplementary(game_id, play_id, columns=SUPPLEMENTARY_EXPORT_COLUMNS,
+                           path=SUPPLEMENTARY_FILE):
+    """
+    Look up one play's supplementary row.
+
+    Returns:
+        Series of the play's supplementary values, or None if the play is not present
+    """
+    indexed = supplementary_index(columns=columns, path=path)
+    try:
+        return indexed.loc[(game_id, play_id)]
+    except KeyError:
+        return None
+
+def load_optimal_flags(optimal_decisions_files):
+    """
+    Load per-play optimal decision flags from the per-play JSON files.
+
+    Returns:
+        DataFrame with game_id, play_id, is_optimal
+    """
+    plays = []
+    for path in optimal_decisions_files:
+        with open(path, 'r') as f:
+            plays.extend(json.load(f)['plays'])
+    flags = pd.DataFrame(plays, columns=['game_id', 'play_id', 'is_optimal'])
+    return flags.drop_duplicates(['game_id', 'play_id'])
+
+def clear_memory_cache():
+    """Drop all in-process cached columns and indexes (the on-disk cache is kept)."""
+    _memory_cache.clear()
+    _supplementary_index_cache.clear()
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+# File layout of the raw data and the on-disk caches. Kept free of pandas/numpy so
+# lightweight tools (the CLI, the play index, the pipeline runner) can import it
+# without paying for the heavy dependencies.
+
+CACHE_DIR = Path('.data_cache')
+
+INPUT_FILE_PATTERN = 'train/input_{season}_w{week:02d}.csv'
+OUTPUT_FILE_PATTERN = 'train/output_{season}_w{week:02d}.csv'
+SUPPLEMENTARY_FILE = 'supplementary_data.csv'
+
+# Per-play results of analyze_qb_optimal_decisions for one week
+OPTIMAL_DECISIONS_FILE_PATTERN = 'qb_optimal_decisions_per_play_{season}_w{week:02d}.json'
+
+def input_path(week, season=2023):
+    """Path of the weekly tracking input CSV."""
+    return INPUT_FILE_PATTERN.format(season=season, week=week)
+
+def output_path(week, season=2023):
+    """Path of the weekly post-throw output CSV."""
+    return OUTPUT_FILE_PATTERN.format(season=season, week=week)
+
+def optimal_decisions_path(week, season=2023):
+    """Path of the weekly per-play optimal decision results."""
+    return OPTIMAL_DECISIONS_FILE_PATTERN.format(season=season, week=week)
@@ -0,0 +1,187 @@
+import os
+import re
+from data_paths import INPUT_FILE_PATTERN, SUPPLEMENTARY_FILE
+
+# Season/week-partitioned view over the tracking CSVs.
+# A partition is one weekly file (input_{season}_w{week}.csv / output_...). Readers
+# prune partitions by season and week from the file names alone, then push game and
+# play filters down to the byte-offset index (play_index), whose per-play row runs act
+# as row groups: only the matching runs are read and parsed. Unfiltered reads go
+# through the per-column cache in data_loader, so only the requested columns load.
+
+PARTITION_PATTERN = re.compile(r'^(?P<kind>input|output)_(?P<season>\d{4})_w(?P<week>\d{2})\.csv$')
+
+# Directory holding the weekly files
+DATA_DIR = os.path.dirname(INPUT_FILE_PATTERN)
+
+def _as_set(values):
+    """Normalize a filter (None, a scalar, or an iterable such as a range) to a set of ints."""
+    if values is None:
+        return None
+    if isinstance(values, (int, str)):
+        return {int(values)}
+    return {int(v) for v in values}
+
+def discover_partitions(root=DATA_DIR):
+    """
+    Find the weekly partitions under a directory.
+
+    Returns:
+        List of dicts (kind, season, week, path) sorted by kind, season and week
+    """
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+    for name in os.listdir(root):
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append({
+                'kind': match.group('kind'),
+                'season': int(match.group('season')),
+                'week': int(match.group('week')),
+                'path': os.path.join(root, name)
+            })
+    return sorted(partitions, key=lambda p: (p['kind'], p['season'], p['week']))
+
+class TrackingDataset:
+    """
+    Partitioned tracking data of one kind ('input' or 'output').
+
+    Usage:
+        dataset = TrackingDataset()
+        df = dataset.read(columns=['game_id', 'play_id', 'x', 'y'],
+                          seasons=[2023], weeks=range(1, 5), games=[2023090700])
+
+    Filters take None (everything), a single value or any iterable of values.
+    """
+
+    def __init__(self, root=DATA_DIR, kind='input'):
+        self.root = root
+        self.kind = kind
+        self.all_partitions = [p for p in discover_partitions(root) if p['kind'] == kind]
+
+    def seasons(self):
+        """Seasons with at least one partition."""
+        return sorted({p['season'] for p in self.all_partitions})
+
+    def weeks(self, season=None):
+        """Weeks with a partition (in one season, or any)."""
+        return sorted({p['week'] for p in self.all_partitions
+                       if season is None or p['season'] == season})
+
+    def partitions(self, seasons=None, weeks=None, games=None, plays=None):
+        """
+        Partitions that can hold matching rows.
+
+        Season and week prune by file name. Game and play filters prune with each
+        partition's offset index (built on first use), so partitions without any
+        matching play are never parsed.
+
+        Returns:
+            List of partition dicts (kind, season, week, path)
+        """
+        seasons, weeks, games = _as_set(seasons), _as_set(weeks), _as_set(games)
+        selected = [
+            p for p in self.all_partitions
+            if (seasons is None or p['season'] in seasons) and (weeks is None or p['week'] in weeks)
+        ]
+        if games is None and plays is None:
+            return selected
+
+        from play_index import matching_byte_ranges
+        return [p for p in selected if matching_byte_ranges(p['path'], games=games, plays=plays)]
+
+    def read(self, columns=None, seasons=None, weeks=None, games=None, plays=None,
+             partition_columns=False):
+        """
+        Load matching rows from the pruned partitions.
+
+        Args:
+            columns: Optional list of columns to load (all if None)
+            seasons: Season filter
+            weeks: Week filter
+            games: game_id filter
+            plays: Optional (game_id, play_id) pairs
+            partition_columns: Add season and week columns to the result
+
+        Returns:
+            DataFrame with the rows of all matching partitions, in partition then file order
+        """
+        import pandas as pd
+        from data_loader import load_csv
+        from play_index import load_matching_rows
+
+        games = _as_set(games)
+        frames = []
+        for p in self.partitions(seasons=seasons, weeks=weeks):
+            if games is None and plays is None:
+                df = load_csv(p['path'], columns=columns)
+            else:
+                df = load_matching_rows(p['path'], games=games, plays=plays, columns=columns)
+                if columns is not None:
+                    df = df[columns]
+                if df.empty:
+                    continue
+            if partition_columns:
+                df = df.assign(season=p['season'], week=p['week'])
+            frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=(columns or []) + (['season', 'week'] if partition_columns else []))
+        return pd.concat(frames, ignore_index=True)
+
+    def play_keys(self, seasons=None, weeks=None, games=None):
+        """
+        Distinct plays per partition, from the offset indexes only.
+
+        Returns:
+            DataFrame with game_id, play_id, season and week
+        """
+        import pandas as pd
+        from play_index import play_keys
+
+        games = _as_set(games)
+        frames = []
+        for p in self.partitions(seasons=seasons, weeks=weeks):
+            keys = pd.DataFrame(play_keys(p['path']))
+            if games is not None:
+                keys = keys[keys['game_id'].isin(games)]
+            frames.append(keys.assign(season=p['season'], week=p['week']))
+        if not frames:
+            return pd.DataFrame(columns=['game_id', 'play_id', 'season', 'week'])
+        return pd.concat(frames, ignore_index=True)
+
+def read_supplementary(columns=None, seasons=None, weeks=None, games=None,
+                       path=SUPPLEMENTARY_FILE):
+    """
+    Supplementary rows filtered by season, week and game.
+
+    Args:
+        columns: Optional list of columns to return (all if None)
+        seasons: Season filter
+        weeks: Week filter
+        games: game_id filter
+        path: Supplementary CSV path
+
+    Returns:
+        DataFrame of the matching plays (game_id and play_id always included)
+    """
+    from data_loader import load_supplementary
+
+    filters = {'season': _as_set(seasons), 'week': _as_set(weeks), 'game_id': _as_set(games)}
+    needed = [] if columns is None else [
+        c for c, v in filters.items()
+        if v is not None and c not in columns and c not in ('game_id', 'play_id')
+    ]
+    df = load_supplementary(columns=None if columns is None else columns + needed, path=path)
+    mask = None
+    for column, values in filters.items():
+        if values is None:
+            continue
+        condition = df[column].isin(values)
+        mask = condition if mask is None else mask & condition
+    if mask is not None:
+        df = df[mask]
+    if needed:
+        df = df.drop(columns=needed)
+    return df.reset_index(drop=True)
@@ -0,0 +1,241 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from data_loader import load_csv, SUPPLEMENTARY_MODEL_COLUMNS
+from instrumentation import timed, stage, add_rows, count
+
+# Catch probability and expected yards as a function of where the ball is placed.
+# At each play's throw frame, every receiver's catch-model features are repeated over a
+# grid of candidate landing points around the receiver, with distance_to_ball_land
+# recomputed per point, and the whole batch is scored in one predict_proba call per
+# block of receivers. Expected yards at a point are the catch probability times the
+# point's distance past the line of scrimmage. Heatmaps are written per play as compact
+# JSON (quantized values, row-major over the grid) for the frontend.
+
+# Grid around each receiver: offsets -HEATMAP_RADIUS..+HEATMAP_RADIUS yards every HEATMAP_STEP
+HEATMAP_RADIUS = 10.0
+HEATMAP_STEP = 1.0
+
+FIELD_LENGTH = 120.0
+FIELD_WIDTH = 53.3
+
+# Receivers scored per predict_proba call (each brings one row per grid point)
+HEATMAP_BATCH_RECEIVERS = 512
+
+# Catch probabilities are stored as 0-255 and expected yards in tenths of a yard
+PROBABILITY_LEVELS = 255
+EXPECTED_YARDS_SCALE = 10
+
+HEATMAP_FORMAT_VERSION = 1
+
+def candidate_offsets(radius=HEATMAP_RADIUS, step=HEATMAP_STEP):
+    """
+    Grid offsets around a receiver.
+
+    Returns:
+        Tuple of (dx, dy, size): flat row-major offsets (dy rows, dx columns) and the
+        number of points per side
+    """
+    axis = np.arange(-radius, radius + step / 2, step)
+    dy, dx = np.meshgrid(axis, axis, indexing='ij')
+    return dx.ravel(), dy.ravel(), len(axis)
+
+def yards_past_line(x, absolute_yardline_number, play_direction):
+    """Downfield yards from the line of scrimmage to x (same convention as yards_if_caught)."""
+    return np.where(play_direction == 'right', x - absolute_yardline_number, absolute_yardline_number - x)
+
+def score_landing_grid(X_throw, receivers, catch_model, radius=HEATMAP_RADIUS, step=HEATMAP_STEP,
+                       batch_receivers=HEATMAP_BATCH_RECEIVERS):
+    """
+    Catch probability over candidate landing points for receivers at their throw frame.
+
+    Args:
+        X_throw: Catch-model feature matrix of the receivers (one row each)
+        receivers: Matching rows with x, y, absolute_yardline_number and play_direction
+        catch_model: Fitted classifier with predict_proba
+        radius: Grid half-width in yards
+        step: Grid spacing in yards
+        batch_receivers: Receivers per predict_proba call
+
+    Returns:
+        Tuple of (catch_probability, expected_yards) arrays shaped (receivers, points),
+        NaN for points off the field
+    """
+    if 'distance_to_ball_land' not in X_throw.columns:
+        raise ValueError("The catch model does not use distance_to_ball_land")
+    dx, dy, _ = candidate_offsets(radius, step)
+    distance_col = X_throw.columns.get_loc('distance_to_ball_land')
+    dtypes = X_throw.dtypes.to_dict()
+
+    rx = receivers['x'].to_numpy(np.float64)
+    ry = receivers['y'].to_numpy(np.float64)
+    cx = rx[:, None] + dx[None, :]
+    cy = ry[:, None] + dy[None, :]
+    on_field = (cx >= 0) & (cx <= FIELD_LENGTH) & (cy >= 0) & (cy <= FIELD_WIDTH)
+
+    catch = np.full(cx.shape, np.nan)
+    values = X_throw.to_numpy(np.float64)
+    for start in range(0, len(values), batch_receivers):
+        block = slice(start, start + batch_receivers)
+        receiver_idx, point_idx = np.nonzero(on_field[block])
+        if len(receiver_idx) == 0:
+            continue
+        X = values[block][receiver_idx].copy()
+        X[:, distance_col] = np.hypot(dx[point_idx], dy[point_idx])
+        X = pd.DataFrame(X, columns=X_throw.columns).astype(dtypes)
+        catch[block][receiver_idx, point_idx] = catch_model.predict_proba(X)[:, 1]
+
+    yards = yards_past_line(cx, receivers['absolute_yardline_number'].to_numpy(np.float64)[:, None],
+                            receivers['play_direction'].to_numpy()[:, None])
+    count('heatmap_points', int(on_field.sum()))
+    return catch, catch * yards
+
+def _quantized(values, scale, dtype=int):
+    """Flat list of values times scale, rounded; None where NaN."""
+    return [None if np.isnan(v) else dtype(round(v * scale)) for v in values]
+
+def heatmap_records(receivers, catch, expected, radius=HEATMAP_RADIUS, step=HEATMAP_STEP):
+    """
+    Group scored grids into one heatmap record per play.
+
+    Args:
+        receivers: Throw-frame receiver rows (game_id, play_id, nfl_id, frame_id,
+            player_position, x, y and optionally target_probability)
+        catch: (receivers, points) catch probabilities
+        expected: (receivers, points) expected yards
+
+    Returns:
+        Dict (game_id, play_id) -> heatmap record
+    """
+    dx, dy, size = candidate_offsets(radius, step)
+    records = {}
+    for i, row in enumerate(receivers.itertuples(index=False)):
+        key = (int(row.game_id), int(row.play_id))
+        record = records.get(key)
+        if record is None:
+            record = records[key] = {
+                'version': HEATMAP_FORMAT_VERSION,
+                'game_id': key[0],
+                'play_id': key[1],
+                'throw_frame': int(row.frame_id),
+                'grid': {'radius': radius, 'step': step, 'size': size},
+                'scales': {'catch_probability': PROBABILITY_LEVELS, 'expected_yards': EXPECTED_YARDS_SCALE},
+                'receivers': []
+            }
+        best = int(np.nanargmax(expected[i])) if not np.isnan(expected[i]).all() else None
+        entry = {
+            'nfl_id': int(row.nfl_id),
+            'position': row.player_position,
+            'x': round(float(row.x), 2),
+            'y': round(float(row.y), 2),
+            'catch_probability': _quantized(catch[i], PROBABILITY_LEVELS),
+            'expected_yards': _quantized(expected[i], EXPECTED_YARDS_SCALE)
+        }
+        if 'target_probability' in receivers.columns:
+            entry['target_probability'] = round(float(row.target_probability), 4)
+        if best is not None:
+            entry['best'] = {
+                'x': round(float(row.x + dx[best]), 2),
+                'y': round(float(row.y + dy[best]), 2),
+                'catch_probability': round(float(catch[i, best]), 4),
+                'expected_yards': round(float(expected[i, best]), 2)
+            }
+        record['receivers'].append(entry)
+    return records
+
+def heatmap_filename(out_dir, game_id, play_id):
+    """Path of a play's heatmap file."""
+    return f'{out_dir}/heatmap_{game_id}_{play_id}.json'
+
+@timed('heatmaps')
+def precompute_heatmaps(separation_file='train/input_with_separation.csv',
+                        supplementary_file='supplementary_data.csv', out_dir='heatmaps',
+                        manifest_file=None, radius=HEATMAP_RADIUS, step=HEATMAP_STEP):
+    """
+    Score landing-point grids for every receiver at every play's throw frame.
+
+    Args:
+        separation_file: Tracking CSV with separation features
+        supplementary_file: Supplementary CSV (down, distance, coverage, ...)
+        out_dir: Directory for the per-play heatmap files
+        manifest_file: Optional manifest JSON (defaults to out_dir/manifest.json)
+        radius: Grid half-width in yards
+        step: Grid spacing in yards
+
+    Returns:
+        List of manifest entries
+    """
+    from add_predictions_to_dataframe import load_models, engineer_features, prepare_features_for_prediction
+
+    print("="*60)
+    print("Expected Yards Heatmaps")
+    print("="*60)
+
+    (target_model, target_feature_names, target_label_encoders,
+     catch_model, catch_feature_names, catch_label_encoders) = load_models()
+
+    print("\nLoading data...")
+    with stage('load'):
+        df = pd.read_csv(separation_file, low_memory=False)
+        supp_df = load_csv(supplementary_file, columns=SUPPLEMENTARY_MODEL_COLUMNS)
+        df = df.merge(supp_df, on=['game_id', 'play_id'], how='left')
+        add_rows(len(df))
+
+    with stage('features', rows=len(df)):
+        df_receivers = engineer_features(df)
+        # Same encoding and NaN fills as add_predictions_to_dataframe (fills use all rows)
+        X_target = prepare_features_for_prediction(df_receivers, target_feature_names, target_label_encoders)
+        X_catch = prepare_features_for_prediction(df_receivers, catch_feature_names, catch_label_encoders)
+
+    at_throw = (df_receivers['frame_id'] == df_receivers['throw_frame']).to_numpy()
+    receivers = df_receivers[at_throw].reset_index(drop=True)
+    X_throw = X_catch[at_throw]
+    dx, _, size = candidate_offsets(radius, step)
+    print(f"\nScoring {len(receivers):,} receivers x {len(dx)} landing points "
+          f"({size}x{size} grid, {step:g} yd step)...")
+
+    with stage('score', rows=len(receivers) * len(dx)):
+        receivers['target_probability'] = target_model.predict_proba(X_target[at_throw])[:, 1]
+        catch, expected = score_landing_grid(X_throw, receivers, catch_model, radius=radius, step=step)
+
+    records = heatmap_records(receivers, catch, expected, radius=radius, step=step)
+
+    print(f"\nWriting {len(records):,} heatmaps to {out_dir}/...")
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    with stage('save', rows=len(records)):
+        for (game_id, play_id), record in records.items():
+            filename = heatmap_filename(out_dir, game_id, play_id)
+            text = json.dumps(record, separators=(',', ':'))
+            with open(filename, 'w') as f:
+                f.write(text)
+            manifest.append({'game_id': game_id, 'play_id': play_id, 'file': os.path.basename(filename),
+                             'receivers': len(record['receivers']), 'bytes': len(text)})
+
+    if manifest_file is None:
+        manifest_file = os.path.join(out_dir, 'manifest.json')
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    best = [r['best'] for record in records.values() for r in record['receivers'] if 'best' in r]
+    print("\n" + "="*60)
+    print("Summary Statistics")
+    print("="*60)
+    print(f"Plays: {len(records):,}")
+    print(f"Receivers: {len(receivers):,}")
+    if best:
+        print(f"Mean best-point catch probability: {np.mean([b['catch_probability'] for b in best]):.4f}")
+        print(f"Mean best-point expected yards: {np.mean([b['expected_yards'] for b in best]):.2f}")
+    if manifest:
+        print(f"Mean heatmap size: {np.mean([m['bytes'] for m in manifest]) / 1024:.1f} KB")
+    print(f"Manifest saved to {manifest_file}")
+    print("="*60)
+    return manifest
+
+if __name__ == '__main__':
+    precompute_heatmaps(
+        separation_file='train/input_2023_w01.csv',
+        supplementary_file='supplementary_data.csv',
+        out_dir='heatmaps'
+    )
@@ -0,0 +1,192 @@
+import math
+
+# Incremental temporal features. engineer_features computes separation_change and the
+# rolling means by sorting the whole table and regrouping it by receiver track; here
+# each (game_id, play_id, nfl_id) track keeps a fixed-size ring buffer of its recent
+# values, so appending a frame costs O(1) time and memory regardless of track length.
+# verify_against_batch checks the results against engineer_features.
+
+# Rolling window of separation_rolling_mean and speed_rolling_mean (engineer_features)
+ROLLING_WINDOW = 3
+
+TEMPORAL_FEATURES = ['separation_change', 'separation_rolling_mean', 'speed_rolling_mean']
+
+TRACK_KEYS = ['game_id', 'play_id', 'nfl_id']
+
+def _isnan(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+class RingBuffer:
+    """
+    Last `size` values of a series, with the NaN-skipping mean of
+    rolling(window=size, min_periods=1).mean().
+    """
+
+    __slots__ = ('values', 'size', 'next', 'count')
+
+    def __init__(self, size=ROLLING_WINDOW):
+        self.values = [math.nan] * size
+        self.size = size
+        self.next = 0
+        self.count = 0
+
+    def push(self, value):
+        self.values[self.next] = value
+        self.next = (self.next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def last(self):
+        """Most recent value (NaN if empty)."""
+        return self.values[self.next - 1] if self.count else math.nan
+
+    def mean(self):
+        """Mean of the non-NaN values in the window (NaN if there are none)."""
+        total = 0.0
+        n = 0
+        # Oldest to newest, the order rolling() adds them in
+        for i in range(self.size - self.count, self.size):
+            value = self.values[(self.next + i) % self.size]
+            if not _isnan(value):
+                total += value
+                n += 1
+        return total / n if n else math.nan
+
+class TrackFeatureState:
+    """
+    Temporal feature state of one receiver track.
+
+    Frames must arrive in increasing frame_id order (the order engineer_features sorts by).
+    """
+
+    __slots__ = ('distances', 'speeds', 'last_frame')
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.distances = RingBuffer(window)
+        self.speeds = RingBuffer(window)
+        self.last_frame = None
+
+    def update(self, frame_id, distance, speed):
+        """
+        Append one frame.
+
+        Args:
+            frame_id: Frame of the values
+            distance: nearest_defender_distance at the frame (NaN allowed)
+            speed: receiver_speed at the frame (NaN allowed)
+
+        Returns:
+            Tuple of (separation_change, separation_rolling_mean, speed_rolling_mean)
+
+        Raises:
+            ValueError: if frame_id does not increase
+        """
+        if self.last_frame is not None and frame_id <= self.last_frame:
+            raise ValueError(f"Frame {frame_id} arrived after frame {self.last_frame}")
+        self.last_frame = frame_id
+        distance, speed = float(distance), float(speed)
+        change = distance - self.distances.last()
+        self.distances.push(distance)
+        self.speeds.push(speed)
+        return change, self.distances.mean(), self.speeds.mean()
+
+class TemporalFeatureState:
+    """
+    Track states for any number of plays, keyed by (game_id, play_id, nfl_id).
+
+    Usage:
+        state = TemporalFeatureState()
+        change, separation_mean, speed_mean = state.update(game_id, play_id, nfl_id,
+                                                           frame_id, distance, speed)
+        state.end_play(game_id, play_id)
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.tracks = {}
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def update(self, game_id, play_id, nfl_id, frame_id, distance, speed):
+        """Append a receiver frame and return its temporal features (see TrackFeatureState.update)."""
+        key = (game_id, play_id, nfl_id)
+        track = self.tracks.get(key)
+        if track is None:
+            track = self.tracks[key] = TrackFeatureState(self.window)
+        return track.update(frame_id, distance, speed)
+
+    def end_play(self, game_id, play_id):
+        """Drop the tracks of a finished play."""
+        for key in [k for k in self.tracks if k[0] == game_id and k[1] == play_id]:
+            del self.tracks[key]
+
+def incremental_temporal_features(df):
+    """
+    Temporal features of receiver rows computed by streaming them through the state.
+
+    Args:
+        df: Receiver rows with game_id, play_id, nfl_id, frame_id,
+            nearest_defender_distance and receiver_speed (any order)
+
+    Returns:
+        DataFrame of TEMPORAL_FEATURES aligned with df's index
+    """
+    import pandas as pd
+
+    ordered = df.sort_values(TRACK_KEYS + ['frame_id'])
+    state = TemporalFeatureState()
+    values = [
+        state.update(game_id, play_id, nfl_id, frame_id, distance, speed)
+        for game_id, play_id, nfl_id, frame_id, distance, speed in zip(
+            ordered['game_id'].to_numpy(), ordered['play_id'].to_numpy(),
+            ordered['nfl_id'].to_numpy(), ordered['frame_id'].to_numpy(),
+            ordered['nearest_defender_distance'].to_numpy(float),
+            ordered['receiver_speed'].to_numpy(float))
+    ]
+    result = pd.DataFrame(values, columns=TEMPORAL_FEATURES, index=ordered.index)
+    return result.loc[df.index]
+
+def verify_against_batch(df, atol=1e-9):
+    """
+    Compare the incremental features with engineer_features on the same rows.
+
+    Args:
+        df: Tracking rows with separation features (and supplementary columns)
+        atol: Allowed absolute difference (rolling sums may differ in the last bits)
+
+    Returns:
+        Dict of the largest absolute difference per feature
+
+    Raises:
+        AssertionError: if any feature differs by more than atol, or NaNs disagree
+    """
+    import numpy as np
+    from add_predictions_to_dataframe import engineer_features
+
+    batch = engineer_features(df)
+    incremental = incremental_temporal_features(batch)
+    differences = {}
+    for column in TEMPORAL_FEATURES:
+        expected = batch[column].to_numpy(float)
+        actual = incremental[column].to_numpy(float)
+        nan_mismatch = np.isnan(expected) != np.isnan(actual)
+        assert not nan_mismatch.any(), f"{column}: NaN mismatch in {int(nan_mismatch.sum())} rows"
+        both = ~np.isnan(expected)
+        differences[column] = float(np.abs(expected[both] - actual[both]).max()) if both.any() else 0.0
+        assert differences[column] <= atol, f"{column}: max difference {differences[column]}"
+    return differences
+
+if __name__ == '__main__':
+    import pandas as pd
+    from compute_separation_features import add_separation_features
+    from data_loader import load_csv, SUPPLEMENTARY_MODEL_COLUMNS
+
+    print("="*60)
+    print("Incremental vs batch temporal features")
+    print("="*60)
+    df = add_separation_features(load_csv('train/input_2023_w01.csv'))
+    supp_df = load_csv('supplementary_data.csv', columns=SUPPLEMENTARY_MODEL_COLUMNS)
+    df = df.merge(supp_df, on=['game_id', 'play_id'], how='left')
+    for column, difference in verify_against_batch(df).items():
+        print(f"  {column}: max difference {difference:.2e}")
+    print("All temporal features match engineer_features")
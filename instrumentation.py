@@ -0,0 +1,293 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Lightweight stage instrumentation shared by the scripts.
+# `stage()` / `@timed()` record wall and CPU time, rows processed, counters and
+# sampled peak RSS for a block. The outermost stage of a process is the run: when it
+# ends, the run and all nested stages are written to one JSON file under METRICS_DIR.
+# Controlled from the environment, so production runs need no code changes:
+#   NFL_METRICS=0         don't write metrics files
+#   NFL_METRICS_DIR=path  where metrics files go (default: metrics)
+#   NFL_PROFILE=a,b|all   cProfile the named stages (or every run) to .prof files
+
+METRICS_DIR = os.environ.get('NFL_METRICS_DIR', 'metrics')
+
+# Seconds between RSS samples while a stage is open
+SAMPLE_INTERVAL = 0.05
+
+MB = 1024 * 1024
+
+_local = threading.local()
+_lock = threading.Lock()
+_open_records = []
+_sampler = None
+_profiling = False
+
+def _reset_after_fork():
+    """
+    Start a forked child with no open stages: the stack, records and sampler thread
+    inherited from the parent belong to the parent's run, so the child's outermost
+    stage becomes a run of its own (written to its own metrics file).
+    """
+    global _local, _lock, _open_records, _sampler, _profiling
+    _local = threading.local()
+    _lock = threading.Lock()
+    _open_records = []
+    _sampler = None
+    _profiling = False
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def metrics_enabled():
+    return os.environ.get('NFL_METRICS', '1') != '0'
+
+def _profile_requested(record):
+    wanted = os.environ.get('NFL_PROFILE', '')
+    if not wanted:
+        return False
+    names = {name.strip() for name in wanted.split(',')}
+    if 'all' in names:
+        return record['depth'] == 0
+    return record['name'] in names or record['path'] in names
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+def current_rss_mb():
+    """Current resident set size in MB (falls back to the peak where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def _sample():
+    """Background sampler: raise the peak of every open stage to the current RSS."""
+    global _sampler
+    while True:
+        rss = current_rss_mb()
+        with _lock:
+            if not _open_records:
+                _sampler = None
+                return
+            for record in _open_records:
+                if rss is not None and (record['peak_rss_mb'] is None or rss > record['peak_rss_mb']):
+                    record['peak_rss_mb'] = rss
+        time.sleep(SAMPLE_INTERVAL)
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+def current_stage():
+    """Innermost open stage record of this thread (None outside any stage)."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+def add_rows(n):
+    """Count rows processed by the current stage."""
+    record = current_stage()
+    if record is not None:
+        record['rows'] += int(n)
+
+def count(key, n=1):
+    """Increment a named counter on the current stage."""
+    record = current_stage()
+    if record is not None:
+        record['counters'][key] = record['counters'].get(key, 0) + n
+
+def _round(value, digits=3):
+    return round(value, digits) if value is not None else None
+
+def _summary(record):
+    seconds = record['seconds']
+    return {
+        'name': record['name'],
+        'path': record['path'],
+        'depth': record['depth'],
+        'status': record['status'],
+        'seconds': _round(seconds, 4),
+        'cpu_seconds': _round(record['cpu_seconds'], 4),
+        'rows': record['rows'],
+        'rows_per_second': round(record['rows'] / seconds, 1) if record['rows'] and seconds else None,
+        'counters': record['counters'],
+        'rss_start_mb': _round(record['rss_start_mb'], 1),
+        'rss_end_mb': _round(record['rss_end_mb'], 1),
+        'peak_rss_mb': _round(record['peak_rss_mb'], 1),
+        'profile': record['profile']
+    }
+
+def _write_run(record):
+    """Write a finished run and its nested stages to METRICS_DIR; returns the path."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(record['started_at']))
+    path = os.path.join(METRICS_DIR, f"{record['name']}_{stamp}_{os.getpid()}.json")
+    # A pool worker can finish several runs of the same name within a second
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(METRICS_DIR, f"{record['name']}_{stamp}_{os.getpid()}_{n}.json")
+    data = {
+        'run': record['name'],
+        'argv': sys.argv,
+        'pid': os.getpid(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record['started_at'])),
+        'error': record['error'],
+        'process_peak_rss_mb': _round(peak_rss_mb(), 1),
+        **_summary(record),
+        'stages': [_summary(child) for child in record['children']]
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Instrument a block.
+
+    Usage:
+        with stage('load') as s:
+            df = load_csv(path)
+            s['rows'] = len(df)   # or add_rows(len(df)) from anywhere inside
+
+    Args:
+        name: Stage name (nested stages are recorded as parent/child paths)
+        rows: Optional rows processed, if known up front
+
+    Yields:
+        The stage record (a dict)
+    """
+    global _sampler, _profiling
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    record = {
+        'name': name,
+        'path': f"{parent['path']}/{name}" if parent else name,
+        'depth': parent['depth'] + 1 if parent else 0,
+        'status': 'running',
+        'started_at': time.time(),
+        'seconds': None,
+        'cpu_seconds': None,
+        'rows': int(rows or 0),
+        'counters': {},
+        'rss_start_mb': current_rss_mb(),
+        'rss_end_mb': None,
+        'peak_rss_mb': None,
+        'profile': None,
+        'error': None,
+        'children': [],
+        'run': parent['run'] if parent else None
+    }
+    record['peak_rss_mb'] = record['rss_start_mb']
+    if parent is None:
+        record['run'] = record
+    else:
+        record['run']['children'].append(record)
+
+    profiler = None
+    if not _profiling and metrics_enabled() and _profile_requested(record):
+        profiler = cProfile.Profile()
+        _profiling = True
+
+    stack.append(record)
+    with _lock:
+        _open_records.append(record)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample, daemon=True)
+            _sampler.start()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+        record['status'] = 'ok'
+    except BaseException as e:
+        record['status'] = 'failed'
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profiling = False
+        record['seconds'] = time.perf_counter() - wall_start
+        record['cpu_seconds'] = time.process_time() - cpu_start
+        record['rss_end_mb'] = current_rss_mb()
+        with _lock:
+            _open_records.remove(record)
+            if record['rss_end_mb'] is not None and record['rss_end_mb'] > (record['peak_rss_mb'] or 0):
+                record['peak_rss_mb'] = record['rss_end_mb']
+        stack.pop()
+        if parent is not None and record['peak_rss_mb'] is not None:
+            parent['peak_rss_mb'] = max(parent['peak_rss_mb'] or 0, record['peak_rss_mb'])
+
+        if profiler is not None:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(record['started_at']))
+            record['profile'] = os.path.join(
+                METRICS_DIR, f"{record['path'].replace('/', '.')}_{stamp}_{os.getpid()}.prof"
+            )
+            profiler.dump_stats(record['profile'])
+
+        if parent is None and metrics_enabled():
+            path = _write_run(record)
+            print(f"[metrics] {name}: {record['seconds']:.1f}s, peak {record['peak_rss_mb'] or 0:.0f} MB -> {path}")
+
+def timed(name=None):
+    """Decorator form of stage(); the stage name defaults to the function name."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name or function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def progress(iterable, total=None, label='plays', every=100, indent='  ', verb='Processed'):
+    """
+    Iterate while counting items on the current stage and printing a progress line
+    (with elapsed time and rate) every `every` items.
+
+    Args:
+        iterable: Items to iterate
+        total: Total item count for the message (len(iterable) when available)
+        label: Item name, also the counter key
+        every: Items between progress lines
+        indent: Prefix for progress lines
+        verb: Verb for progress lines
+    """
+    if total is None and hasattr(iterable, '__len__'):
+        total = len(iterable)
+    start = time.perf_counter()
+    n = 0
+    try:
+        for item in iterable:
+            yield item
+            n += 1
+            if n % every == 0:
+                elapsed = time.perf_counter() - start
+                of_total = f"/{total}" if total is not None else ''
+                rate = n / elapsed if elapsed > 0 else 0
+                print(f"{indent}{verb} {n}{of_total} {label} ({elapsed:.1f}s, {rate:.0f} {label}/s)...")
+    finally:
+        count(label, n)
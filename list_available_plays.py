@@ -1,14 +1,13 @@
-import pandas as pd
 import json
+from data_paths import input_path
+from play_index import play_keys
 
-# Read the input CSV to get all unique game_id + play_id combinations
-input_df = pd.read_csv('train/input_2023_w01.csv')
-
-# Get unique combinations of game_id and play_id
-available_plays = input_df[['game_id', 'play_id']].drop_duplicates().sort_values(['game_id', 'play_id'])
+# Read the (game_id, play_id) pairs from the input CSV's byte-offset index
+# (built on first use) instead of parsing the whole file
+keys = play_keys(input_path(week=1))
 
 # Convert to list of dictionaries
-plays_list = available_plays.to_dict('records')
+plays_list = [{'game_id': game_id, 'play_id': play_id} for game_id, play_id in keys.tolist()]
 
 # Save to JSON
 with open('available_plays.json', 'w') as f:
@@ -16,4 +15,3 @@ with open('available_plays.json', 'w') as f:
 
 print(f"Found {len(plays_list)} unique game/play combinations")
 print(f"Saved to available_plays.json")
-
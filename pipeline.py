@@ -0,0 +1,492 @@
+import argparse
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from data_paths import SUPPLEMENTARY_FILE, input_path, output_path
+from instrumentation import timed
+
+# Stage runner for the analysis workflow.
+# Each stage declares its input and output files; a stage reruns only when an input,
+# its parameters or its code changed since the last successful run, or an output is
+# missing or was modified. Stages whose upstream stages are done run concurrently.
+
+PIPELINE_STATE_FILE = '.pipeline_state.json'
+
+def _week_stages(week, season, work_dir, models):
+    """Stages that run once per week (all but train), tagged with their partition."""
+    raw_input = input_path(week, season)
+    separation = f'{work_dir}/input_with_separation_{season}_w{week:02d}.csv'
+    predictions = f'{work_dir}/input_with_predictions_{season}_w{week:02d}.csv'
+    optimal = f'qb_optimal_decisions_{season}_w{week:02d}.json'
+    optimal_per_play = f'qb_optimal_decisions_per_play_{season}_w{week:02d}.json'
+    time_to_throw = f'time_to_throw_analysis_{season}_w{week:02d}.json'
+    timeline = f'decision_timeline_{season}_w{week:02d}.json'
+    timeline_per_play = f'decision_timeline_per_play_{season}_w{week:02d}.json'
+    heatmaps = f'heatmaps/{season}_w{week:02d}'
+    # Per-week manifests and play directory (qb_simulate.js reads qb_mode_plays_manifest.json:
+    # copy or link the week to serve; manifest entries carry the play file paths)
+    redzone_plays = f'qb_plays/{season}_w{week:02d}'
+    redzone_manifest = f'qb_plays_manifest_{season}_w{week:02d}.json'
+    qb_mode_manifest = f'qb_mode_plays_manifest_{season}_w{week:02d}.json'
+
+    stages = [
+        {
+            'name': 'separation',
+            'module': 'compute_separation_features',
+            'function': 'process_single_file',
+            'kwargs': {'input_file': raw_input, 'output_file': separation},
+            'inputs': [raw_input],
+            'outputs': [separation]
+        },
+        {
+            'name': 'predict',
+            'module': 'add_predictions_to_dataframe',
+            'function': 'add_predictions_to_dataframe',
+            'kwargs': {'separation_file': separation, 'supplementary_file': SUPPLEMENTARY_FILE,
+                       'output_file': predictions},
+            'inputs': [separation, SUPPLEMENTARY_FILE] + models,
+            'outputs': [predictions]
+        },
+        {
+            'name': 'heatmaps',
+            'module': 'expected_yards_heatmap',
+            'function': 'precompute_heatmaps',
+            'kwargs': {'separation_file': separation, 'supplementary_file': SUPPLEMENTARY_FILE,
+                       'out_dir': heatmaps},
+            'inputs': [separation, SUPPLEMENTARY_FILE] + models,
+            'outputs': [f'{heatmaps}/manifest.json']
+        },
+        {
+            'name': 'optimal_decisions',
+            'module': 'analyze_qb_optimal_decisions',
+            'function': 'analyze_qb_optimal_decisions',
+            'kwargs': {'input_file': predictions, 'output_file': optimal,
+                       'per_play_file': optimal_per_play},
+            'inputs': [predictions],
+            'outputs': [optimal, optimal_per_play]
+        },
+        {
+            'name': 'decision_timeline',
+            'module': 'analyze_decision_timeline',
+            'function': 'analyze_decision_timeline',
+            'kwargs': {'input_file': predictions, 'output_file': timeline,
+                       'per_play_file': timeline_per_play},
+            'inputs': [predictions],
+            'outputs': [timeline, timeline_per_play]
+        },
+        {
+            'name': 'time_to_throw',
+            'module': 'analyze_time_to_throw',
+            'function': 'analyze_time_to_throw',
+            'kwargs': {'input_file': predictions, 'optimal_decisions_file': optimal_per_play,
+                       'output_file': time_to_throw},
+            'inputs': [predictions, optimal_per_play],
+            'outputs': [time_to_throw]
+        },
+        {
+            'name': 'redzone_export',
+            'module': 'extract_redzone_plays',
+            'function': 'extract_redzone_plays',
+            'kwargs': {'input_file': predictions, 'week': week, 'season': season,
+                       'optimal_decisions_file': optimal_per_play, 'out_dir': redzone_plays,
+                       'manifest_file': redzone_manifest, 'qb_mode_manifest_file': qb_mode_manifest},
+            'inputs': [predictions, output_path(week, season), SUPPLEMENTARY_FILE, optimal_per_play],
+            'outputs': [redzone_plays, redzone_manifest, qb_mode_manifest]
+        }
+    ]
+    for stage in stages:
+        stage['partition'] = f'{season}_w{week:02d}'
+    return stages
+
+def pipeline_stages(week=1, season=2023, work_dir='pipeline_data', weeks=None):
+    """
+    The separation -> training -> predictions -> analyses -> export workflow.
+
+    Every stage but train runs once per week. Train is a single stage fitting the shared
+    models/ files on the separation files of all the selected weeks (like `cli.py train`),
+    and every week's predict and heatmaps stages depend on it. Intermediate tracking
+    files go to work_dir instead of overwriting the raw input CSV, so every stage has
+    distinct inputs and outputs.
+
+    Args:
+        week: Week to run when weeks is not given
+        season: Season of the weeks
+        work_dir: Directory for intermediate tracking files
+        weeks: Optional list of weeks to run
+
+    Returns:
+        List of stage dicts: name, module, function, kwargs, inputs, outputs and the
+        season/week partition of per-week stages (runs of different weeks are recorded
+        separately)
+    """
+    weeks = [week] if weeks is None else sorted(weeks)
+    models = ['models/target_prediction_model.pkl', 'models/catch_probability_model.pkl']
+    per_week = {w: _week_stages(w, season, work_dir, models) for w in weeks}
+    separation_files = [per_week[w][0]['outputs'][0] for w in weeks]
+
+    train = {
+        'name': 'train',
+        'module': 'train_catch_probability_model',
+        'function': 'main',
+        'kwargs': {'separation_file': separation_files[0] if len(weeks) == 1 else separation_files,
+                   'supplementary_file': SUPPLEMENTARY_FILE, 'model_dir': 'models'},
+        'inputs': separation_files + [SUPPLEMENTARY_FILE],
+        'outputs': models
+    }
+    # Stages must follow their upstream stages: separations, then train, then the rest
+    return [per_week[w][0] for w in weeks] + [train] + \
+        [stage for w in weeks for stage in per_week[w][1:]]
+
+def _state_key(stage):
+    """Key of a stage's record in the pipeline state: one record per stage and partition."""
+    return f"{stage['name']}@{stage['partition']}" if stage.get('partition') else stage['name']
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _directory_fingerprint(path, known=None):
+    """
+    Content fingerprint of a directory of files (e.g. exported plays): a SHA-256 over
+    each file's relative path and content, reused from `known` while no file's name,
+    size or mtime changed.
+    """
+    files = sorted(
+        os.path.relpath(os.path.join(root, name), path)
+        for root, _, names in os.walk(path) for name in names
+    )
+    listing = []
+    for name in files:
+        stat = os.stat(os.path.join(path, name))
+        listing.append([name, stat.st_size, stat.st_mtime_ns])
+    listing_hash = hashlib.sha256(json.dumps(listing).encode('utf-8')).hexdigest()
+    if known is not None and known.get('listing') == listing_hash:
+        return known
+    digest = hashlib.sha256()
+    for name in files:
+        digest.update(name.encode('utf-8'))
+        digest.update(_file_sha256(os.path.join(path, name)).encode('utf-8'))
+    return {'listing': listing_hash, 'sha256': digest.hexdigest()}
+
+def file_fingerprint(path, known=None):
+    """
+    Content fingerprint of a file (or directory). The SHA-256 is reused from `known`
+    when size and mtime are unchanged, so large CSVs are only rehashed after they change.
+    """
+    if os.path.isdir(path):
+        return _directory_fingerprint(path, known)
+    stat = os.stat(path)
+    if known is not None and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+        return known
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_sha256(path)}
+
+# Directory of the repo's modules; imports resolving elsewhere (pandas, ...) aren't hashed
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _is_main_guard(node):
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__')
+
+def _import_nodes(tree):
+    """Import statements anywhere in a module except its `if __name__ == '__main__':` block."""
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+        pending.extend(child for child in ast.iter_child_nodes(node) if not _is_main_guard(child))
+
+def _local_module_files(module):
+    """
+    Source files of a module and of every repo-local module it imports, directly or
+    transitively (including imports inside functions, but not in __main__ blocks).
+    """
+    files = {}
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        if name in files:
+            continue
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            spec = None
+        origin = getattr(spec, 'origin', None)
+        if not origin or not origin.endswith('.py') or \
+                os.path.dirname(os.path.abspath(origin)) != REPO_DIR:
+            continue
+        files[name] = origin
+        with open(origin, 'r') as f:
+            tree = ast.parse(f.read(), filename=origin)
+        for node in _import_nodes(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return files
+
+def _code_fingerprint(stage):
+    """SHA-256 over the stage module's source and the repo-local modules it imports."""
+    digest = hashlib.sha256()
+    for name, path in sorted(_local_module_files(stage['module']).items()):
+        digest.update(name.encode('utf-8'))
+        digest.update(_file_sha256(path).encode('utf-8'))
+    return digest.hexdigest()
+
+def _upstream(stages):
+    """Map each stage's key to the keys of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for path in stage['outputs']:
+            producers[path] = _state_key(stage)
+    upstream = {}
+    seen = set()
+    for stage in stages:
+        key = _state_key(stage)
+        deps = {producers[path] for path in stage['inputs'] if path in producers}
+        deps.discard(key)
+        if not deps <= seen:
+            raise ValueError(f"Stage '{key}' depends on later stages {sorted(deps - seen)}")
+        upstream[key] = deps
+        seen.add(key)
+    return upstream
+
+def _select(stages, names):
+    """Keys of the stages matching names, either a stage name (all its weeks) or a key."""
+    return {_state_key(stage) for stage in stages
+            if stage['name'] in names or _state_key(stage) in names}
+
+def stale_reason(stage, record, known_files):
+    """
+    Why a stage must run, or None if its recorded run is still current.
+
+    Args:
+        stage: Stage dict
+        record: The stage's entry in the pipeline state (None if never run)
+        known_files: Path -> fingerprint cache (updated in place)
+
+    Returns:
+        Reason string, or None
+    """
+    if record is None:
+        return 'never run'
+    for path in stage['outputs']:
+        if not os.path.exists(path):
+            return f'missing output {path}'
+        known_files[path] = file_fingerprint(path, known_files.get(path))
+        if known_files[path]['sha256'] != record['outputs'].get(path):
+            return f'output {path} modified'
+    for path in stage['inputs']:
+        known_files[path] = file_fingerprint(path, known_files.get(path))
+        if known_files[path]['sha256'] != record['inputs'].get(path):
+            return f'input {path} changed'
+    if record.get('kwargs') != stage['kwargs']:
+        return 'parameters changed'
+    if record.get('code') != _code_fingerprint(stage):
+        return 'code changed'
+    return None
+
+def _run_stage(module_name, function_name, kwargs):
+    """Worker entry point: import the stage module lazily and run it. Returns seconds taken."""
+    start = time.perf_counter()
+    function = getattr(importlib.import_module(module_name), function_name)
+    function(**kwargs)
+    return time.perf_counter() - start
+
+@timed('pipeline')
+def run_pipeline(stages=None, workers=1, force=(), targets=None, dry_run=False,
+                 state_file=PIPELINE_STATE_FILE):
+    """
+    Run stale stages in dependency order, independent ones concurrently.
+
+    Args:
+        stages: Stage dicts (defaults to pipeline_stages())
+        workers: Maximum stages running at once (1 runs everything in-process)
+        force: Stage names (every week) or keys such as predict@2023_w01 to rerun even
+               if current (their downstream stages then rerun only if the forced stage
+               changes their inputs)
+        targets: Optional stage names or keys to bring up to date (with their upstream
+                 stages)
+        dry_run: Only report which stages are stale
+        state_file: JSON file holding fingerprints and timings of past runs
+
+    Returns:
+        List of per-stage results: stage, status (ran, current, stale, failed,
+        blocked), reason and seconds
+    """
+    stages = pipeline_stages() if stages is None else stages
+    upstream = _upstream(stages)
+    by_key = {_state_key(stage): stage for stage in stages}
+    known_names = {stage['name'] for stage in stages} | set(by_key)
+    unknown = (set(force) | set(targets or [])) - known_names
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}, expected one of "
+                         f"{list(dict.fromkeys(stage['name'] for stage in stages))}")
+    force = _select(stages, set(force))
+
+    if targets is not None:
+        wanted = set()
+        pending = list(_select(stages, set(targets)))
+        while pending:
+            key = pending.pop()
+            if key not in wanted:
+                wanted.add(key)
+                pending.extend(upstream[key])
+        stages = [stage for stage in stages if _state_key(stage) in wanted]
+
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    state.setdefault('stages', {})
+    known_files = state.setdefault('files', {})
+
+    def save_state():
+        with open(state_file, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+    print("="*60)
+    print(f"Pipeline: {len(stages)} stages, {workers} worker(s){' (dry run)' if dry_run else ''}")
+    print("="*60)
+
+    results = {}
+    running = {}
+    remaining = [_state_key(stage) for stage in stages]
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+
+    def finish(name, status, reason=None, seconds=None):
+        results[name] = {'stage': name, 'status': status, 'reason': reason,
+                         'seconds': round(seconds, 3) if seconds is not None else None}
+        label = f" ({reason})" if reason else ''
+        timing = f" in {seconds:.1f}s" if seconds is not None else ''
+        print(f"  [{status}] {name}{label}{timing}")
+
+    def record_success(stage, seconds):
+        for path in stage['outputs'] + stage['inputs']:
+            known_files[path] = file_fingerprint(path, known_files.get(path))
+        state['stages'][_state_key(stage)] = {
+            'inputs': {path: known_files[path]['sha256'] for path in stage['inputs']},
+            'outputs': {path: known_files[path]['sha256'] for path in stage['outputs']},
+            'kwargs': stage['kwargs'],
+            'code': _code_fingerprint(stage),
+            'seconds': round(seconds, 3),
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        save_state()
+
+    try:
+        while remaining or running:
+            # Start every stage whose upstream stages are settled
+            for name in list(remaining):
+                deps = upstream[name] & {_state_key(stage) for stage in stages}
+                if any(dep not in results for dep in deps):
+                    continue
+                remaining.remove(name)
+                stage = by_key[name]
+
+                stale = [dep for dep in deps if results[dep]['status'] == 'stale']
+                if stale:
+                    finish(name, 'stale', f"upstream {', '.join(sorted(stale))} stale")
+                    continue
+                blocked = [dep for dep in deps if results[dep]['status'] in ('failed', 'blocked')]
+                if blocked:
+                    finish(name, 'blocked', f"upstream {', '.join(sorted(blocked))} not up to date")
+                    continue
+                missing = [path for path in stage['inputs'] if not os.path.exists(path)]
+                if missing:
+                    finish(name, 'blocked', f"missing input {', '.join(missing)}")
+                    continue
+
+                reason = 'forced' if name in force else \
+                    stale_reason(stage, state['stages'].get(name), known_files)
+                if reason is None:
+                    finish(name, 'current')
+                    continue
+                if dry_run:
+                    finish(name, 'stale', reason)
+                    continue
+
+                for path in stage['outputs']:
+                    directory = os.path.dirname(path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                print(f"  [start] {name} ({reason})")
+                args = (stage['module'], stage['function'], stage['kwargs'])
+                if executor is None:
+                    try:
+                        seconds = _run_stage(*args)
+                    except Exception as e:
+                        finish(name, 'failed', f"{type(e).__name__}: {e}")
+                        continue
+                    record_success(stage, seconds)
+                    finish(name, 'ran', reason, seconds)
+                else:
+                    running[executor.submit(_run_stage, *args)] = (name, reason)
+
+            if not running:
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, reason = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    finish(name, 'failed', f"{type(e).__name__}: {e}")
+                    continue
+                record_success(by_key[name], seconds)
+                finish(name, 'ran', reason, seconds)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    ordered = [results[_state_key(stage)] for stage in stages]
+    if not dry_run:
+        state['last_run'] = {
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'workers': workers,
+            'stages': ordered
+        }
+        save_state()
+
+    total = sum(r['seconds'] or 0 for r in ordered)
+    print("\n" + "="*60)
+    counts = {}
+    for r in ordered:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    print("Pipeline finished: " + ', '.join(f"{n} {status}" for status, n in counts.items()))
+    print(f"Stage time: {total:.1f}s")
+    print("="*60)
+    return ordered
+
+if __name__ == '__main__':
+    from cli import _range_arg
+
+    parser = argparse.ArgumentParser(description='Run the analysis pipeline, rerunning only stale stages.')
+    parser.add_argument('targets', nargs='*', help='Stages to bring up to date (default: all)')
+    parser.add_argument('--weeks', type=_range_arg, default=[1],
+                        help="Weeks to run, e.g. '1', '1-4' or '1,3' (models train on all of them)")
+    parser.add_argument('--season', type=int, default=2023)
+    parser.add_argument('--workers', type=int, default=1, help='Stages to run concurrently')
+    parser.add_argument('--force', action='append', default=[], help='Rerun a stage even if current')
+    parser.add_argument('--dry-run', action='store_true', help='Only report stale stages')
+    args = parser.parse_args()
+    if args.weeks is None:
+        from dataset import TrackingDataset
+        args.weeks = [p['week'] for p in TrackingDataset().partitions(seasons=[args.season])]
+
+    run_pipeline(
+        pipeline_stages(season=args.season, weeks=args.weeks),
+        workers=args.workers,
+        force=args.force,
+        targets=args.targets or None,
+        dry_run=args.dry_run
+    )
@@ -0,0 +1,1049 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import gzip
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from data_loader import load_input, load_output, supplementary_index, SUPPLEMENTARY_EXPORT_COLUMNS
+from instrumentation import timed, stage, add_rows, count, progress
+
+# One-pass play JSON exporter shared by the extract_* scripts.
+# Tracking rows are sorted once by (game_id, play_id, nfl_id, frame_id) and every
+# play/player is a contiguous slice, so no per-play filtering or iterrows is needed.
+
+PLAY_KEYS = ['game_id', 'play_id']
+
+# Play file layouts. 'rows' is the original list-of-frame-objects layout (version 1);
+# 'columnar' stores per-player arrays with a shared frame base and count (version 2),
+# plus the ball flight and per-player positions on the full input+output timeline (version 3),
+# now only the post-throw part of that timeline as input positions are already stored (version 4).
+PLAY_LAYOUTS = ('rows', 'columnar')
+COLUMNAR_FORMAT_VERSION = 4
+
+# Tracking data is recorded to two decimals; columnar files round coordinates to that
+TRACKING_DECIMALS = 2
+
+TRACKING_FIELDS = ['x', 'y', 's', 'a', 'dir', 'o']
+
+# Decimal places per value group in columnar files (None keeps full precision).
+# 'position' covers player, path and ball-flight coordinates, 'kinematics' s/a/dir/o,
+# 'landing' the ball throw and landing points. The defaults reproduce the
+# plain columnar export; COMPACT_PRECISION trades precision for size.
+DEFAULT_PRECISION = {
+    'position': TRACKING_DECIMALS,
+    'kinematics': TRACKING_DECIMALS,
+    'probability': None,
+    'yards': None,
+    'landing': None
+}
+COMPACT_PRECISION = {
+    'position': 1,
+    'kinematics': 1,
+    'probability': 3,
+    'yards': 2,
+    'landing': 2
+}
+FULL_PRECISION = {group: None for group in DEFAULT_PRECISION}
+
+FIELD_PRECISION = {
+    'x': 'position', 'y': 'position',
+    's': 'kinematics', 'a': 'kinematics', 'dir': 'kinematics', 'o': 'kinematics',
+    'catch_probability': 'probability', 'target_probability': 'probability',
+    'yards_if_caught': 'yards', 'expected_yards': 'yards'
+}
+
+# Players exported at reduced frame rate when decimation is on (linemen by default).
+# Decimated players keep every `step`-th frame plus their last one, are marked with
+# frame_step, and are linearly interpolated back to 10 Hz by the frontend.
+NON_FOCUS_POSITIONS = ['T', 'G', 'C', 'OT', 'OG', 'OL', 'DE', 'DT', 'NT', 'DL']
+DEFAULT_DECIMATION = {'step': 2, 'positions': NON_FOCUS_POSITIONS}
+
+# Per-frame model outputs, included only when present and not NaN
+PREDICTION_FIELDS = ['catch_probability', 'target_probability', 'yards_if_caught', 'expected_yards']
+
+# Tracking frames are sampled at 10 Hz
+FRAMES_PER_SECOND = 10
+
+# Eligible receivers considered when judging the optimal target
+RECEIVER_POSITIONS = ['WR', 'TE', 'RB']
+
+# Supplementary fields written into each play file, with their JSON types
+SUPPLEMENTARY_FIELDS = {
+    'season': int,
+    'week': int,
+    'game_date': str,
+    'game_time_eastern': str,
+    'home_team_abbr': str,
+    'visitor_team_abbr': str,
+    'play_description': str,
+    'quarter': int,
+    'game_clock': str,
+    'down': int,
+    'yards_to_go': int,
+    'possession_team': str,
+    'defensive_team': str,
+    'yardline_side': str,
+    'yardline_number': int,
+    'pre_snap_home_score': int,
+    'pre_snap_visitor_score': int,
+    'pass_result': str,
+    'pass_length': float,
+    'offense_formation': str,
+    'receiver_alignment': str,
+    'route_of_targeted_receiver': str,
+    'play_action': bool,
+    'dropback_type': str,
+    'dropback_distance': float,
+    'pass_location_type': str,
+    'defenders_in_the_box': int,
+    'team_coverage_man_zone': str,
+    'team_coverage_type': str,
+    'yards_gained': int,
+    'expected_points': float,
+    'expected_points_added': float
+}
+
+def group_bounds(key_arrays):
+    """
+    Start/end offsets of runs of equal keys in pre-sorted key arrays.
+
+    Args:
+        key_arrays: List of equal-length numpy arrays, sorted lexicographically
+
+    Returns:
+        Tuple of (starts, ends) arrays
+    """
+    n = len(key_arrays[0]) if key_arrays else 0
+    if n == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for arr in key_arrays:
+        change[1:] |= arr[1:] != arr[:-1]
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], n)
+    return starts, ends
+
+def supplementary_record(supp_row):
+    """
+    Convert one supplementary row (Series or dict) into the play file's
+    'supplementary' dict, with None for missing values.
+    """
+    if supp_row is None:
+        return {}
+    return {
+        field: (cast(supp_row[field]) if field in supp_row and pd.notna(supp_row[field]) else None)
+        for field, cast in SUPPLEMENTARY_FIELDS.items()
+    }
+
+def _play_keys_index(df):
+    """MultiIndex of (game_id, play_id) for each row."""
+    return pd.MultiIndex.from_arrays([df['game_id'].to_numpy(), df['play_id'].to_numpy()])
+
+def _throw_point(position, side, frame_ids, xs, ys, throw_frame):
+    """
+    Ball throw position for one play: the QB at the throw frame, else the QB's
+    closest frame, else the first offensive player at the throw frame, else the
+    average position at the throw frame.
+    """
+    qb = position == 'QB'
+    if qb.any():
+        at_throw = np.flatnonzero(qb & (frame_ids == throw_frame))
+        if len(at_throw) > 0:
+            i = at_throw[0]
+        else:
+            qb_idx = np.flatnonzero(qb)
+            qb_frames = frame_ids[qb_idx]
+            unique_frames = pd.unique(qb_frames)
+            closest_frame = min(unique_frames, key=lambda f: abs(f - throw_frame))
+            i = qb_idx[np.flatnonzero(qb_frames == closest_frame)[0]]
+        return float(xs[i]), float(ys[i])
+
+    at_frame = frame_ids == throw_frame
+    offense_at_throw = np.flatnonzero((side == 'Offense') & at_frame)
+    if len(offense_at_throw) > 0:
+        i = offense_at_throw[0]
+        return float(xs[i]), float(ys[i])
+    return float(xs[at_frame].mean()), float(ys[at_frame].mean())
+
+def _columnar_frames(frame_ids):
+    """Frame base/count for a player's sorted frames, plus explicit ids if there are gaps."""
+    entry = {'frame_base': int(frame_ids[0]), 'frame_count': int(len(frame_ids))}
+    if frame_ids[-1] - frame_ids[0] + 1 != len(frame_ids):
+        entry['frame_ids'] = [int(f) for f in frame_ids]
+    return entry
+
+def _rounded_float(value, decimals=3):
+    return round(float(value), decimals)
+
+def _rounded_list(values, decimals=TRACKING_DECIMALS):
+    if decimals is None:
+        return np.asarray(values, dtype=np.float64).tolist()
+    return np.round(values, decimals).tolist()
+
+def _resolve_precision(precision):
+    """Complete a partial precision dict with the defaults."""
+    unknown = set(precision or {}) - set(DEFAULT_PRECISION)
+    if unknown:
+        raise ValueError(f"Unknown precision groups {sorted(unknown)}, expected {list(DEFAULT_PRECISION)}")
+    return {**DEFAULT_PRECISION, **(precision or {})}
+
+def _decimated_indices(n, position, decimation):
+    """Indices of the frames kept for a player, or None when the player is not decimated."""
+    if decimation is None or decimation['step'] <= 1 or position not in decimation['positions']:
+        return None
+    keep = np.arange(0, n, decimation['step'])
+    if keep[-1] != n - 1:
+        keep = np.append(keep, n - 1)
+    return keep
+
+def _play_timeline(in_player, in_frames, in_x, in_y, out_player, out_frames, out_x, out_y,
+                   n_players, throw_frame, ball_throw, ball_land, decimals=TRACKING_DECIMALS):
+    """
+    Ball and player positions for every frame 1..total_frames of one play.
+
+    Mirrors the frontend's per-tick logic, computed for all players at once on a
+    (players x frames) grid: input positions where recorded; after the throw, output
+    positions (frame throw_frame + k for output frame k), held at the player's last
+    output position once it runs out, otherwise held at the last input position.
+    The ball travels in a straight line from the throw point at throw_frame to the
+    landing point at the last frame.
+
+    Args:
+        in_player, out_player: Player index (0..n_players-1) of each input/output row
+        in_frames, out_frames: Frame ids of each row (output frames count from 1)
+        in_x, in_y, out_x, out_y: Positions of each row
+        n_players: Number of players in the play
+        throw_frame: Last input frame
+        ball_throw, ball_land: (x, y) of the throw and landing points
+
+    Returns:
+        Tuple of (total_frames, ball dict, path_x, path_y, path_output), where the path
+        arrays are (n_players x total_frames) with NaN where the player is not drawn and
+        path_output marks positions taken from output tracking
+    """
+    max_output = int(out_frames.max()) if len(out_frames) else 0
+    total_frames = throw_frame + max_output
+    frames = np.arange(1, total_frames + 1)
+
+    path_x = np.full((n_players, total_frames), np.nan)
+    path_y = np.full((n_players, total_frames), np.nan)
+    path_output = np.zeros((n_players, total_frames), dtype=bool)
+    after_throw = frames > throw_frame
+
+    # Held positions after the throw: the last input position by default
+    last_input = np.zeros(n_players, dtype=np.int64)
+    np.maximum.at(last_input, in_player, np.arange(len(in_player)))
+    has_input = np.bincount(in_player, minlength=n_players) > 0
+    held = np.flatnonzero(has_input)
+    path_x[np.ix_(held, after_throw)] = in_x[last_input[held]][:, None]
+    path_y[np.ix_(held, after_throw)] = in_y[last_input[held]][:, None]
+
+    if len(out_frames):
+        # Past a player's last output frame, hold the last output position
+        last_output = np.full(n_players, -1, dtype=np.int64)
+        np.maximum.at(last_output, out_player, np.arange(len(out_player)))
+        has_output = last_output >= 0
+        last_output_frame = np.where(has_output, out_frames[np.maximum(last_output, 0)], 0)
+        beyond = has_output[:, None] & after_throw[None, :] & \
+            ((frames[None, :] - throw_frame) > last_output_frame[:, None])
+        rows, cols = np.nonzero(beyond)
+        path_x[rows, cols] = out_x[last_output[rows]]
+        path_y[rows, cols] = out_y[last_output[rows]]
+        path_output[rows, cols] = True
+
+        cols = throw_frame + out_frames - 1
+        path_x[out_player, cols] = out_x
+        path_y[out_player, cols] = out_y
+        path_output[out_player, cols] = True
+
+    # Recorded input frames take precedence
+    valid = (in_frames >= 1) & (in_frames <= total_frames)
+    path_x[in_player[valid], in_frames[valid] - 1] = in_x[valid]
+    path_y[in_player[valid], in_frames[valid] - 1] = in_y[valid]
+    path_output[in_player[valid], in_frames[valid] - 1] = False
+
+    flight = total_frames - throw_frame
+    flight_fraction = np.clip((frames - throw_frame) / flight, 0, 1) if flight > 0 else \
+        (frames >= throw_frame).astype(np.float64)
+    ball = {
+        'visible_from': throw_frame,
+        'x': _rounded_list(ball_throw[0] + (ball_land[0] - ball_throw[0]) * flight_fraction, decimals),
+        'y': _rounded_list(ball_throw[1] + (ball_land[1] - ball_throw[1]) * flight_fraction, decimals)
+    }
+    return total_frames, ball, path_x, path_y, path_output
+
+def _path_list(values, decimals=TRACKING_DECIMALS):
+    """Rounded positions with None where the player is not drawn."""
+    missing = np.isnan(values)
+    rounded = _rounded_list(np.where(missing, 0, values), decimals)
+    return [None if m else v for v, m in zip(rounded, missing.tolist())] if missing.any() else rounded
+
+def _add_timeline(record, inp, s, e, out_nfl_ids, out_frames, out_x, out_y, out_bounds,
+                  decimals=TRACKING_DECIMALS):
+    """
+    Attach total_frames, the ball flight and each player's post-throw path to a columnar record.
+
+    Up to the throw, players are drawn from their own x/y arrays, so the path only covers
+    frames throw_frame+1..total_frames (path['start'] is the first): output positions, or
+    the held last output/input position. Decimated players get a path too.
+    """
+    nfl_ids = inp['nfl_id'][s:e]
+    player_ids, in_player = np.unique(nfl_ids, return_inverse=True)
+    os_, oe = out_bounds if out_bounds is not None else (0, 0)
+    out_ids = out_nfl_ids[os_:oe]
+    # Output rows for players without input rows cannot be drawn
+    known = np.isin(out_ids, player_ids)
+    out_player = np.searchsorted(player_ids, out_ids[known])
+
+    total_frames, ball, path_x, path_y, path_output = _play_timeline(
+        in_player, inp['frame_id'][s:e].astype(np.int64),
+        inp['x'][s:e].astype(np.float64), inp['y'][s:e].astype(np.float64),
+        out_player, out_frames[os_:oe][known].astype(np.int64),
+        out_x[os_:oe][known], out_y[os_:oe][known],
+        len(player_ids), record['throw_frame'],
+        (record['ball_throw_x'], record['ball_throw_y']),
+        (record['ball_land_x'], record['ball_land_y']),
+        decimals
+    )
+
+    record['total_frames'] = total_frames
+    record['ball'] = ball
+    tail = slice(record['throw_frame'], total_frames)
+    for i, nfl_id in enumerate(player_ids.tolist()):
+        record['players'][str(nfl_id)]['path'] = {
+            'start': record['throw_frame'] + 1,
+            'x': _path_list(path_x[i, tail], decimals),
+            'y': _path_list(path_y[i, tail], decimals),
+            'output': path_output[i, tail].astype(np.int8).tolist()
+        }
+
+def build_play_records(input_df, output_df, plays=None, supplementary=None,
+                       include_predictions=True, layout='rows', precision=None, decimation=None):
+    """
+    Build play file dicts for many plays in one pass.
+
+    Input and output tracking are sorted once by (game_id, play_id, nfl_id, frame_id);
+    each play and each player is then a contiguous slice of bulk-converted column lists.
+
+    Args:
+        input_df: Pre-throw tracking rows (optionally with prediction columns)
+        output_df: Post-throw tracking rows
+        plays: Optional (game_id, play_id) pairs to export, in order
+            (list of tuples or DataFrame with game_id/play_id). All plays if None.
+        supplementary: Optional DataFrame indexed by (game_id, play_id)
+        include_predictions: Add per-frame model outputs when present
+        layout: 'rows' for the original per-frame objects, or 'columnar' for
+            per-player arrays (x, y, s, a, dir, o rounded to tracking precision,
+            predictions as arrays with null where missing) plus the precomputed
+            ball flight and per-player paths over the post-throw frames
+        precision: Columnar only: decimal places per value group, merged over
+            DEFAULT_PRECISION (e.g. COMPACT_PRECISION)
+        decimation: Columnar only: {'step': k, 'positions': [...]} to keep every k-th
+            frame of players at those positions (e.g. DEFAULT_DECIMATION)
+
+    Yields:
+        Play dicts in the requested layout
+    """
+    if layout not in PLAY_LAYOUTS:
+        raise ValueError(f"Unknown play layout '{layout}', expected one of {PLAY_LAYOUTS}")
+    digits = _resolve_precision(precision)
+
+    if plays is not None:
+        if isinstance(plays, pd.DataFrame):
+            plays = list(zip(plays['game_id'].astype(int), plays['play_id'].astype(int)))
+        else:
+            plays = [(int(g), int(p)) for g, p in plays]
+        wanted = pd.MultiIndex.from_tuples(plays, names=PLAY_KEYS) if plays else None
+        input_df = input_df[_play_keys_index(input_df).isin(wanted)] if plays else input_df.iloc[0:0]
+        output_df = output_df[_play_keys_index(output_df).isin(wanted)] if plays else output_df.iloc[0:0]
+
+    sort_keys = PLAY_KEYS + ['nfl_id', 'frame_id']
+    input_df = input_df.sort_values(sort_keys, kind='stable')
+    output_df = output_df.sort_values(sort_keys, kind='stable')
+
+    # Column arrays (for vector ops) and lists (for fast Python scalars), converted once
+    inp = {col: input_df[col].to_numpy() for col in sort_keys + TRACKING_FIELDS}
+    for col in ['player_name', 'player_position', 'player_side', 'play_direction']:
+        inp[col] = input_df[col].astype(object).to_numpy()
+    for col in ['absolute_yardline_number', 'ball_land_x', 'ball_land_y', 'num_frames_output']:
+        inp[col] = input_df[col].to_numpy(dtype=np.float64)
+    lists = {col: input_df[col].tolist() for col in ['frame_id'] + TRACKING_FIELDS}
+    lists['frame_id'] = [int(f) for f in lists['frame_id']]
+    prediction_fields = [col for col in PREDICTION_FIELDS if col in input_df.columns]
+    if not include_predictions:
+        prediction_fields = []
+    for col in prediction_fields:
+        values = input_df[col].to_numpy(dtype=np.float64)
+        inp[col] = values
+        lists[col] = values.tolist()
+        lists[col + '_present'] = (~np.isnan(values)).tolist()
+
+    out_frame_array = output_df['frame_id'].to_numpy()
+    out_x_array = output_df['x'].to_numpy(dtype=np.float64)
+    out_y_array = output_df['y'].to_numpy(dtype=np.float64)
+    out_frame_ids = [int(f) for f in out_frame_array.tolist()]
+    out_x = output_df['x'].tolist()
+    out_y = output_df['y'].tolist()
+    out_nfl_ids = output_df['nfl_id'].to_numpy()
+
+    # Play and player boundaries
+    play_starts, play_ends = group_bounds([inp['game_id'], inp['play_id']])
+    player_starts, _ = group_bounds([inp['game_id'], inp['play_id'], inp['nfl_id']])
+    play_bounds = {
+        (int(inp['game_id'][s]), int(inp['play_id'][s])): (s, e)
+        for s, e in zip(play_starts, play_ends)
+    }
+
+    out_keys = [output_df['game_id'].to_numpy(), output_df['play_id'].to_numpy()]
+    out_play_starts, out_play_ends = group_bounds(out_keys)
+    out_player_starts, _ = group_bounds(out_keys + [out_nfl_ids])
+    out_play_bounds = {
+        (int(out_keys[0][s]), int(out_keys[1][s])): (s, e)
+        for s, e in zip(out_play_starts, out_play_ends)
+    }
+
+    if plays is None:
+        plays = list(play_bounds.keys())
+
+    for game_id, play_id in plays:
+        if (game_id, play_id) not in play_bounds:
+            print(f"  Warning: No data found for game {game_id}, play {play_id}, skipping...")
+            continue
+        s, e = play_bounds[(game_id, play_id)]
+
+        frame_ids = inp['frame_id'][s:e]
+        max_frame = int(frame_ids.max())
+        # The throw happens at the last frame of input data
+        throw_frame = max_frame
+        ball_throw_x, ball_throw_y = _throw_point(
+            inp['player_position'][s:e], inp['player_side'][s:e],
+            frame_ids, inp['x'][s:e], inp['y'][s:e], throw_frame
+        )
+
+        # Players are contiguous runs inside the play slice
+        lo, hi = np.searchsorted(player_starts, [s, e])
+        bounds = list(player_starts[lo:hi]) + [e]
+        players_data = {}
+        for ps, pe in zip(bounds[:-1], bounds[1:]):
+            nfo = inp['num_frames_output'][ps:pe]
+            nfo = nfo[~np.isnan(nfo)]
+            player = {
+                'name': inp['player_name'][ps],
+                'position': inp['player_position'][ps],
+                'side': inp['player_side'][ps]
+            }
+
+            if layout == 'columnar':
+                player['num_frames_output'] = int(nfo[0]) if len(nfo) > 0 else None
+                keep = _decimated_indices(pe - ps, player['position'], decimation)
+                rows = slice(ps, pe) if keep is None else ps + keep
+                player.update(_columnar_frames(inp['frame_id'][rows]))
+                if keep is not None:
+                    player['frame_step'] = int(decimation['step'])
+                for col in TRACKING_FIELDS:
+                    player[col] = _rounded_list(inp[col][rows], digits[FIELD_PRECISION[col]])
+                for col in prediction_fields:
+                    values = inp[col][rows]
+                    missing = np.isnan(values)
+                    if missing.all():
+                        continue
+                    rounded = _rounded_list(np.where(missing, 0, values), digits[FIELD_PRECISION[col]])
+                    player[col] = [None if m else v for v, m in zip(rounded, missing.tolist())] \
+                        if missing.any() else rounded
+                players_data[str(inp['nfl_id'][ps])] = player
+                continue
+
+            frames = [
+                {'frame_id': f, 'x': x, 'y': y, 's': sp, 'a': ac, 'dir': d, 'o': o}
+                for f, x, y, sp, ac, d, o in zip(
+                    lists['frame_id'][ps:pe], lists['x'][ps:pe], lists['y'][ps:pe],
+                    lists['s'][ps:pe], lists['a'][ps:pe], lists['dir'][ps:pe], lists['o'][ps:pe]
+                )
+            ]
+            for col in prediction_fields:
+                for frame, value, present in zip(frames, lists[col][ps:pe], lists[col + '_present'][ps:pe]):
+                    if present:
+                        frame[col] = value
+
+            player['frames'] = frames
+            player['num_frames_output'] = int(nfo[0]) if len(nfo) > 0 else None
+            players_data[str(inp['nfl_id'][ps])] = player
+
+        output_players_data = {}
+        if (game_id, play_id) in out_play_bounds:
+            os_, oe = out_play_bounds[(game_id, play_id)]
+            lo, hi = np.searchsorted(out_player_starts, [os_, oe])
+            bounds = list(out_player_starts[lo:hi]) + [oe]
+            for ps, pe in zip(bounds[:-1], bounds[1:]):
+                if layout == 'columnar':
+                    input_player = players_data.get(str(out_nfl_ids[ps]))
+                    position = input_player['position'] if input_player else None
+                    keep = _decimated_indices(pe - ps, position, decimation)
+                    rows = slice(ps, pe) if keep is None else ps + keep
+                    output_player = _columnar_frames(out_frame_array[rows])
+                    if keep is not None:
+                        output_player['frame_step'] = int(decimation['step'])
+                    output_player['x'] = _rounded_list(out_x_array[rows], digits['position'])
+                    output_player['y'] = _rounded_list(out_y_array[rows], digits['position'])
+                    output_players_data[str(out_nfl_ids[ps])] = output_player
+                    continue
+                output_players_data[str(out_nfl_ids[ps])] = {
+                    'frames': [
+                        {'frame_id': f, 'x': x, 'y': y}
+                        for f, x, y in zip(out_frame_ids[ps:pe], out_x[ps:pe], out_y[ps:pe])
+                    ]
+                }
+
+        supp_row = None
+        if supplementary is not None and (game_id, play_id) in supplementary.index:
+            supp_row = supplementary.loc[(game_id, play_id)]
+
+        record = {
+            'game_id': game_id,
+            'play_id': play_id,
+            'play_direction': inp['play_direction'][s],
+            'absolute_yardline': float(inp['absolute_yardline_number'][s]),
+            'ball_throw_x': ball_throw_x,
+            'ball_throw_y': ball_throw_y,
+            'throw_frame': throw_frame,
+            'ball_land_x': float(inp['ball_land_x'][s]),
+            'ball_land_y': float(inp['ball_land_y'][s]),
+            'max_frame': max_frame,
+            'players': players_data,
+            'output_players': output_players_data,
+            'supplementary': supplementary_record(supp_row)
+        }
+        if layout == 'columnar':
+            record = {'format_version': COLUMNAR_FORMAT_VERSION, 'layout': 'columnar', **record}
+            if digits['landing'] is not None:
+                for field in ['ball_throw_x', 'ball_throw_y', 'ball_land_x', 'ball_land_y']:
+                    if record[field] is not None:
+                        record[field] = round(record[field], digits['landing'])
+            _add_timeline(record, inp, s, e, out_nfl_ids, out_frame_array, out_x_array, out_y_array,
+                          out_play_bounds.get((game_id, play_id)), digits['position'])
+        yield record
+
+def compute_play_summaries(input_df, supplementary=None, plays=None):
+    """
+    Per-play summary fields for manifests, computed with whole-table groupbys.
+
+    The optimal target follows analyze_qb_optimal_decisions: the eligible receiver
+    with the highest expected yards at the throw frame (the last input frame).
+
+    Args:
+        input_df: Pre-throw tracking rows (prediction columns optional)
+        supplementary: Optional DataFrame indexed by (game_id, play_id)
+        plays: Optional (game_id, play_id) pairs to restrict to
+
+    Returns:
+        Dict mapping (game_id, play_id) to a summary dict with max_frame,
+        time_to_throw, passer_name, targeted_nfl_id, targeted_expected_yards,
+        best_expected_yards, optimal_nfl_id, is_optimal, pass_result,
+        team_coverage_type, down and yards_to_go (None where unavailable)
+    """
+    if plays is not None:
+        if isinstance(plays, pd.DataFrame):
+            plays = list(zip(plays['game_id'].astype(int), plays['play_id'].astype(int)))
+        wanted = pd.MultiIndex.from_tuples([(int(g), int(p)) for g, p in plays], names=PLAY_KEYS)
+        input_df = input_df[_play_keys_index(input_df).isin(wanted)]
+
+    has_predictions = 'expected_yards' in input_df.columns
+    columns = PLAY_KEYS + ['nfl_id', 'frame_id', 'player_name', 'player_side',
+                           'player_position', 'player_role']
+    df = input_df[columns + (['expected_yards'] if has_predictions else [])]
+
+    summary = df.groupby(PLAY_KEYS)['frame_id'].max().rename('max_frame').to_frame()
+    summary['time_to_throw'] = ((summary['max_frame'] - 1) / FRAMES_PER_SECOND).round(1)
+
+    at_throw = df.merge(summary['max_frame'].reset_index(), on=PLAY_KEYS)
+    at_throw = at_throw[at_throw['frame_id'] == at_throw['max_frame']]
+
+    passers = (
+        df.loc[df['player_role'] == 'Passer', PLAY_KEYS + ['player_name']]
+        .drop_duplicates(PLAY_KEYS)
+        .set_index(PLAY_KEYS)['player_name']
+    )
+    summary['passer_name'] = passers
+
+    targeted = (
+        at_throw.loc[at_throw['player_role'] == 'Targeted Receiver']
+        .drop_duplicates(PLAY_KEYS)
+        .set_index(PLAY_KEYS)
+    )
+    summary['targeted_nfl_id'] = targeted['nfl_id']
+
+    if has_predictions:
+        summary['targeted_expected_yards'] = targeted['expected_yards']
+        receivers = at_throw[
+            (at_throw['player_side'] == 'Offense') &
+            (at_throw['player_position'].isin(RECEIVER_POSITIONS)) &
+            at_throw['expected_yards'].notna()
+        ]
+        best = (
+            receivers.sort_values(PLAY_KEYS + ['expected_yards'], ascending=[True, True, False],
+                                  kind='stable')
+            .drop_duplicates(PLAY_KEYS)
+            .set_index(PLAY_KEYS)
+        )
+        summary['best_expected_yards'] = best['expected_yards']
+        summary['optimal_nfl_id'] = best['nfl_id']
+        summary['is_optimal'] = (summary['optimal_nfl_id'] == summary['targeted_nfl_id']).where(
+            summary['optimal_nfl_id'].notna() & summary['targeted_nfl_id'].notna()
+        )
+
+    if supplementary is not None:
+        for col in ['pass_result', 'team_coverage_type', 'down', 'yards_to_go']:
+            if col in supplementary.columns:
+                summary[col] = supplementary[col].reindex(summary.index)
+
+    def value(v, cast):
+        return cast(v) if pd.notna(v) else None
+
+    casts = {
+        'max_frame': int, 'time_to_throw': float, 'passer_name': str,
+        'targeted_nfl_id': int, 'targeted_expected_yards': _rounded_float,
+        'best_expected_yards': _rounded_float, 'optimal_nfl_id': int, 'is_optimal': bool,
+        'pass_result': str, 'team_coverage_type': str, 'down': int, 'yards_to_go': int
+    }
+    summary = summary.astype(object)
+    return {
+        (int(key[0]), int(key[1])): {
+            field: value(row[field], cast) if field in row else None
+            for field, cast in casts.items()
+        }
+        for key, row in zip(summary.index, summary.to_dict('records'))
+    }
+
+def play_filename(out_dir, game_id, play_id):
+    """Path of a play file inside an export directory."""
+    return f'{out_dir}/play_{game_id}_{play_id}.json'
+
+def serialize_play(record):
+    """Encode one play dict as JSON bytes (compact separators for columnar files)."""
+    if record.get('layout') == 'columnar':
+        text = json.dumps(record, separators=(',', ':'))
+    else:
+        text = json.dumps(record, indent=2)
+    return text.encode('utf-8')
+
+def write_play_file(record, filename):
+    """Write one play dict as JSON."""
+    with open(filename, 'wb') as f:
+        f.write(serialize_play(record))
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+# Suffix of each precompressed copy of a play file
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'brotli': '.br'}
+
+def _compressed_paths(filename):
+    paths = {'gzip': filename + COMPRESSED_SUFFIXES['gzip']}
+    if brotli is not None:
+        paths['brotli'] = filename + COMPRESSED_SUFFIXES['brotli']
+    return paths
+
+def _assets_present(filename, entry):
+    """
+    Whether every file recorded in a manifest entry is still on disk with its recorded
+    size: the play file and each precompressed copy ({encoding}_bytes fields).
+    """
+    paths = {'bytes': filename}
+    for encoding, suffix in COMPRESSED_SUFFIXES.items():
+        if f'{encoding}_bytes' in entry:
+            paths[f'{encoding}_bytes'] = filename + suffix
+    try:
+        return all(os.path.getsize(path) == entry[field] for field, path in paths.items())
+    except OSError:
+        return False
+
+def write_play_asset(record, filename, precompress=True):
+    """
+    Write a play file (and optionally .gz/.br copies) unless an identical file exists.
+
+    The serialized bytes are hashed first; if the file on disk already has the same
+    content (and its compressed copies exist), nothing is rewritten or recompressed.
+    Brotli copies are only written when the brotli package is installed.
+
+    Args:
+        record: Play dict
+        filename: Output path for the JSON file
+        precompress: Also write gzip/brotli copies next to the file
+
+    Returns:
+        Manifest fields for the file: bytes, sha256, gzip_bytes/brotli_bytes
+        (when precompressed) and whether anything was written
+    """
+    data = serialize_play(record)
+    digest = _sha256(data)
+    compressed_paths = _compressed_paths(filename) if precompress else {}
+
+    unchanged = (
+        os.path.exists(filename)
+        and os.path.getsize(filename) == len(data)
+        and all(os.path.exists(path) for path in compressed_paths.values())
+    )
+    if unchanged:
+        with open(filename, 'rb') as f:
+            unchanged = _sha256(f.read()) == digest
+
+    if not unchanged:
+        with open(filename, 'wb') as f:
+            f.write(data)
+        if 'gzip' in compressed_paths:
+            with open(compressed_paths['gzip'], 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if 'brotli' in compressed_paths:
+            with open(compressed_paths['brotli'], 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+
+    info = {'bytes': len(data), 'sha256': digest}
+    for encoding, path in compressed_paths.items():
+        info[f'{encoding}_bytes'] = os.path.getsize(path)
+    info['written'] = not unchanged
+    return info
+
+@timed('export')
+def export_plays(input_df, output_df, out_dir, plays=None, supplementary=None, layout='rows',
+                 precompress=False, precision=None, decimation=None):
+    """
+    Export plays to JSON files in one pass over the tracking data.
+
+    Args:
+        input_df: Pre-throw tracking rows (optionally with prediction columns)
+        output_df: Post-throw tracking rows
+        out_dir: Directory for play files (created if missing)
+        plays: Optional (game_id, play_id) pairs to export (all plays if None)
+        supplementary: Optional DataFrame indexed by (game_id, play_id)
+        layout: Play file layout, 'rows' or 'columnar'
+        precompress: Write .gz (and .br when brotli is installed) copies of each file
+        precision: Columnar decimal places per value group (see DEFAULT_PRECISION)
+        decimation: Columnar frame decimation for non-focus players (see DEFAULT_DECIMATION)
+
+    Returns:
+        List of manifest entries (game_id, play_id, filename, bytes, sha256,
+        compressed sizes and a per-play summary) for the exported plays. Plays whose
+        file content is unchanged are not rewritten.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    add_rows(len(input_df))
+    with stage('summaries'):
+        summaries = compute_play_summaries(input_df, supplementary=supplementary, plays=plays)
+
+    manifest = []
+    skipped = 0
+    records = build_play_records(input_df, output_df, plays=plays, supplementary=supplementary,
+                                 layout=layout, precision=precision, decimation=decimation)
+    for record in progress(records, total=len(summaries), verb='Exported'):
+        filename = play_filename(out_dir, record['game_id'], record['play_id'])
+        info = write_play_asset(record, filename, precompress=precompress)
+        skipped += not info.pop('written')
+        manifest.append({
+            'game_id': record['game_id'],
+            'play_id': record['play_id'],
+            'filename': filename,
+            **info,
+            'summary': summaries.get((record['game_id'], record['play_id']))
+        })
+
+    if skipped:
+        print(f"  Skipped {skipped} unchanged plays")
+
+    return manifest
+
+# Per-directory record of which source rows produced each play file
+EXPORT_STATE_FILE = '.export_state.json'
+
+def _play_source_hashes(input_df, output_df, supplementary, options):
+    """
+    Hash each play's source rows (input, output, supplementary) plus export options.
+
+    Row hashes come from one vectorized hash_pandas_object call per table; each play's
+    hash is a SHA-256 over its contiguous slice of row hashes.
+
+    Returns:
+        Tuple of (source_hashes, input_bounds, output_bounds), each a dict keyed by
+        (game_id, play_id); bounds are (start, end) offsets into the sorted frames
+    """
+    option_bytes = json.dumps(options, sort_keys=True).encode('utf-8')
+
+    def bounds_and_hashes(df):
+        keys = [df['game_id'].to_numpy(), df['play_id'].to_numpy()]
+        starts, ends = group_bounds(keys)
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        bounds = {(int(keys[0][s]), int(keys[1][s])): (s, e) for s, e in zip(starts, ends)}
+        return bounds, row_hashes
+
+    input_bounds, input_hashes = bounds_and_hashes(input_df)
+    output_bounds, output_hashes = bounds_and_hashes(output_df)
+
+    source_hashes = {}
+    for key, (s, e) in input_bounds.items():
+        digest = hashlib.sha256(option_bytes)
+        digest.update(input_hashes[s:e].tobytes())
+        if key in output_bounds:
+            os_, oe = output_bounds[key]
+            digest.update(output_hashes[os_:oe].tobytes())
+        if supplementary is not None and key in supplementary.index:
+            supp = supplementary_record(supplementary.loc[key])
+            digest.update(json.dumps(supp, sort_keys=True).encode('utf-8'))
+        source_hashes[key] = digest.hexdigest()
+
+    return source_hashes, input_bounds, output_bounds
+
+def _export_batch(args):
+    """Worker: export one batch of pre-grouped plays. Returns (key, manifest entry) pairs."""
+    (input_rows, output_rows, supplementary, plays, out_dir, layout, precompress,
+     precision, decimation) = args
+    results = []
+    records = build_play_records(input_rows, output_rows, plays=plays, supplementary=supplementary,
+                                 layout=layout, precision=precision, decimation=decimation)
+    for record in records:
+        filename = play_filename(out_dir, record['game_id'], record['play_id'])
+        info = write_play_asset(record, filename, precompress=precompress)
+        info.pop('written')
+        results.append(((record['game_id'], record['play_id']), {
+            'game_id': record['game_id'],
+            'play_id': record['play_id'],
+            'filename': filename,
+            **info
+        }))
+    return results
+
+@timed('export_parallel')
+def export_plays_parallel(input_df, output_df, out_dir, plays=None, supplementary=None,
+                          layout='rows', precompress=False, workers=None, precision=None,
+                          decimation=None):
+    """
+    Export plays across a process pool, skipping plays whose sources are unchanged.
+
+    Each play's source rows are hashed in the parent. Plays whose hash matches the
+    one recorded in out_dir/.export_state.json (and whose file still exists) are
+    skipped without being rebuilt. The rest are split into row-balanced batches;
+    each worker receives only its own plays' rows and supplementary entries.
+    The manifest and state file are written at the end in a deterministic order.
+
+    Args:
+        input_df: Pre-throw tracking rows (optionally with prediction columns)
+        output_df: Post-throw tracking rows
+        out_dir: Directory for play files (created if missing)
+        plays: Optional (game_id, play_id) pairs to export (all plays if None)
+        supplementary: Optional DataFrame indexed by (game_id, play_id)
+        layout: Play file layout, 'rows' or 'columnar'
+        precompress: Write .gz/.br copies of each play file
+        workers: Number of worker processes (defaults to os.cpu_count())
+        precision: Columnar decimal places per value group (see DEFAULT_PRECISION)
+        decimation: Columnar frame decimation for non-focus players (see DEFAULT_DECIMATION)
+
+    Returns:
+        List of manifest entries with per-play summaries, in the order of plays
+        (sorted by key if plays is None)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    add_rows(len(input_df))
+
+    sort_keys = PLAY_KEYS + ['nfl_id', 'frame_id']
+    input_df = input_df.sort_values(sort_keys, kind='stable').reset_index(drop=True)
+    output_df = output_df.sort_values(sort_keys, kind='stable').reset_index(drop=True)
+
+    options = {'layout': layout, 'precompress': precompress, 'version': COLUMNAR_FORMAT_VERSION,
+               'precision': _resolve_precision(precision), 'decimation': decimation}
+    source_hashes, input_bounds, output_bounds = _play_source_hashes(
+        input_df, output_df, supplementary, options
+    )
+
+    if plays is None:
+        plays = sorted(input_bounds.keys())
+    elif isinstance(plays, pd.DataFrame):
+        plays = list(zip(plays['game_id'].astype(int), plays['play_id'].astype(int)))
+    else:
+        plays = [(int(g), int(p)) for g, p in plays]
+
+    state_path = os.path.join(out_dir, EXPORT_STATE_FILE)
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+
+    entries = {}
+    pending = []
+    for key in plays:
+        if key not in input_bounds:
+            print(f"  Warning: No data found for game {key[0]}, play {key[1]}, skipping...")
+            continue
+        filename = play_filename(out_dir, *key)
+        previous = state.get(filename)
+        if (previous is not None and previous['source_hash'] == source_hashes[key]
+                and _assets_present(filename, previous['entry'])):
+            entries[key] = previous['entry']
+        else:
+            pending.append(key)
+
+    print(f"  {len(entries)} plays unchanged, {len(pending)} to export with {workers} workers")
+
+    # Row-balanced batches (largest plays first, each to the lightest batch)
+    n_batches = min(len(pending), workers * 4)
+    batches = [[] for _ in range(n_batches)]
+    batch_rows = [0] * n_batches
+    for key in sorted(pending, key=lambda k: input_bounds[k][0] - input_bounds[k][1]):
+        i = batch_rows.index(min(batch_rows))
+        batches[i].append(key)
+        batch_rows[i] += input_bounds[key][1] - input_bounds[key][0]
+
+    def batch_args(batch):
+        def rows(df, bounds):
+            ranges = [np.arange(*bounds[k]) for k in batch if k in bounds]
+            return df.iloc[np.concatenate(ranges)] if ranges else df.iloc[0:0]
+        supp = None
+        if supplementary is not None:
+            supp = supplementary[supplementary.index.isin(batch)]
+        return (rows(input_df, input_bounds), rows(output_df, output_bounds),
+                supp, batch, out_dir, layout, precompress, precision, decimation)
+
+    if batches:
+        with stage('workers'), ProcessPoolExecutor(max_workers=workers) as pool:
+            for results in pool.map(_export_batch, (batch_args(b) for b in batches)):
+                for key, entry in results:
+                    entries[key] = entry
+                    state[entry['filename']] = {'source_hash': source_hashes[key], 'entry': entry}
+                count('plays', len(results))
+
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+    # Summaries depend on more than the play file (e.g. predictions), so they are
+    # recomputed every run rather than stored in the export state
+    summaries = compute_play_summaries(input_df, supplementary=supplementary, plays=plays)
+    return [{**entries[key], 'summary': summaries.get(key)} for key in plays if key in entries]
+
+def _frame_ids(entry):
+    """Frame ids of a columnar player entry."""
+    if 'frame_ids' in entry:
+        return np.asarray(entry['frame_ids'], dtype=np.float64)
+    return np.arange(entry['frame_base'], entry['frame_base'] + entry['frame_count'], dtype=np.float64)
+
+def _max_position_error(reference, compact):
+    """Largest distance between reference positions and compact (interpolated) positions."""
+    if not reference['x']:
+        return 0.0
+    frames = _frame_ids(reference)
+    kept = _frame_ids(compact)
+    x = np.interp(frames, kept, compact['x'])
+    y = np.interp(frames, kept, compact['y'])
+    return float(np.hypot(x - np.asarray(reference['x']), y - np.asarray(reference['y'])).max())
+
+def precision_report(input_df, output_df, plays=None, supplementary=None,
+                     precision=COMPACT_PRECISION, decimation=DEFAULT_DECIMATION):
+    """
+    Bytes saved and positional error of a precision/decimation setting.
+
+    Every play is built three times: at full precision (reference positions), with the
+    default columnar settings (size baseline) and with the given settings. Decimated
+    players are linearly interpolated back to every frame, as the frontend does.
+
+    Returns:
+        Dict with plays, baseline_bytes, bytes, bytes_saved, percent_saved (plus the
+        gzip equivalents), max_position_error (yards, players) and max_ball_error
+        (yards, throw and landing points)
+    """
+    build = lambda **options: build_play_records(input_df, output_df, plays=plays,
+                                                 supplementary=supplementary, layout='columnar',
+                                                 **options)
+    totals = {'plays': 0, 'baseline_bytes': 0, 'bytes': 0, 'baseline_gzip_bytes': 0, 'gzip_bytes': 0}
+    max_position_error = 0.0
+    max_ball_error = 0.0
+
+    for reference, baseline, compact in zip(build(precision=FULL_PRECISION), build(),
+                                            build(precision=precision, decimation=decimation)):
+        baseline_data = serialize_play(baseline)
+        compact_data = serialize_play(compact)
+        totals['plays'] += 1
+        totals['baseline_bytes'] += len(baseline_data)
+        totals['bytes'] += len(compact_data)
+        totals['baseline_gzip_bytes'] += len(gzip.compress(baseline_data, compresslevel=9, mtime=0))
+        totals['gzip_bytes'] += len(gzip.compress(compact_data, compresslevel=9, mtime=0))
+
+        for group in ['players', 'output_players']:
+            for nfl_id, player in reference[group].items():
+                max_position_error = max(max_position_error,
+                                         _max_position_error(player, compact[group][nfl_id]))
+        for axis in ['x', 'y']:
+            for point in ['ball_throw', 'ball_land']:
+                field = f'{point}_{axis}'
+                if reference[field] is not None:
+                    max_ball_error = max(max_ball_error, abs(reference[field] - compact[field]))
+
+    baseline = totals['baseline_bytes']
+    report = {
+        **totals,
+        'bytes_saved': baseline - totals['bytes'],
+        'percent_saved': round((baseline - totals['bytes']) / baseline * 100, 2) if baseline else 0.0,
+        'gzip_bytes_saved': totals['baseline_gzip_bytes'] - totals['gzip_bytes'],
+        'max_position_error': round(max_position_error, 4),
+        'max_ball_error': round(max_ball_error, 4)
+    }
+
+    print(f"  Precision report over {report['plays']} plays:")
+    print(f"    JSON: {baseline:,} -> {report['bytes']:,} bytes ({report['percent_saved']:.1f}% saved)")
+    print(f"    gzip: {report['baseline_gzip_bytes']:,} -> {report['gzip_bytes']:,} bytes")
+    print(f"    Max player position error: {report['max_position_error']:.4f} yd")
+    print(f"    Max ball point error: {report['max_ball_error']:.4f} yd")
+    return report
+
+@timed('export_week')
+def export_week(week=1, out_dir='plays', season=2023, manifest_file=None, layout='rows',
+                precompress=False, workers=1, precision=None, decimation=None):
+    """
+    Export every play of a week in one pass.
+
+    Args:
+        week: Week number
+        out_dir: Directory for play files
+        season: Season year
+        manifest_file: Optional path to write the manifest JSON
+        layout: Play file layout, 'rows' or 'columnar'
+        precompress: Write .gz/.br copies of each play file
+        workers: Worker processes; above 1 uses export_plays_parallel
+        precision: Columnar decimal places per value group (see DEFAULT_PRECISION)
+        decimation: Columnar frame decimation for non-focus players (see DEFAULT_DECIMATION)
+
+    Returns:
+        List of manifest entries
+    """
+    print(f"Loading week {week} data...")
+    with stage('load'):
+        input_df = load_input(week=week, season=season)
+        output_df = load_output(week=week, season=season)
+        supplementary = supplementary_index(columns=SUPPLEMENTARY_EXPORT_COLUMNS)
+        add_rows(len(input_df) + len(output_df))
+
+    print(f"Exporting all plays to {out_dir}/...")
+    if workers > 1:
+        manifest = export_plays_parallel(input_df, output_df, out_dir, supplementary=supplementary,
+                                         layout=layout, precompress=precompress, workers=workers,
+                                         precision=precision, decimation=decimation)
+    else:
+        manifest = export_plays(input_df, output_df, out_dir, supplementary=supplementary,
+                                layout=layout, precompress=precompress, precision=precision,
+                                decimation=decimation)
+    print(f"Exported {len(manifest)} plays")
+
+    if layout == 'columnar' and (precision is not None or decimation is not None):
+        precision_report(input_df, output_df, supplementary=supplementary,
+                         precision=precision, decimation=decimation)
+
+    if manifest_file is not None:
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Manifest saved to {manifest_file}")
+
+    return manifest
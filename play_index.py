@@ -0,0 +1,260 @@
+import numpy as np
+import csv
+import io
+import json
+import os
+import re
+from data_paths import CACHE_DIR, SUPPLEMENTARY_FILE, input_path, output_path
+
+# Byte-offset index over the weekly CSVs: one entry per contiguous run of rows
+# belonging to a (game_id, play_id). Looking up a play reads only its byte ranges
+# (plus the header line) instead of parsing the whole file. Building and querying the
+# index needs only numpy; pandas is imported when rows are actually read.
+
+PLAY_OFFSET_DTYPE = np.dtype([
+    ('game_id', '<i8'),
+    ('play_id', '<i8'),
+    ('start', '<u8'),
+    ('end', '<u8')
+])
+
+# In-process memo: source path -> (fingerprint, header bytes, index array)
+_offset_index_cache = {}
+
+def _index_files(path):
+    """On-disk locations of a CSV's offset index and its metadata."""
+    key = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.normpath(str(path)))
+    directory = CACHE_DIR / key
+    return directory / 'play_offsets.npy', directory / 'play_offsets.json'
+
+def build_play_offset_index(path):
+    """
+    Scan a CSV once and record the byte range of every contiguous (game_id, play_id) run.
+
+    The weekly files are sorted by game and play, so each play is normally a single
+    run; unsorted files (e.g. supplementary data) simply produce more runs, and a
+    lookup reads all of them. Fields are assumed not to contain embedded newlines.
+
+    Args:
+        path: Path to a CSV with game_id and play_id columns
+
+    Returns:
+        Tuple of (header_bytes, index) where index is a PLAY_OFFSET_DTYPE array
+        sorted by (game_id, play_id, start)
+    """
+    runs = []
+    with open(path, 'rb') as f:
+        header = f.readline()
+        columns = next(csv.reader([header.decode('utf-8')]))
+        game_col = columns.index('game_id')
+        play_col = columns.index('play_id')
+        n_split = max(game_col, play_col) + 1
+
+        offset = len(header)
+        current = None
+        run_start = offset
+        for line in f:
+            fields = line.split(b',', n_split)
+            if b'"' in b','.join(fields[:n_split]):
+                # Quoted field before the keys: fall back to a real CSV parse of this line
+                fields = [v.encode('utf-8') for v in next(csv.reader([line.decode('utf-8')]))]
+            key = (int(fields[game_col]), int(fields[play_col]))
+            if key != current:
+                if current is not None:
+                    runs.append((current[0], current[1], run_start, offset))
+                current = key
+                run_start = offset
+            offset += len(line)
+        if current is not None:
+            runs.append((current[0], current[1], run_start, offset))
+
+    index = np.array(runs, dtype=PLAY_OFFSET_DTYPE)
+    index = index[np.lexsort((index['start'], index['play_id'], index['game_id']))]
+    return header, index
+
+def play_offset_index(path, rebuild=False):
+    """
+    Offset index for a CSV, built on first use and kept under CACHE_DIR.
+    The stored index is rebuilt whenever the source file's size or mtime changes.
+
+    Args:
+        path: Path to the CSV
+        rebuild: Force a rescan even if a valid index exists
+
+    Returns:
+        Tuple of (header_bytes, index)
+    """
+    path = str(path)
+    stat = os.stat(path)
+    fingerprint = [stat.st_size, stat.st_mtime_ns]
+
+    cached = _offset_index_cache.get(path)
+    if cached is not None and cached[0] == fingerprint and not rebuild:
+        return cached[1], cached[2]
+
+    index_file, meta_file = _index_files(path)
+    meta = None
+    if not rebuild:
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = None
+
+    if meta is not None and meta['fingerprint'] == fingerprint and index_file.exists():
+        header = meta['header'].encode('utf-8')
+        index = np.load(index_file)
+    else:
+        print(f"  Indexing {path}...")
+        header, index = build_play_offset_index(path)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        np.save(index_file, index)
+        with open(meta_file, 'w') as f:
+            json.dump({
+                'source': path,
+                'fingerprint': fingerprint,
+                'header': header.decode('utf-8'),
+                'runs': len(index),
+                'plays': len(np.unique(index[['game_id', 'play_id']]))
+            }, f, indent=2)
+
+    _offset_index_cache[path] = (fingerprint, header, index)
+    return header, index
+
+def play_byte_ranges(path, game_id, play_id):
+    """(start, end) byte ranges of one play's rows in a CSV (empty if the play is absent)."""
+    _, index = play_offset_index(path)
+    lo = np.searchsorted(index['game_id'], game_id, side='left')
+    hi = np.searchsorted(index['game_id'], game_id, side='right')
+    plays = index['play_id'][lo:hi]
+    first = lo + np.searchsorted(plays, play_id, side='left')
+    last = lo + np.searchsorted(plays, play_id, side='right')
+    return [(int(r['start']), int(r['end'])) for r in index[first:last]]
+
+def play_keys(path):
+    """
+    Distinct (game_id, play_id) pairs in a CSV, read from its offset index.
+
+    Returns:
+        Structured array with game_id and play_id fields, sorted by game then play
+    """
+    _, index = play_offset_index(path)
+    return np.unique(index[['game_id', 'play_id']])
+
+def matching_byte_ranges(path, games=None, plays=None):
+    """
+    Byte ranges of every run whose play matches the filters, in file order, with
+    adjacent runs merged so each contiguous block is read once.
+
+    Args:
+        path: Path to the CSV
+        games: Optional game_ids to keep
+        plays: Optional (game_id, play_id) pairs to keep
+
+    Returns:
+        List of (start, end) byte ranges
+    """
+    _, index = play_offset_index(path)
+    mask = np.ones(len(index), dtype=bool)
+    if games is not None:
+        mask &= np.isin(index['game_id'], np.asarray(list(games), dtype='<i8'))
+    if plays is not None:
+        wanted = np.array([(int(g), int(p)) for g, p in plays],
+                          dtype=[('game_id', '<i8'), ('play_id', '<i8')])
+        mask &= np.isin(index[['game_id', 'play_id']], wanted)
+    runs = np.sort(index[mask], order='start')
+
+    ranges = []
+    for start, end in zip(runs['start'].tolist(), runs['end'].tolist()):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return [tuple(r) for r in ranges]
+
+def _read_ranges(path, ranges, columns=None):
+    """Parse the header plus the given byte ranges of a CSV into a DataFrame."""
+    import pandas as pd
+    from data_loader import COLUMN_DTYPES
+
+    header, _ = play_offset_index(path)
+    chunks = [header]
+    with open(path, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            chunks.append(f.read(end - start))
+
+    names = next(csv.reader([header.decode('utf-8')]))
+    wanted = names if columns is None else columns
+    dtypes = {col: COLUMN_DTYPES[col] for col in wanted if col in COLUMN_DTYPES}
+    return pd.read_csv(io.BytesIO(b''.join(chunks)), usecols=columns, dtype=dtypes,
+                       low_memory=False)
+
+def load_play_rows(path, game_id, play_id, columns=None):
+    """
+    Read one play's rows from a CSV by seeking to its indexed byte ranges.
+
+    Args:
+        path: Path to the CSV
+        game_id: Game identifier
+        play_id: Play identifier
+        columns: Optional list of columns to return (all columns if None)
+
+    Returns:
+        DataFrame of the play's rows with declared dtypes (empty if the play is absent)
+    """
+    return _read_ranges(path, play_byte_ranges(path, game_id, play_id), columns)
+
+def load_matching_rows(path, games=None, plays=None, columns=None):
+    """
+    Read only the rows of the matching games/plays from a CSV (see matching_byte_ranges).
+
+    Returns:
+        DataFrame with declared dtypes (empty if nothing matches)
+    """
+    return _read_ranges(path, matching_byte_ranges(path, games=games, plays=plays), columns)
+
+def load_play(game_id, play_id, week=1, season=2023, supplementary_path=SUPPLEMENTARY_FILE):
+    """
+    Load everything for a single play without parsing the full weekly files.
+
+    Returns:
+        Tuple of (input_rows, output_rows, supplementary_rows); supplementary_rows is
+        None when the supplementary file is missing
+    """
+    input_rows = load_play_rows(input_path(week, season), game_id, play_id)
+    output_rows = load_play_rows(output_path(week, season), game_id, play_id)
+    supplementary_rows = None
+    if os.path.exists(supplementary_path):
+        supplementary_rows = load_play_rows(supplementary_path, game_id, play_id)
+    return input_rows, output_rows, supplementary_rows
+
+def index_weeks(weeks=range(1, 19), season=2023, supplementary_path=SUPPLEMENTARY_FILE):
+    """
+    Build (or refresh) the offset indexes for every weekly input/output CSV that exists.
+
+    Returns:
+        Dict mapping each indexed path to its number of plays
+    """
+    print("="*60)
+    print("Indexing weekly tracking files")
+    print("="*60)
+
+    paths = []
+    for week in weeks:
+        paths.extend([input_path(week, season), output_path(week, season)])
+    paths.append(supplementary_path)
+
+    summary = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        _, index = play_offset_index(path)
+        summary[path] = len(play_keys(path))
+        print(f"  {path}: {summary[path]:,} plays, {len(index):,} runs")
+
+    print(f"\nIndexed {len(summary)} files")
+    return summary
+
+if __name__ == '__main__':
+    index_weeks()
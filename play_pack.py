@@ -0,0 +1,194 @@
+import numpy as np
+import gzip
+import json
+import os
+import shutil
+import struct
+from data_loader import load_input, load_output, supplementary_index, SUPPLEMENTARY_EXPORT_COLUMNS
+from play_exporter import build_play_records, serialize_play
+from instrumentation import timed
+
+# Single-file play pack: every play of a week in one file with an offset index,
+# so any play can be read by (game_id, play_id) with one seek.
+#
+# Layout (version 2):
+#   header  (24 bytes)  magic, version, compression, play count, index offset
+#   index   (24 bytes per play, sorted by game_id, play_id)  game_id, play_id, length, offset
+#   bodies              one serialized play JSON per play (optionally gzip-compressed)
+# Version 1 packs had the index after the bodies; the header's index offset covers both.
+
+PACK_MAGIC = b'PLAYPACK'
+PACK_VERSION = 2
+READABLE_PACK_VERSIONS = (1, 2)
+HEADER_FORMAT = '<8sHHIQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+COMPRESSION_CODES = {None: 0, 'gzip': 1}
+
+INDEX_DTYPE = np.dtype([
+    ('game_id', '<i8'),
+    ('play_id', '<i4'),
+    ('length', '<u4'),
+    ('offset', '<u8')
+])
+
+PACK_FILE_PATTERN = 'play_packs/plays_{season}_w{week:02d}.pack'
+
+def write_play_pack(records, path, compression='gzip'):
+    """
+    Write play dicts into a single pack file.
+
+    Bodies are streamed to a temporary file as they are produced; the header and index
+    are then written up front, followed by the bodies, into another temporary file that
+    replaces path in one step. An interrupted export never leaves a partial pack behind.
+
+    Args:
+        records: Iterable of play dicts (e.g. from build_play_records)
+        path: Output pack path
+        compression: 'gzip' to compress each play body, or None
+
+    Returns:
+        Number of plays written
+    """
+    if compression not in COMPRESSION_CODES:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {list(COMPRESSION_CODES)}")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    bodies_path = f'{path}.bodies.tmp'
+    tmp_path = f'{path}.tmp'
+    entries = []
+    try:
+        with open(bodies_path, 'wb') as bodies:
+            offset = 0
+            for record in records:
+                body = serialize_play(record)
+                if compression == 'gzip':
+                    body = gzip.compress(body, compresslevel=6, mtime=0)
+                bodies.write(body)
+                entries.append((record['game_id'], record['play_id'], len(body), offset))
+                offset += len(body)
+
+        index = np.array(entries, dtype=INDEX_DTYPE)
+        index = index[np.lexsort((index['play_id'], index['game_id']))]
+        index['offset'] += HEADER_SIZE + index.nbytes
+
+        with open(tmp_path, 'wb') as f, open(bodies_path, 'rb') as bodies:
+            f.write(struct.pack(HEADER_FORMAT, PACK_MAGIC, PACK_VERSION,
+                                COMPRESSION_CODES[compression], len(index), HEADER_SIZE))
+            f.write(index.tobytes())
+            shutil.copyfileobj(bodies, f, 1 << 20)
+        os.replace(tmp_path, path)
+    finally:
+        for leftover in (bodies_path, tmp_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return len(entries)
+
+class PlayPack:
+    """
+    Random-access reader for a play pack.
+
+    The index is loaded once on open; each play is then one seek and one read.
+
+    Usage:
+        with PlayPack('play_packs/plays_2023_w01.pack') as pack:
+            play = pack.read(2023090700, 101)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, version, compression, count, index_offset = struct.unpack(
+            HEADER_FORMAT, self._file.read(HEADER_SIZE)
+        )
+        if magic != PACK_MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a play pack")
+        if version not in READABLE_PACK_VERSIONS:
+            self._file.close()
+            raise ValueError(f"Unsupported play pack version {version} in {path}")
+
+        self.compression = {code: name for name, code in COMPRESSION_CODES.items()}[compression]
+        self._file.seek(index_offset)
+        self.index = np.frombuffer(self._file.read(count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return self._find(*key) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def keys(self):
+        """All (game_id, play_id) pairs in the pack, sorted."""
+        return list(zip(self.index['game_id'].tolist(), self.index['play_id'].tolist()))
+
+    def _find(self, game_id, play_id):
+        """Binary search of the sorted index; returns the entry position or None."""
+        lo = np.searchsorted(self.index['game_id'], game_id, side='left')
+        hi = np.searchsorted(self.index['game_id'], game_id, side='right')
+        pos = lo + np.searchsorted(self.index['play_id'][lo:hi], play_id)
+        if pos < hi and self.index['play_id'][pos] == play_id:
+            return pos
+        return None
+
+    def read_bytes(self, game_id, play_id):
+        """Raw (uncompressed) JSON bytes of one play."""
+        pos = self._find(game_id, play_id)
+        if pos is None:
+            raise KeyError((game_id, play_id))
+        entry = self.index[pos]
+        self._file.seek(int(entry['offset']))
+        body = self._file.read(int(entry['length']))
+        if self.compression == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def read(self, game_id, play_id):
+        """One play as a dict."""
+        return json.loads(self.read_bytes(game_id, play_id))
+
+@timed('export_week_pack')
+def export_week_pack(week=1, season=2023, path=None, layout='columnar', compression='gzip'):
+    """
+    Export every play of a week into one play pack.
+
+    Args:
+        week: Week number
+        season: Season year
+        path: Output pack path (defaults to PACK_FILE_PATTERN)
+        layout: Play layout inside the pack, 'rows' or 'columnar'
+        compression: 'gzip' or None
+
+    Returns:
+        Path of the written pack
+    """
+    if path is None:
+        path = PACK_FILE_PATTERN.format(season=season, week=week)
+
+    print(f"Loading week {week} data...")
+    input_df = load_input(week=week, season=season)
+    output_df = load_output(week=week, season=season)
+    supplementary = supplementary_index(columns=SUPPLEMENTARY_EXPORT_COLUMNS)
+
+    print(f"Writing play pack to {path}...")
+    records = build_play_records(input_df, output_df, supplementary=supplementary, layout=layout)
+    count = write_play_pack(records, path, compression=compression)
+
+    print(f"Packed {count} plays ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return path
+
+if __name__ == '__main__':
+    export_week_pack(week=1)
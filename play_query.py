@@ -0,0 +1,194 @@
+import pandas as pd
+import numpy as np
+import os
+from data_loader import load_input, load_supplementary, load_optimal_flags, input_path, optimal_decisions_path
+
+# Situational play selection over supplementary data and analysis results.
+# Categorical columns are indexed as one boolean bitmap per value and numeric columns
+# as a sorted order, so a query is a handful of bitmap ANDs/ORs and binary searches.
+
+# Supplementary columns indexed for queries
+QUERY_SUPPLEMENTARY_COLUMNS = [
+    'season', 'week', 'down', 'yards_to_go', 'yardline_side', 'yardline_number',
+    'possession_team', 'defensive_team', 'team_coverage_type',
+    'offense_formation', 'pass_result'
+]
+
+# Columns answered from per-value bitmaps
+CATEGORICAL_COLUMNS = [
+    'season', 'week', 'down', 'possession_team', 'defensive_team', 'team_coverage_type',
+    'offense_formation', 'pass_result', 'is_optimal', 'available'
+]
+
+# Columns answered from sorted value arrays (equality or inclusive ranges)
+NUMERIC_COLUMNS = ['yards_to_go', 'yardline_number', 'yards_to_endzone']
+
+def yards_to_endzone(plays):
+    """Distance from the line of scrimmage to the defense's end zone (NaN if unknown)."""
+    number = plays['yardline_number']
+    distance = pd.Series(np.nan, index=plays.index, dtype='float64')
+    defense_side = plays['yardline_side'] == plays['defensive_team']
+    offense_side = plays['yardline_side'] == plays['possession_team']
+    distance[defense_side] = number[defense_side]
+    distance[offense_side] = 100 - number[offense_side]
+    # Midfield has no side
+    distance[number == 50] = 50.0
+    return distance
+
+class PlayQuery:
+    """
+    Indexed play selector.
+
+    Usage:
+        query = build_play_query(weeks=[1])
+        red_zone = query.select(yards_to_endzone=(None, 20), pass_result='C',
+                                is_optimal=True, available=True)
+
+    Criteria (combined with AND):
+        categorical column = value       -> equality
+        categorical column = [v1, v2]    -> any of the values
+        numeric column = value           -> equality
+        numeric column = (low, high)     -> inclusive range, None for an open end
+    """
+
+    def __init__(self, plays):
+        """
+        Args:
+            plays: DataFrame with one row per play: game_id, play_id and the query columns
+        """
+        self.plays = plays.reset_index(drop=True)
+        self.size = len(self.plays)
+
+        self.bitmaps = {}
+        for col in CATEGORICAL_COLUMNS:
+            if col not in self.plays:
+                continue
+            codes, uniques = pd.factorize(self.plays[col], sort=True)
+            self.bitmaps[col] = {
+                self._normalize(value): codes == i for i, value in enumerate(uniques)
+            }
+
+        self.sorted = {}
+        for col in NUMERIC_COLUMNS:
+            if col not in self.plays:
+                continue
+            values = self.plays[col].to_numpy(dtype='float64')
+            order = np.argsort(values, kind='stable')
+            self.sorted[col] = (order, values[order])
+
+    @staticmethod
+    def _normalize(value):
+        """Bitmap key for a value (numpy scalars and whole floats map to Python ints)."""
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (float, np.floating)) and float(value).is_integer():
+            return int(value)
+        if isinstance(value, np.integer):
+            return int(value)
+        return value
+
+    def values(self, column):
+        """Distinct indexed values of a categorical column."""
+        return sorted(self.bitmaps[column].keys(), key=str)
+
+    def _categorical_mask(self, column, criterion):
+        bitmaps = self.bitmaps[column]
+        values = criterion if isinstance(criterion, (list, tuple, set, frozenset)) else [criterion]
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            bitmap = bitmaps.get(self._normalize(value))
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def _numeric_mask(self, column, criterion):
+        order, values = self.sorted[column]
+        if isinstance(criterion, tuple):
+            low, high = criterion
+        else:
+            low = high = criterion
+        # NaNs sort last, so bounding the upper end by the non-NaN count excludes them
+        stop = len(values) - int(np.isnan(values).sum()) if high is None else \
+            np.searchsorted(values, high, side='right')
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def mask(self, **criteria):
+        """Boolean mask over self.plays for the given criteria."""
+        mask = np.ones(self.size, dtype=bool)
+        for column, criterion in criteria.items():
+            if criterion is None:
+                continue
+            if column in self.bitmaps:
+                mask &= self._categorical_mask(column, criterion)
+            elif column in self.sorted:
+                mask &= self._numeric_mask(column, criterion)
+            else:
+                raise KeyError(f"Column '{column}' is not indexed; expected one of "
+                               f"{sorted(list(self.bitmaps) + list(self.sorted))}")
+        return mask
+
+    def count(self, **criteria):
+        """Number of plays matching the criteria."""
+        return int(self.mask(**criteria).sum())
+
+    def select(self, **criteria):
+        """
+        Plays matching the criteria, in index (supplementary file) order.
+
+        Returns:
+            DataFrame with game_id, play_id and the query columns; it can be passed
+            directly as `plays` to play_exporter.export_plays
+        """
+        return self.plays[self.mask(**criteria)].reset_index(drop=True)
+
+def build_play_query(weeks=None, season=2023, supplementary=None, optimal_flags=None,
+                     available_plays=None):
+    """
+    Build a PlayQuery from supplementary data and analysis results.
+
+    Args:
+        weeks: Weeks to index: only their plays are included, with availability and
+               is_optimal from their tracking files and optimal-decision results;
+               defaults to [1]
+        season: Season year (only its plays are included)
+        supplementary: Optional pre-loaded supplementary DataFrame
+        optimal_flags: Optional DataFrame of game_id, play_id, is_optimal; loaded from
+                       each week's optimal_decisions_path when omitted
+        available_plays: Optional DataFrame of game_id, play_id present in the tracking
+                         data; read from each week's input CSV when omitted
+
+    Returns:
+        PlayQuery
+    """
+    weeks = [1] if weeks is None else list(weeks)
+
+    if supplementary is None:
+        supplementary = load_supplementary(columns=QUERY_SUPPLEMENTARY_COLUMNS)
+    in_weeks = (supplementary['season'] == season) & supplementary['week'].isin(weeks)
+    plays = supplementary.loc[in_weeks.fillna(False).to_numpy(dtype=bool),
+                              ['game_id', 'play_id'] + QUERY_SUPPLEMENTARY_COLUMNS].reset_index(drop=True)
+    plays['yards_to_endzone'] = yards_to_endzone(plays)
+
+    if optimal_flags is None:
+        files = [optimal_decisions_path(w, season) for w in weeks]
+        files = [path for path in files if os.path.exists(path)]
+        optimal_flags = load_optimal_flags(files) if files else None
+    if optimal_flags is not None:
+        plays = plays.merge(optimal_flags[['game_id', 'play_id', 'is_optimal']],
+                            on=['game_id', 'play_id'], how='left')
+
+    if available_plays is None:
+        frames = [
+            load_input(week=w, season=season, columns=['game_id', 'play_id'])
+            for w in weeks if os.path.exists(input_path(w, season))
+        ]
+        if frames:
+            available_plays = pd.concat(frames).drop_duplicates()
+    if available_plays is not None:
+        available = pd.MultiIndex.from_frame(available_plays[['game_id', 'play_id']])
+        plays['available'] = pd.MultiIndex.from_frame(plays[['game_id', 'play_id']]).isin(available)
+
+    return PlayQuery(plays)
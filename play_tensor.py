@@ -0,0 +1,409 @@
+import numpy as np
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from data_paths import CACHE_DIR, input_path, output_path
+
+# Dense play tensors: tracking reshaped from long format into arrays indexed
+# (play, frame, player slot, channel), with side tables for play and player metadata
+# and masks of the valid (play, frame, slot) cells. Stages index plays and frames
+# directly instead of grouping and sorting DataFrames, and a store saved as .npy files
+# is opened memory-mapped, so several processes share one copy through the page cache.
+#
+# Slots are the play's players in nfl_id order; frame index f holds frame_id f + 1.
+
+TRACKING_CHANNELS = ['x', 'y', 's', 'a', 'dir', 'o']
+
+# Model outputs stored as extra channels when the input has values for them
+PREDICTION_CHANNELS = ['target_probability', 'catch_probability', 'yards_if_caught', 'expected_yards']
+
+OUTPUT_CHANNELS = ['x', 'y']
+
+PLAY_DTYPE = np.dtype([
+    ('game_id', '<i8'),
+    ('play_id', '<i8'),
+    ('n_frames', '<i4'),
+    ('n_players', '<i4'),
+    ('n_output_frames', '<i4'),
+    ('play_direction', 'i1'),          # +1 right, -1 left, 0 unknown
+    ('absolute_yardline_number', '<f8'),
+    ('ball_land_x', '<f8'),
+    ('ball_land_y', '<f8')
+])
+
+PLAYER_DTYPE = np.dtype([
+    ('nfl_id', '<i8'),                 # -1 for unused slots
+    ('name', '<i4'),                   # codes into the meta categories (-1 if missing)
+    ('position', '<i4'),
+    ('side', '<i4'),
+    ('role', '<i4'),
+    ('player_to_predict', '?')
+])
+
+CATEGORY_COLUMNS = {
+    'name': 'player_name',
+    'position': 'player_position',
+    'side': 'player_side',
+    'role': 'player_role'
+}
+
+STORE_ARRAYS = ['plays', 'players', 'tracking', 'valid', 'output', 'output_valid']
+
+class PlayTensors:
+    """
+    Dense tracking arrays for a set of plays.
+
+    Attributes:
+        plays: (P,) PLAY_DTYPE records, sorted by game_id, play_id
+        players: (P, S) PLAYER_DTYPE records
+        tracking: (P, F, S, C) float array, channels named in self.channels (NaN where invalid)
+        valid: (P, F, S) bool, True where the player has a tracking row at that frame
+        output: (P, Fo, S, 2) post-throw x/y (NaN where absent)
+        output_valid: (P, Fo, S) bool
+        meta: dict with channels, categories and shapes
+    """
+
+    def __init__(self, arrays, meta):
+        for name in STORE_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.channels = meta['channels']
+        self.categories = meta['categories']
+
+    def __len__(self):
+        return len(self.plays)
+
+    def channel(self, name):
+        """(P, F, S) view of one tracking channel."""
+        return self.tracking[..., self.channels.index(name)]
+
+    def category_codes(self, field, values):
+        """Codes of the given category values (values not present are ignored)."""
+        lookup = {value: i for i, value in enumerate(self.categories[field])}
+        return [lookup[v] for v in values if v in lookup]
+
+    def play_index(self, game_id, play_id):
+        """Row of a play in the arrays, or None if absent."""
+        keys = self.plays[['game_id', 'play_id']]
+        target = np.array((game_id, play_id), dtype=keys.dtype)
+        i = int(np.searchsorted(keys, target))
+        if i < len(keys) and keys[i] == target:
+            return i
+        return None
+
+    def play(self, game_id, play_id):
+        """
+        One play's arrays trimmed to its frames and players (views, no copies).
+
+        Returns:
+            Dict with play, players, tracking, valid, output and output_valid, or None
+        """
+        i = self.play_index(game_id, play_id)
+        if i is None:
+            return None
+        play = self.plays[i]
+        n_frames, n_players, n_output = int(play['n_frames']), int(play['n_players']), int(play['n_output_frames'])
+        return {
+            'play': play,
+            'players': self.players[i, :n_players],
+            'tracking': self.tracking[i, :n_frames, :n_players],
+            'valid': self.valid[i, :n_frames, :n_players],
+            'output': self.output[i, :n_output, :n_players],
+            'output_valid': self.output_valid[i, :n_output, :n_players]
+        }
+
+    def save(self, directory):
+        """
+        Write the arrays as .npy files plus meta.json (a store loadable with load_play_tensors).
+        Each file is written under a temporary name and moved into place, so processes
+        that have an existing store's files mapped keep seeing the complete old arrays.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in STORE_ARRAYS:
+            path = os.path.join(directory, f'{name}.npy')
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, getattr(self, name))
+            os.replace(path + '.tmp', path)
+        path = os.path.join(directory, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+def _group_starts(*keys):
+    """Boolean mask of rows that start a new run of the given (sorted) key arrays."""
+    change = np.zeros(len(keys[0]), dtype=bool)
+    if len(change):
+        change[0] = True
+        for key in keys:
+            change[1:] |= key[1:] != key[:-1]
+    return change
+
+def tensorize(input_df, output_df=None, dtype=np.float64, directory=None):
+    """
+    Pack long-format tracking into dense play tensors.
+
+    Args:
+        input_df: Pre-throw tracking rows (prediction columns are kept as extra channels)
+        output_df: Optional post-throw rows (game_id, play_id, nfl_id, frame_id, x, y)
+        dtype: Float dtype of the tracking arrays (float64 keeps values identical to the CSV)
+        directory: If given, arrays are allocated as .npy memmaps there and meta.json is
+            written, producing a store without holding it all in memory
+
+    Returns:
+        PlayTensors
+
+    Raises:
+        ValueError: if a (play, nfl_id, frame_id) appears more than once
+    """
+    keys = ['game_id', 'play_id', 'nfl_id', 'frame_id']
+    df = input_df.sort_values(keys, kind='stable')
+    game = df['game_id'].to_numpy(np.int64)
+    play = df['play_id'].to_numpy(np.int64)
+    nfl = df['nfl_id'].to_numpy(np.int64)
+    frame = df['frame_id'].to_numpy(np.int64)
+    if len(df) and (frame.min() < 1):
+        raise ValueError("frame_id values must start at 1")
+
+    play_start = _group_starts(game, play)
+    player_start = _group_starts(game, play, nfl)
+    duplicate = ~_group_starts(game, play, nfl, frame)
+    if duplicate.any():
+        i = int(np.flatnonzero(duplicate)[0])
+        raise ValueError(f"Duplicate tracking row for game {game[i]}, play {play[i]}, "
+                         f"player {nfl[i]}, frame {frame[i]}")
+
+    play_idx = np.cumsum(play_start) - 1
+    player_global = np.cumsum(player_start) - 1
+    first_player_of_play = player_global[play_start]
+    slot = player_global - first_player_of_play[play_idx]
+    frame_idx = frame - 1
+
+    n_plays = int(play_start.sum())
+    n_players = np.bincount(play_idx, weights=player_start, minlength=n_plays).astype(np.int32)
+    n_frames = np.zeros(n_plays, dtype=np.int32)
+    np.maximum.at(n_frames, play_idx, frame.astype(np.int32))
+    P = n_plays
+    F = int(n_frames.max()) if P else 0
+    S = int(n_players.max()) if P else 0
+
+    channels = TRACKING_CHANNELS + [c for c in PREDICTION_CHANNELS
+                                    if c in df.columns and df[c].notna().any()]
+
+    # Output (post-throw) rows mapped onto the same play and slot indexes
+    out_rows = None
+    Fo = 0
+    if output_df is not None and len(output_df):
+        out = output_df[['game_id', 'play_id', 'nfl_id', 'frame_id', 'x', 'y']]
+        first_rows = np.flatnonzero(player_start)
+        slot_table = np.zeros(len(first_rows), dtype=[('game_id', '<i8'), ('play_id', '<i8'),
+                                                      ('nfl_id', '<i8')])
+        slot_table['game_id'] = game[first_rows]
+        slot_table['play_id'] = play[first_rows]
+        slot_table['nfl_id'] = nfl[first_rows]
+        wanted = np.zeros(len(out), dtype=slot_table.dtype)
+        wanted['game_id'] = out['game_id'].to_numpy(np.int64)
+        wanted['play_id'] = out['play_id'].to_numpy(np.int64)
+        wanted['nfl_id'] = out['nfl_id'].to_numpy(np.int64)
+        pos = np.searchsorted(slot_table, wanted)
+        pos = np.minimum(pos, len(slot_table) - 1)
+        found = slot_table[pos] == wanted
+        out_frame = out['frame_id'].to_numpy(np.int64)
+        found &= out_frame >= 1
+        out_rows = {
+            'play': play_idx[first_rows][pos[found]],
+            'slot': slot[first_rows][pos[found]],
+            'frame': out_frame[found] - 1,
+            'xy': out[['x', 'y']].to_numpy(np.float64)[found]
+        }
+        Fo = int(out_rows['frame'].max()) + 1 if found.any() else 0
+
+    def allocate(name, shape, array_dtype, fill):
+        if directory is None:
+            return np.full(shape, fill, dtype=array_dtype)
+        array = np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+',
+                                          dtype=array_dtype, shape=shape)
+        array[...] = fill
+        return array
+
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+
+    arrays = {
+        'plays': allocate('plays', (P,), PLAY_DTYPE, 0),
+        'players': allocate('players', (P, S), PLAYER_DTYPE, 0),
+        'tracking': allocate('tracking', (P, F, S, len(channels)), dtype, np.nan),
+        'valid': allocate('valid', (P, F, S), bool, False),
+        'output': allocate('output', (P, Fo, S, len(OUTPUT_CHANNELS)), dtype, np.nan),
+        'output_valid': allocate('output_valid', (P, Fo, S), bool, False)
+    }
+
+    # Play table
+    plays = arrays['plays']
+    first = np.flatnonzero(play_start)
+    plays['game_id'] = game[first]
+    plays['play_id'] = play[first]
+    plays['n_frames'] = n_frames
+    plays['n_players'] = n_players
+    for column in ['absolute_yardline_number', 'ball_land_x', 'ball_land_y']:
+        if column in df.columns:
+            plays[column] = df[column].to_numpy(np.float64)[first]
+        else:
+            plays[column] = np.nan
+    if 'num_frames_output' in df.columns:
+        plays['n_output_frames'] = df['num_frames_output'].fillna(0).to_numpy(np.int64)[first]
+    if out_rows is not None and len(out_rows['frame']):
+        observed = np.zeros(P, dtype=np.int32)
+        np.maximum.at(observed, out_rows['play'], (out_rows['frame'] + 1).astype(np.int32))
+        plays['n_output_frames'] = np.maximum(plays['n_output_frames'], observed)
+    if 'play_direction' in df.columns:
+        direction = df['play_direction'].to_numpy()[first]
+        plays['play_direction'] = np.where(direction == 'right', 1, np.where(direction == 'left', -1, 0))
+
+    # Player table (codes into per-store categories)
+    players = arrays['players']
+    players['nfl_id'] = -1
+    players['name'] = -1
+    players['position'] = -1
+    players['side'] = -1
+    players['role'] = -1
+    rows = np.flatnonzero(player_start)
+    p_idx, s_idx = play_idx[rows], slot[rows]
+    players['nfl_id'][p_idx, s_idx] = nfl[rows]
+    categories = {}
+    for field, column in CATEGORY_COLUMNS.items():
+        if column not in df.columns:
+            categories[field] = []
+            continue
+        values = df[column].to_numpy()[rows]
+        present = [v for v in values if isinstance(v, str)]
+        uniques = sorted(set(present))
+        lookup = {v: i for i, v in enumerate(uniques)}
+        players[field][p_idx, s_idx] = [lookup.get(v, -1) if isinstance(v, str) else -1 for v in values]
+        categories[field] = uniques
+    if 'player_to_predict' in df.columns:
+        to_predict = df['player_to_predict'].to_numpy()[rows]
+        players['player_to_predict'][p_idx, s_idx] = (to_predict == True) | (to_predict == 'True')
+
+    # Tracking values
+    tracking = arrays['tracking']
+    values = df[channels].to_numpy(np.float64)
+    tracking[play_idx, frame_idx, slot] = values
+    arrays['valid'][play_idx, frame_idx, slot] = True
+
+    if out_rows is not None:
+        arrays['output'][out_rows['play'], out_rows['frame'], out_rows['slot']] = out_rows['xy']
+        arrays['output_valid'][out_rows['play'], out_rows['frame'], out_rows['slot']] = True
+
+    meta = {
+        'channels': channels,
+        'output_channels': OUTPUT_CHANNELS,
+        'categories': categories,
+        'dtype': np.dtype(dtype).name,
+        'shape': {'plays': P, 'frames': F, 'slots': S, 'output_frames': Fo},
+        'rows': int(len(df))
+    }
+    if directory is not None:
+        for array in arrays.values():
+            array.flush()
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+    return PlayTensors(arrays, meta)
+
+def load_play_tensors(directory, mmap_mode='r'):
+    """
+    Open a saved store. With mmap_mode='r' nothing is read until it is indexed, and
+    every process opening the same store shares its pages.
+    """
+    with open(os.path.join(directory, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+              for name in STORE_ARRAYS}
+    return PlayTensors(arrays, meta)
+
+def _store_dir(path):
+    key = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.normpath(str(path)))
+    return CACHE_DIR / key / 'play_tensors'
+
+# File in a store directory naming its current build subdirectory
+CURRENT_BUILD_FILE = 'CURRENT'
+
+def _current_build(directory):
+    """Subdirectory of the published build of a store, or None if there is none."""
+    try:
+        with open(directory / CURRENT_BUILD_FILE, 'r') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return directory / name if name else None
+
+def _fingerprint(paths):
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([str(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+def play_tensor_store(input_file, output_file=None, rebuild=False, dtype=np.float64):
+    """
+    Memory-mapped tensor store for a tracking CSV, built on first use under CACHE_DIR
+    and rebuilt when the source files' size or mtime change.
+
+    A (re)build is written to a new build subdirectory and published by atomically
+    replacing the CURRENT pointer, so processes that have the previous build mapped
+    never see truncated or half-written arrays. The previous build is kept for readers
+    still opening it; older ones are removed.
+
+    Args:
+        input_file: Input (pre-throw) tracking CSV
+        output_file: Optional output (post-throw) CSV
+        rebuild: Force a rebuild
+        dtype: Float dtype for a (re)build
+
+    Returns:
+        PlayTensors backed by read-only memmaps
+    """
+    sources = [input_file] + ([output_file] if output_file is not None else [])
+    fingerprint = _fingerprint(sources)
+    directory = _store_dir(input_file)
+    current = _current_build(directory)
+
+    if not rebuild and current is not None and (current / 'meta.json').exists():
+        with open(current / 'meta.json', 'r') as f:
+            meta = json.load(f)
+        if meta.get('sources') == fingerprint:
+            return load_play_tensors(current)
+
+    from data_loader import load_csv
+    print(f"  Building play tensors for {input_file}...")
+    input_df = load_csv(input_file)
+    output_df = load_csv(output_file) if output_file is not None else None
+    build = directory / f'build_{time.time_ns()}_{os.getpid()}'
+    tensors = tensorize(input_df, output_df, dtype=dtype, directory=build)
+    tensors.meta['sources'] = fingerprint
+    with open(build / 'meta.json', 'w') as f:
+        json.dump(tensors.meta, f, indent=2)
+    del tensors
+
+    pointer = directory / f'{CURRENT_BUILD_FILE}.tmp{os.getpid()}'
+    with open(pointer, 'w') as f:
+        f.write(build.name)
+    os.replace(pointer, directory / CURRENT_BUILD_FILE)
+
+    # Unlinking a build doesn't disturb processes that still have its files mapped
+    for old in directory.iterdir():
+        if old.is_dir() and old.name.startswith('build_') and old not in (build, current):
+            shutil.rmtree(old, ignore_errors=True)
+        elif old.is_file() and (old.name == 'meta.json' or old.suffix == '.npy'):
+            old.unlink()  # unversioned store written before builds were published
+    return load_play_tensors(build)
+
+def week_tensor_store(week=1, season=2023, rebuild=False):
+    """Tensor store for one week's input and output files."""
+    return play_tensor_store(input_path(week, season), output_path(week, season), rebuild=rebuild)
+
+if __name__ == '__main__':
+    from cli import main
+    main(['tensors'] + sys.argv[1:])
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from data_paths import CACHE_DIR
+from instrumentation import count
+
+# Persistent cache of model scores. Entries are keyed by the model artifacts' hash and
+# hold, per play, a fingerprint of the exact feature matrices the models saw (after
+# encoding and NaN filling) together with the scores. A rerun only sends the plays
+# whose fingerprint changed, or that were never scored, through predict_proba.
+
+PREDICTION_CACHE_DIR = CACHE_DIR / 'predictions'
+
+# Cache files (one per model version) kept; older ones are removed
+MAX_CACHED_MODELS = 4
+
+def model_artifact_hash(paths):
+    """SHA-256 over the model files' contents (in the given order)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def play_fingerprints(play_keys, matrices):
+    """
+    Fingerprint of each play's feature rows.
+
+    Args:
+        play_keys: DataFrame with game_id and play_id per row, rows of a play contiguous
+        matrices: Feature DataFrames aligned row-for-row with play_keys
+
+    Returns:
+        Dict (game_id, play_id) -> (start, end, fingerprint hex)
+    """
+    from play_exporter import group_bounds
+
+    row_hashes = np.column_stack([
+        pd.util.hash_pandas_object(X.reset_index(drop=True), index=False).to_numpy()
+        for X in matrices
+    ])
+    games = play_keys['game_id'].to_numpy()
+    plays = play_keys['play_id'].to_numpy()
+    starts, ends = group_bounds([games, plays])
+    fingerprints = {}
+    for s, e in zip(starts, ends):
+        digest = hashlib.blake2b(np.ascontiguousarray(row_hashes[s:e]).tobytes(), digest_size=16)
+        fingerprints[(games[s].item(), plays[s].item())] = (s, e, digest.hexdigest())
+    return fingerprints
+
+class PredictionCache:
+    """
+    Scores of one model version, stored under PREDICTION_CACHE_DIR/{model_hash}.pkl.
+
+    Each entry maps (game_id, play_id) to {'fingerprint': str, 'scores': {name: array}}.
+    """
+
+    def __init__(self, model_hash, directory=PREDICTION_CACHE_DIR):
+        self.model_hash = model_hash
+        self.directory = directory
+        self.path = os.path.join(directory, f'{model_hash}.pkl')
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                self.entries = pickle.load(f)
+
+    def get(self, key, fingerprint):
+        """Cached scores of a play, or None if absent or computed from other features."""
+        entry = self.entries.get(key)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry['scores']
+
+    def put(self, key, fingerprint, scores):
+        self.entries[key] = {'fingerprint': fingerprint, 'scores': scores}
+        self.dirty = True
+
+    def save(self):
+        """Write the cache if it changed and drop the oldest other model versions."""
+        if not self.dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+        cached = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')),
+            key=os.path.getmtime, reverse=True
+        )
+        for stale in cached[MAX_CACHED_MODELS:]:
+            os.remove(stale)
+
+def predict_with_cache(cache, play_keys, models):
+    """
+    Score feature matrices, reusing cached scores for unchanged plays.
+
+    Args:
+        cache: PredictionCache of the current model version (None to score everything)
+        play_keys: DataFrame with game_id and play_id per row, rows of a play contiguous
+        models: Dict name -> (model, X) with X aligned row-for-row with play_keys
+
+    Returns:
+        Tuple of (dict name -> probability array, hits, misses) where hits and misses
+        count plays
+    """
+    n = len(play_keys)
+    if cache is None:
+        return {name: model.predict_proba(X)[:, 1] for name, (model, X) in models.items()}, 0, 0
+
+    fingerprints = play_fingerprints(play_keys, [X for _, X in models.values()])
+    scores = {name: np.empty(n, dtype=np.float64) for name in models}
+    miss_rows = []
+    missed = []
+    for key, (s, e, fingerprint) in fingerprints.items():
+        cached = cache.get(key, fingerprint)
+        if cached is not None and all(len(cached.get(name, ())) == e - s for name in models):
+            for name in models:
+                scores[name][s:e] = cached[name]
+        else:
+            missed.append((key, s, e, fingerprint))
+            miss_rows.append(np.arange(s, e))
+
+    if miss_rows:
+        rows = np.concatenate(miss_rows)
+        for name, (model, X) in models.items():
+            scores[name][rows] = model.predict_proba(X.iloc[rows])[:, 1]
+        for key, s, e, fingerprint in missed:
+            cache.put(key, fingerprint, {name: scores[name][s:e].copy() for name in models})
+
+    hits, misses = len(fingerprints) - len(missed), len(missed)
+    count('prediction_cache_hits', hits)
+    count('prediction_cache_misses', misses)
+    return scores, hits, misses
@@ -108,6 +108,89 @@ function getEligibleReceivers(data) {
     return receivers;
 }
 
+// Per-frame fields stored as arrays in columnar play files
+const QB_FRAME_FIELDS = ['x', 'y', 's', 'a', 'dir', 'o',
+    'catch_probability', 'target_probability', 'yards_if_caught', 'expected_yards'];
+
+// Expand a columnar play file (format_version 2+) into the per-frame layout used below.
+// Precomputed paths and ball flight (format_version 3+; post-throw paths from 4) are kept
+// for direct lookups.
+function expandColumnarPlay(data) {
+    if (!data || data.layout !== 'columnar') {
+        return data;
+    }
+
+    const expandFrames = (player) => {
+        const frames = new Array(player.frame_count);
+        for (let i = 0; i < player.frame_count; i++) {
+            const frame = { frame_id: player.frame_ids ? player.frame_ids[i] : player.frame_base + i };
+            QB_FRAME_FIELDS.forEach(field => {
+                const values = player[field];
+                if (values && values[i] !== null && values[i] !== undefined) {
+                    frame[field] = values[i];
+                }
+            });
+            frames[i] = frame;
+        }
+        return player.frame_step ? fillDecimatedFrames(frames) : frames;
+    };
+
+    // Decimated players (frame_step) keep every n-th frame: interpolate the rest linearly,
+    // taking the shorter way around for angles
+    const fillDecimatedFrames = (frames) => {
+        const filled = [];
+        frames.forEach((a, k) => {
+            filled.push(a);
+            const b = frames[k + 1];
+            if (!b) return;
+            for (let f = a.frame_id + 1; f < b.frame_id; f++) {
+                const t = (f - a.frame_id) / (b.frame_id - a.frame_id);
+                const frame = { frame_id: f };
+                QB_FRAME_FIELDS.forEach(field => {
+                    if (a[field] === undefined) return;
+                    if (b[field] === undefined) {
+                        frame[field] = a[field];
+                    } else if (field === 'dir' || field === 'o') {
+                        const delta = ((b[field] - a[field]) % 360 + 540) % 360 - 180;
+                        frame[field] = (a[field] + delta * t + 360) % 360;
+                    } else {
+                        frame[field] = a[field] + (b[field] - a[field]) * t;
+                    }
+                });
+                filled.push(frame);
+            }
+        });
+        return filled;
+    };
+
+    const players = {};
+    Object.entries(data.players || {}).forEach(([nflId, player]) => {
+        players[nflId] = {
+            name: player.name,
+            position: player.position,
+            side: player.side,
+            frames: expandFrames(player),
+            num_frames_output: player.num_frames_output,
+            path: player.path
+        };
+    });
+
+    const outputPlayers = {};
+    Object.entries(data.output_players || {}).forEach(([nflId, player]) => {
+        outputPlayers[nflId] = { frames: expandFrames(player) };
+    });
+
+    return Object.assign({}, data, { players: players, output_players: outputPlayers });
+}
+
+// Input frame with the given frame_id (frames are usually contiguous, so try by offset first)
+function inputFrameAt(player, frameId) {
+    if (player.frames.length === 0) return undefined;
+    const guess = player.frames[frameId - player.frames[0].frame_id];
+    if (guess && guess.frame_id === frameId) return guess;
+    return player.frames.find(f => f.frame_id === frameId);
+}
+
 // Initialize visualization with data
 function initializePlayVisualization(data) {
     // Safety check - ensure QB visualization element exists
@@ -117,6 +200,7 @@ function initializePlayVisualization(data) {
         return;
     }
     
+    data = expandColumnarPlay(data);
     playData = data;
     
     // Reset QB mode state
@@ -152,7 +236,9 @@ function initializePlayVisualization(data) {
             }
         });
     }
-    playData.total_frames = playData.max_frame + maxOutputFrame;
+    if (!playData.total_frames) {
+        playData.total_frames = playData.max_frame + maxOutputFrame;
+    }
     
     // Update slider max
     const slider = document.getElementById('qb-frame-slider');
@@ -199,6 +285,11 @@ function initializePlayVisualization(data) {
     if (playDirectionEl) playDirectionEl.textContent = data.play_direction;
 }
 
+// Play file URL, versioned by content hash when the manifest provides one
+function playUrl(entry) {
+    return entry.sha256 ? `${entry.filename}?v=${entry.sha256.slice(0, 12)}` : entry.filename;
+}
+
 // Load initial play from QB mode manifest
 async function loadInitialPlay() {
     // Wait for DOM to be ready
@@ -230,7 +321,7 @@ async function loadInitialPlay() {
         const randomPlay = playsManifest[Math.floor(Math.random() * playsManifest.length)];
         console.log('Loading play:', randomPlay.filename);
         
-        const data = await d3.json(randomPlay.filename);
+        const data = await d3.json(playUrl(randomPlay));
         if (!data) {
             throw new Error('Failed to load play data');
         }
@@ -968,6 +1059,16 @@ function confirmThrow() {
 }
 
 function calculateBallPosition(frame) {
+    // Precomputed flight (columnar files): one entry per frame
+    if (playData.ball) {
+        const i = Math.min(Math.max(frame, 1), playData.ball.x.length) - 1;
+        return {
+            x: playData.ball.x[i],
+            y: playData.ball.y[i],
+            visible: frame >= playData.ball.visible_from
+        };
+    }
+
     if (frame < playData.throw_frame) {
         return {
             x: playData.ball_throw_x,
@@ -1101,8 +1202,25 @@ function updateVisualization() {
     
     // Draw players
     Object.entries(playData.players).forEach(([nflId, player]) => {
-        let frame = player.frames.find(f => f.frame_id === currentFrame);
+        let frame = null;
         let isOutputPlayer = false;
+        if (player.path) {
+            // Precomputed path (columnar files): input frames up to path.start, then the
+            // output or held position by index (version 3 paths start at frame 1)
+            const i = currentFrame - (player.path.start || 1);
+            if (i < 0) {
+                frame = inputFrameAt(player, currentFrame);
+                if (!frame) return;
+            } else {
+                if (player.path.x[i] === null || player.path.x[i] === undefined) return;
+                isOutputPlayer = player.path.output[i] === 1;
+                frame = isOutputPlayer
+                    ? { x: player.path.x[i], y: player.path.y[i], dir: 0, s: 0 }
+                    : inputFrameAt(player, currentFrame) || player.frames[player.frames.length - 1];
+            }
+        } else {
+            frame = player.frames.find(f => f.frame_id === currentFrame);
+        }
         
         if (!frame && currentFrame > playData.throw_frame && playData.output_players && playData.output_players[nflId]) {
             const outputPlayer = playData.output_players[nflId];
@@ -1333,7 +1451,7 @@ async function randomizePlay() {
         btn.textContent = 'Loading...';
         btn.disabled = true;
         
-        const data = await d3.json(randomPlay.filename);
+        const data = await d3.json(playUrl(randomPlay));
         initializePlayVisualization(data);
         
         btn.textContent = originalText;
@@ -0,0 +1,420 @@
+import pandas as pd
+import numpy as np
+import time
+from scipy.spatial.distance import cdist
+from data_loader import load_csv, load_supplementary, input_path, SUPPLEMENTARY_MODEL_COLUMNS
+from play_exporter import group_bounds
+from instrumentation import timed, stage, add_rows
+from feature_state import TrackFeatureState
+
+# Streaming mode: tracking frames are consumed one at a time, as a live feed would
+# deliver them, and each frame is answered with the receivers' separation features and
+# target/catch probabilities. Per-play state holds what the batch features need from
+# earlier frames (ring buffers per receiver track, see feature_state), so a frame costs
+# the same whether it is the first or the fiftieth of the play.
+#
+# Weekly CSVs replay as a feed: at 10 Hz (speed=1), faster (speed=4 -> 40 Hz) or as
+# fast as possible (speed=0). Each frame is timed against a latency budget.
+
+FRAME_RATE_HZ = 10
+
+# A frame should be answered before the next one arrives
+LATENCY_BUDGET_MS = 1000 / FRAME_RATE_HZ
+
+RECEIVER_POSITIONS = ['WR', 'TE', 'RB']
+
+STREAM_OUTPUT_FILE = 'streaming_predictions_{season}_w{week:02d}.csv'
+
+# Play context from the supplementary data (the play's result isn't known live)
+STREAM_SUPPLEMENTARY_COLUMNS = [c for c in SUPPLEMENTARY_MODEL_COLUMNS if c != 'pass_result']
+
+# Play-level fields taken from the first frame of a play
+PLAY_CONTEXT_COLUMNS = ['play_direction', 'absolute_yardline_number', 'ball_land_x', 'ball_land_y']
+
+def frame_separation(rec_xy, def_xy):
+    """
+    Nearest and second-nearest defender for each receiver in one frame.
+
+    Same computation as calculate_separation_features_for_play: cdist distances and
+    an argsort over the defenders, in the order they appear in the frame.
+
+    Args:
+        rec_xy: (n_receivers, 2) positions
+        def_xy: (n_defenders, 2) positions
+
+    Returns:
+        Tuple of (nearest_idx, nearest_distances, second_nearest_distances)
+    """
+    distances = cdist(rec_xy, def_xy, metric='euclidean')
+    sorted_indices = np.argsort(distances, axis=1)
+    rows = np.arange(len(rec_xy))
+    nearest_idx = sorted_indices[:, 0]
+    nearest_distances = distances[rows, nearest_idx]
+    second_nearest_distances = np.full(len(rec_xy), np.nan)
+    if distances.shape[1] > 1:
+        second_nearest_distances = distances[rows, sorted_indices[:, 1]]
+    return nearest_idx, nearest_distances, second_nearest_distances
+
+class PlayState:
+    """
+    State kept for one play while its frames stream in.
+
+    Attributes:
+        game_id, play_id: Play keys
+        context: Play-level values (supplementary columns, ball landing point, direction)
+        throw_frame: Frame of the throw if known in advance (replays), else None
+        tracks: TrackFeatureState per receiver nfl_id
+        last_frame: Last frame_id processed
+    """
+
+    def __init__(self, game_id, play_id, context, throw_frame=None):
+        self.game_id = game_id
+        self.play_id = play_id
+        self.context = context
+        self.throw_frame = throw_frame
+        self.tracks = {}
+        self.last_frame = None
+
+    def update_track(self, nfl_id, frame_id, distance, speed):
+        """
+        Append a receiver's frame and return its temporal features.
+
+        Returns:
+            Tuple of (separation_change, separation_rolling_mean, speed_rolling_mean)
+        """
+        track = self.tracks.get(nfl_id)
+        if track is None:
+            track = self.tracks[nfl_id] = TrackFeatureState()
+        return track.update(frame_id, distance, speed)
+
+class StreamingEngine:
+    """
+    Per-frame separation, features and model scores for live tracking.
+
+    Usage:
+        engine = StreamingEngine(models=load_models(), supplementary=supp_df)
+        for frame_rows in feed:                 # one play's rows for one frame
+            scored = engine.process_frame(frame_rows)
+        engine.end_play(game_id, play_id)
+
+    Models are the tuple returned by add_predictions_to_dataframe.load_models();
+    without models only separation and features are produced. fill_values is the
+    (target, catch) pair of feature -> NaN fill value dicts used for every frame
+    (see batch_fill_values); without it NaNs get the medians of each frame's rows,
+    which differ from batch scoring.
+    """
+
+    def __init__(self, models=None, supplementary=None, latency_budget_ms=LATENCY_BUDGET_MS,
+                 fill_values=None):
+        self.models = models
+        self.fill_values = fill_values if fill_values is not None else (None, None)
+        self.latency_budget_ms = latency_budget_ms
+        self.supplementary = {}
+        if supplementary is not None:
+            columns = [c for c in supplementary.columns if c not in ('game_id', 'play_id')]
+            for row in supplementary.itertuples(index=False):
+                record = row._asdict()
+                self.supplementary[(record['game_id'], record['play_id'])] = {c: record[c] for c in columns}
+        self.plays = {}
+        self.latencies_ms = []
+        self.over_budget = 0
+
+    def start_play(self, game_id, play_id, context=None, throw_frame=None):
+        """Open the state for a play (done automatically on its first frame)."""
+        play_context = dict(self.supplementary.get((game_id, play_id), {}))
+        play_context.update(context or {})
+        state = PlayState(game_id, play_id, play_context, throw_frame=throw_frame)
+        self.plays[(game_id, play_id)] = state
+        return state
+
+    def end_play(self, game_id, play_id):
+        """Drop a finished play's state."""
+        self.plays.pop((game_id, play_id), None)
+
+    def process_frame(self, frame_rows, throw_frame=None):
+        """
+        Consume one frame of one play and score its receivers.
+
+        Args:
+            frame_rows: DataFrame with the rows of every player at one frame of one play
+                (input CSV columns); rows in feed order
+            throw_frame: Known throw frame (used when the play is opened)
+
+        Returns:
+            DataFrame of the receiver rows with separation features, engineered
+            features and, with models, target/catch probabilities and expected yards
+        """
+        start = time.perf_counter()
+        game_id = frame_rows['game_id'].iat[0]
+        play_id = frame_rows['play_id'].iat[0]
+        frame_id = frame_rows['frame_id'].iat[0]
+        state = self.plays.get((game_id, play_id))
+        if state is None:
+            context = {c: frame_rows[c].iat[0] for c in PLAY_CONTEXT_COLUMNS if c in frame_rows.columns}
+            state = self.start_play(game_id, play_id, context=context, throw_frame=throw_frame)
+        state.last_frame = frame_id
+
+        side = frame_rows['player_side'].to_numpy()
+        receiver_mask = (side == 'Offense') & frame_rows['player_position'].isin(RECEIVER_POSITIONS).to_numpy()
+        defender_mask = side == 'Defense'
+        receivers = frame_rows[receiver_mask]
+        if len(receivers) == 0:
+            self._record_latency(start)
+            return receivers.iloc[:0]
+
+        rows = receivers.reset_index(drop=True)
+        xy = frame_rows[['x', 'y']].to_numpy(np.float64)
+        speeds = frame_rows['s'].to_numpy(np.float64)
+        accelerations = frame_rows['a'].to_numpy(np.float64)
+        rec_xy = xy[receiver_mask]
+        n = len(rows)
+
+        features = {col: np.full(n, np.nan) for col in [
+            'nearest_defender_distance', 'nearest_defender_id', 'nearest_defender_x',
+            'nearest_defender_y', 'separation_x', 'separation_y', 'separation_angle',
+            'second_nearest_defender_distance', 'receiver_speed', 'receiver_acceleration',
+            'nearest_defender_speed', 'nearest_defender_acceleration']}
+        if defender_mask.any():
+            def_xy = xy[defender_mask]
+            nearest_idx, nearest_distances, second_distances = frame_separation(rec_xy, def_xy)
+            separation_x = def_xy[nearest_idx, 0] - rec_xy[:, 0]
+            separation_y = def_xy[nearest_idx, 1] - rec_xy[:, 1]
+            angles = np.degrees(np.arctan2(separation_y, separation_x))
+            features.update({
+                'nearest_defender_distance': nearest_distances,
+                'nearest_defender_id': frame_rows['nfl_id'].to_numpy()[defender_mask][nearest_idx].astype(np.float64),
+                'nearest_defender_x': def_xy[nearest_idx, 0],
+                'nearest_defender_y': def_xy[nearest_idx, 1],
+                'separation_x': separation_x,
+                'separation_y': separation_y,
+                'separation_angle': np.where(angles < 0, angles + 360, angles),
+                'second_nearest_defender_distance': second_distances,
+                'receiver_speed': speeds[receiver_mask],
+                'receiver_acceleration': accelerations[receiver_mask],
+                'nearest_defender_speed': speeds[defender_mask][nearest_idx],
+                'nearest_defender_acceleration': accelerations[defender_mask][nearest_idx]
+            })
+
+        # Engineered features (same definitions as engineer_features). The throw frame
+        # is the current frame unless it is known: "if the ball were thrown now".
+        context = state.context
+        throw = state.throw_frame if state.throw_frame is not None else frame_id
+        ball_land_x = context.get('ball_land_x', np.nan)
+        ball_land_y = context.get('ball_land_y', np.nan)
+        yardline_number = context.get('yardline_number', np.nan)
+        absolute_yardline = context.get('absolute_yardline_number', np.nan)
+
+        features['throw_frame'] = np.full(n, throw)
+        features['frames_until_throw'] = np.full(n, throw - frame_id)
+        features['frame_progress'] = np.full(n, frame_id / throw)
+        features['distance_to_ball_land'] = np.sqrt(
+            (rec_xy[:, 0] - ball_land_x) ** 2 + (rec_xy[:, 1] - ball_land_y) ** 2
+        )
+        features['speed_differential'] = features['receiver_speed'] - features['nearest_defender_speed']
+        features['acceleration_differential'] = (
+            features['receiver_acceleration'] - features['nearest_defender_acceleration']
+        )
+        features['is_red_zone'] = np.full(n, int(pd.notna(yardline_number) and yardline_number <= 20))
+        features['relative_separation'] = features['nearest_defender_distance'] / (absolute_yardline + 1)
+
+        temporal = [state.update_track(nfl_id, frame_id, distance, speed) for nfl_id, distance, speed in zip(
+            rows['nfl_id'].to_numpy(), features['nearest_defender_distance'], features['receiver_speed'])]
+        features['separation_change'] = np.array([t[0] for t in temporal])
+        features['separation_rolling_mean'] = np.array([t[1] for t in temporal])
+        features['speed_rolling_mean'] = np.array([t[2] for t in temporal])
+
+        for column, value in context.items():
+            if column not in rows.columns and column not in features:
+                features[column] = np.full(n, value, dtype=object if isinstance(value, str) else None)
+        # One concat instead of a column insert per feature (inserts dominate the frame cost)
+        scored = pd.concat([rows.drop(columns=[c for c in features if c in rows.columns]),
+                            pd.DataFrame(features)], axis=1)
+        if self.models is not None:
+            self._score(scored)
+
+        self._record_latency(start)
+        return scored
+
+    def _score(self, scored):
+        """Add target/catch probabilities and expected yards to a frame's receiver rows."""
+        from add_predictions_to_dataframe import prepare_features_for_prediction
+
+        (target_model, target_feature_names, target_label_encoders,
+         catch_model, catch_feature_names, catch_label_encoders) = self.models
+        target_fills, catch_fills = self.fill_values
+        X_target = prepare_features_for_prediction(scored, target_feature_names, target_label_encoders,
+                                                   fill_values=target_fills)
+        X_catch = prepare_features_for_prediction(scored, catch_feature_names, catch_label_encoders,
+                                                  fill_values=catch_fills)
+        scored['target_probability'] = target_model.predict_proba(X_target)[:, 1]
+        scored['catch_probability'] = catch_model.predict_proba(X_catch)[:, 1]
+        scored['yards_if_caught'] = np.where(
+            scored['play_direction'] == 'right',
+            scored['x'] - scored['absolute_yardline_number'],
+            scored['absolute_yardline_number'] - scored['x']
+        )
+        scored['expected_yards'] = scored['catch_probability'] * scored['yards_if_caught']
+
+    def _record_latency(self, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.latencies_ms.append(elapsed_ms)
+        if elapsed_ms > self.latency_budget_ms:
+            self.over_budget += 1
+
+    def latency_summary(self):
+        """Frame count and latency percentiles (ms) so far."""
+        if not self.latencies_ms:
+            return {'frames': 0}
+        latencies = np.array(self.latencies_ms)
+        return {
+            'frames': len(latencies),
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'max_ms': float(latencies.max()),
+            'budget_ms': self.latency_budget_ms,
+            'over_budget': self.over_budget
+        }
+
+def batch_fill_values(input_df, models, supplementary_file='supplementary_data.csv'):
+    """
+    Warm-up pass: the NaN fill values add_predictions_to_dataframe would use for the
+    same tracking rows (medians over all their receiver rows), so streamed scores
+    match batch scores instead of depending on each frame's own medians.
+
+    Args:
+        input_df: Tracking rows to be replayed
+        models: Tuple from add_predictions_to_dataframe.load_models()
+        supplementary_file: Supplementary CSV (as given to add_predictions_to_dataframe)
+
+    Returns:
+        Tuple of (target fill values, catch fill values) dicts
+    """
+    from add_predictions_to_dataframe import engineer_features, encode_features, feature_fill_values
+    from compute_separation_features import add_separation_features
+
+    (_, target_feature_names, target_label_encoders,
+     _, catch_feature_names, catch_label_encoders) = models
+    df = add_separation_features(input_df)
+    supp_df = load_csv(supplementary_file, columns=SUPPLEMENTARY_MODEL_COLUMNS)
+    df_receivers = engineer_features(df.merge(supp_df, on=['game_id', 'play_id'], how='left'))
+    return (
+        feature_fill_values(encode_features(df_receivers, target_feature_names, target_label_encoders)),
+        feature_fill_values(encode_features(df_receivers, catch_feature_names, catch_label_encoders))
+    )
+
+def replay_frames(input_df, speed=1.0, plays=None):
+    """
+    Replay tracking rows as a live feed, one (play, frame) at a time.
+
+    Args:
+        input_df: Tracking rows (input CSV)
+        speed: Multiple of real time (1.0 = 10 Hz); 0 or None to replay without waiting
+        plays: Optional (game_id, play_id) pairs to replay
+
+    Yields:
+        Tuple of (frame_rows, throw_frame, is_last_frame)
+    """
+    df = input_df
+    if plays is not None:
+        wanted = pd.MultiIndex.from_tuples([tuple(p) for p in plays])
+        df = df[pd.MultiIndex.from_frame(df[['game_id', 'play_id']]).isin(wanted)]
+    df = df.sort_values(['game_id', 'play_id', 'frame_id', 'nfl_id'], kind='stable').reset_index(drop=True)
+
+    interval = 1.0 / (FRAME_RATE_HZ * speed) if speed else 0.0
+    games, play_ids, frames = (df[c].to_numpy() for c in ['game_id', 'play_id', 'frame_id'])
+    play_starts, play_ends = group_bounds([games, play_ids])
+    next_time = time.perf_counter()
+    for ps, pe in zip(play_starts, play_ends):
+        throw_frame = frames[ps:pe].max()
+        frame_starts, frame_ends = group_bounds([frames[ps:pe]])
+        for fs, fe in zip(frame_starts + ps, frame_ends + ps):
+            if interval:
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_time = max(next_time, time.perf_counter() - interval) + interval
+            yield df.iloc[fs:fe], throw_frame, fe == pe
+
+@timed('stream')
+def run_stream(week=1, season=2023, speed=0, output_file=None, max_plays=None,
+               supplementary_file='supplementary_data.csv', use_models=True):
+    """
+    Replay a week's tracking through the streaming engine.
+
+    Args:
+        week: Week to replay
+        season: Season of the week
+        speed: Multiple of real time (0 = as fast as possible)
+        output_file: CSV for the scored receiver rows (None for the default name, '' to skip)
+        max_plays: Optional limit on the number of plays
+        supplementary_file: Supplementary CSV for play context
+        use_models: Load the trained models and score each frame
+
+    Returns:
+        Latency summary dict
+    """
+    print("="*60)
+    print("Streaming Replay")
+    print("="*60)
+
+    models = None
+    if use_models:
+        from add_predictions_to_dataframe import load_models
+        try:
+            models = load_models()
+        except (ImportError, FileNotFoundError) as e:
+            print(f"  Models unavailable ({e}); streaming separation and features only")
+
+    with stage('load'):
+        input_df = load_csv(input_path(week, season))
+        supp_df = load_supplementary(columns=STREAM_SUPPLEMENTARY_COLUMNS, path=supplementary_file)
+        add_rows(len(input_df))
+
+    plays = None
+    if max_plays is not None:
+        plays = input_df[['game_id', 'play_id']].drop_duplicates().head(max_plays).to_numpy().tolist()
+
+    fill_values = None
+    if models is not None:
+        print("\nWarm-up pass for the feature fill values...")
+        with stage('warmup', rows=len(input_df)):
+            fill_values = batch_fill_values(input_df, models, supplementary_file=supplementary_file)
+
+    engine = StreamingEngine(models=models, supplementary=supp_df, fill_values=fill_values)
+    print(f"\nReplaying {season} week {week} at "
+          f"{'maximum speed' if not speed else f'{speed:g}x real time ({FRAME_RATE_HZ * speed:g} Hz)'}...")
+    emitted = []
+    n_plays = 0
+    with stage('stream'):
+        for frame_rows, throw_frame, is_last in replay_frames(input_df, speed=speed, plays=plays):
+            scored = engine.process_frame(frame_rows, throw_frame=throw_frame)
+            emitted.append(scored)
+            add_rows(len(frame_rows))
+            if is_last:
+                engine.end_play(frame_rows['game_id'].iat[0], frame_rows['play_id'].iat[0])
+                n_plays += 1
+
+    summary = engine.latency_summary()
+    summary['plays'] = n_plays
+    print(f"\n  Plays: {n_plays:,}")
+    print(f"  Frames: {summary['frames']:,}")
+    if summary['frames']:
+        print(f"  Latency per frame: mean {summary['mean_ms']:.2f} ms, p50 {summary['p50_ms']:.2f} ms, "
+              f"p95 {summary['p95_ms']:.2f} ms, max {summary['max_ms']:.2f} ms")
+        print(f"  Over the {summary['budget_ms']:.0f} ms budget: {summary['over_budget']:,} frames")
+
+    if output_file is None:
+        output_file = STREAM_OUTPUT_FILE.format(season=season, week=week)
+    if output_file and emitted:
+        result = pd.concat(emitted, ignore_index=True)
+        print(f"\nSaving {len(result):,} scored receiver rows to {output_file}...")
+        with stage('save', rows=len(result)):
+            result.to_csv(output_file, index=False)
+
+    print("\n" + "="*60)
+    return summary
+
+if __name__ == '__main__':
+    from cli import main
+    main(['stream'])
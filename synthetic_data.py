@@ -0,0 +1,292 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+from data_loader import INPUT_FILE_PATTERN, OUTPUT_FILE_PATTERN, SUPPLEMENTARY_FILE
+
+# Schema-correct synthetic tracking data for benchmarks and local runs when the real
+# weekly CSVs are not available. Everything is generated with whole-array numpy ops,
+# so large datasets (thousands of plays) take seconds.
+
+OFFENSE_POSITIONS = ['WR', 'WR', 'TE', 'RB', 'WR', 'FB']
+DEFENSE_POSITIONS = ['CB', 'CB', 'SS', 'FS', 'OLB', 'ILB', 'CB', 'MLB', 'DE', 'DT', 'NT']
+
+TEAMS = ['ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB',
+         'HOU', 'IND', 'JAX', 'KC', 'LV', 'LAC', 'LA', 'MIA', 'MIN', 'NE', 'NO', 'NYG',
+         'NYJ', 'PHI', 'PIT', 'SF', 'SEA', 'TB', 'TEN', 'WAS']
+
+PLAYS_PER_GAME = 40
+
+def _degrees(vx, vy):
+    """Tracking-convention angle (clockwise from the +y axis) of a velocity."""
+    return (90 - np.degrees(np.arctan2(vy, vx))) % 360
+
+def generate_tracking(n_plays=200, frames=(15, 40), output_frames=(8, 25), offense=6, defense=5,
+                      season=2023, week=1, seed=0, with_predictions=False):
+    """
+    Generate input (pre-throw), output (post-throw) and supplementary tables.
+
+    Args:
+        n_plays: Number of plays
+        frames: (min, max) input frames per play
+        output_frames: (min, max) output frames per play
+        offense: Offensive players per play (the first is the QB)
+        defense: Defensive players per play
+        season: Season year
+        week: Week number
+        seed: Random seed
+        with_predictions: Also add the model output columns (target_probability,
+            catch_probability, yards_if_caught, expected_yards) for receivers
+
+    Returns:
+        Tuple of (input_df, output_df, supplementary_df), sorted like the real files
+    """
+    rng = np.random.default_rng(seed)
+    n_players = offense + defense
+
+    # Per-play values
+    play_idx = np.arange(n_plays)
+    game_idx = play_idx // PLAYS_PER_GAME
+    # YYYYMMDDNN-style ids, a week (7 days) apart per week, so weeks of a season
+    # never share a game_id in the merged supplementary file
+    game_ids = season * 1000000 + 90700 + (week - 1) * 700 + game_idx
+    play_ids = 50 + (play_idx % PLAYS_PER_GAME) * 25
+    n_frames = rng.integers(frames[0], frames[1] + 1, n_plays)
+    n_output = rng.integers(output_frames[0], output_frames[1] + 1, n_plays)
+    direction = np.where(rng.random(n_plays) < 0.5, 'left', 'right')
+    line_of_scrimmage = rng.uniform(15, 105, n_plays).round(0)
+    sign = np.where(direction == 'right', 1.0, -1.0)
+    ball_land_x = np.clip(line_of_scrimmage + sign * rng.uniform(-2, 35, n_plays), 1, 119)
+    ball_land_y = rng.uniform(3, 50, n_plays)
+    targeted_slot = rng.integers(1, offense, n_plays)
+
+    # Per-player slot values
+    slots = np.arange(n_players)
+    is_offense = slots < offense
+    positions = np.array(
+        ['QB'] + [OFFENSE_POSITIONS[i % len(OFFENSE_POSITIONS)] for i in range(offense - 1)] +
+        [DEFENSE_POSITIONS[i % len(DEFENSE_POSITIONS)] for i in range(defense)],
+        dtype=object
+    )
+    sides = np.where(is_offense, 'Offense', 'Defense').astype(object)
+
+    # Player-play grid (n_plays x n_players), flattened in (play, slot) order
+    pp_play = np.repeat(play_idx, n_players)
+    pp_slot = np.tile(slots, n_plays)
+    pp_frames = n_frames[pp_play]
+    pp_nfl_id = 40000 + game_idx[pp_play] * 100 + pp_slot
+    start_x = line_of_scrimmage[pp_play] + rng.normal(0, 6, len(pp_play)) - sign[pp_play] * 3 * is_offense[pp_slot]
+    start_y = rng.uniform(5, 48, len(pp_play))
+    vx = sign[pp_play] * rng.uniform(0.0, 0.9, len(pp_play))
+    vy = rng.normal(0, 0.25, len(pp_play))
+    pp_targeted = pp_slot == targeted_slot[pp_play]
+    pp_role = np.where(
+        pp_slot == 0, 'Passer',
+        np.where(pp_targeted, 'Targeted Receiver',
+                 np.where(is_offense[pp_slot], 'Other Route Runner', 'Defensive Coverage'))
+    ).astype(object)
+    pp_to_predict = pp_targeted | ~is_offense[pp_slot]
+
+    # Input rows: each player-play block of its play's frames
+    row_pp = np.repeat(np.arange(len(pp_play)), pp_frames)
+    block_start = np.repeat(np.cumsum(pp_frames) - pp_frames, pp_frames)
+    frame_id = np.arange(len(row_pp)) - block_start + 1
+    steps = frame_id - 1
+    wiggle = 0.15 * np.sin(steps / 3.0 + row_pp)
+    x = np.clip(start_x[row_pp] + vx[row_pp] * steps, 0, 120)
+    y = np.clip(start_y[row_pp] + vy[row_pp] * steps + wiggle, 0, 53.3)
+    speed = np.hypot(vx, vy)[row_pp] * 10 + rng.normal(0, 0.2, len(row_pp))
+    direction_deg = _degrees(vx[row_pp], vy[row_pp])
+    row_play = pp_play[row_pp]
+    row_slot = pp_slot[row_pp]
+
+    input_df = pd.DataFrame({
+        'game_id': game_ids[row_play],
+        'play_id': play_ids[row_play],
+        'player_to_predict': pp_to_predict[row_pp],
+        'nfl_id': pp_nfl_id[row_pp],
+        'frame_id': frame_id,
+        'play_direction': direction[row_play],
+        'absolute_yardline_number': line_of_scrimmage[row_play],
+        'player_name': np.char.add('Player ', pp_nfl_id[row_pp].astype(str)),
+        'player_height': '6-1',
+        'player_weight': 200 + (row_slot * 7) % 60,
+        'player_birth_date': '1996-01-01',
+        'player_position': positions[row_slot],
+        'player_side': sides[row_slot],
+        'player_role': pp_role[row_pp],
+        'x': x.round(2),
+        'y': y.round(2),
+        's': np.abs(speed).round(2),
+        'a': rng.uniform(0, 4, len(row_pp)).round(2),
+        'dir': direction_deg.round(2),
+        'o': ((direction_deg + rng.normal(0, 20, len(row_pp))) % 360).round(2),
+        'num_frames_output': n_output[row_play],
+        'ball_land_x': ball_land_x[row_play].round(2),
+        'ball_land_y': ball_land_y[row_play].round(2)
+    })
+
+    if with_predictions:
+        receiver = is_offense[row_slot] & (row_slot > 0)
+        n = len(row_pp)
+        target_probability = np.where(receiver, rng.beta(2, 5, n), np.nan)
+        catch_probability = np.where(receiver, rng.beta(5, 3, n), np.nan)
+        yards_if_caught = np.where(receiver, rng.gamma(2.0, 4.0, n), np.nan)
+        input_df['target_probability'] = target_probability
+        input_df['catch_probability'] = catch_probability
+        input_df['yards_if_caught'] = yards_if_caught
+        input_df['expected_yards'] = catch_probability * yards_if_caught
+
+    # Output rows: players to predict keep moving for the play's output frames
+    out_pp = np.flatnonzero(pp_to_predict)
+    out_counts = n_output[pp_play[out_pp]]
+    out_row_pp = np.repeat(out_pp, out_counts)
+    out_start = np.repeat(np.cumsum(out_counts) - out_counts, out_counts)
+    out_frame = np.arange(len(out_row_pp)) - out_start + 1
+    last_steps = pp_frames[out_row_pp] - 1 + out_frame
+    output_df = pd.DataFrame({
+        'game_id': game_ids[pp_play[out_row_pp]],
+        'play_id': play_ids[pp_play[out_row_pp]],
+        'nfl_id': pp_nfl_id[out_row_pp],
+        'frame_id': out_frame,
+        'x': np.clip(start_x[out_row_pp] + vx[out_row_pp] * last_steps, 0, 120).round(2),
+        'y': np.clip(start_y[out_row_pp] + vy[out_row_pp] * last_steps, 0, 53.3).round(2)
+    })
+
+    supplementary_df = generate_supplementary(game_ids, play_ids, direction, line_of_scrimmage,
+                                              season=season, week=week, rng=rng)
+    return input_df, output_df, supplementary_df
+
+def generate_supplementary(game_ids, play_ids, direction, line_of_scrimmage, season=2023, week=1,
+                           rng=None):
+    """
+    Play-level supplementary rows consistent with the generated tracking.
+
+    Returns:
+        DataFrame with the supplementary_data.csv columns
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    n = len(game_ids)
+    game_idx = game_ids - game_ids.min()
+    home = np.array(TEAMS, dtype=object)[(game_idx * 2) % len(TEAMS)]
+    visitor = np.array(TEAMS, dtype=object)[(game_idx * 2 + 1) % len(TEAMS)]
+    home_has_ball = rng.random(n) < 0.5
+    possession = np.where(home_has_ball, home, visitor)
+    defense = np.where(home_has_ball, visitor, home)
+
+    # Yards to the defense's goal line from the line of scrimmage
+    to_goal = np.where(direction == 'right', 110 - line_of_scrimmage, line_of_scrimmage - 10)
+    to_goal = np.clip(to_goal, 1, 99)
+    yardline_number = np.where(to_goal <= 50, to_goal, 100 - to_goal).astype(int)
+    yardline_side = np.where(to_goal < 50, defense, np.where(to_goal > 50, possession, None))
+
+    pass_result = rng.choice(['C', 'I', 'IN', 'S', 'R'], n, p=[0.62, 0.3, 0.03, 0.04, 0.01])
+    yards_gained = np.where(pass_result == 'C', rng.integers(0, 25, n), 0)
+    quarter = rng.integers(1, 5, n)
+    clock_seconds = rng.integers(0, 900, n)
+    game_clock = [f'{s // 60:02d}:{s % 60:02d}' for s in clock_seconds.tolist()]
+
+    return pd.DataFrame({
+        'game_id': game_ids,
+        'season': season,
+        'week': week,
+        'game_date': '09/07/2023',
+        'game_time_eastern': '20:20:00',
+        'home_team_abbr': home,
+        'visitor_team_abbr': visitor,
+        'play_id': play_ids,
+        'play_description': [f'({c}) Q.Back pass short right to R.Receiver for {y} yards'
+                             for c, y in zip(game_clock, yards_gained.tolist())],
+        'quarter': quarter,
+        'game_clock': game_clock,
+        'down': rng.integers(1, 5, n),
+        'yards_to_go': rng.integers(1, 16, n),
+        'possession_team': possession,
+        'defensive_team': defense,
+        'yardline_side': yardline_side,
+        'yardline_number': yardline_number,
+        'pre_snap_home_score': rng.integers(0, 35, n),
+        'pre_snap_visitor_score': rng.integers(0, 35, n),
+        'pass_result': pass_result,
+        'pass_length': rng.uniform(-3, 40, n).round(1),
+        'offense_formation': rng.choice(['SHOTGUN', 'EMPTY', 'SINGLEBACK', 'PISTOL', 'I_FORM'], n),
+        'receiver_alignment': rng.choice(['2x2', '3x1', '2x1', '3x2'], n),
+        'route_of_targeted_receiver': rng.choice(['HITCH', 'OUT', 'GO', 'SLANT', 'CROSS', 'IN'], n),
+        'play_action': rng.random(n) < 0.25,
+        'dropback_type': rng.choice(['TRADITIONAL', 'SCRAMBLE', 'DESIGNED_ROLLOUT_RIGHT'], n),
+        'dropback_distance': rng.uniform(0, 9, n).round(2),
+        'pass_location_type': rng.choice(['INSIDE_BOX', 'OUTSIDE_RIGHT', 'OUTSIDE_LEFT'], n),
+        'defenders_in_the_box': rng.integers(4, 9, n),
+        'team_coverage_man_zone': rng.choice(['ZONE_COVERAGE', 'MAN_COVERAGE'], n),
+        'team_coverage_type': rng.choice(['COVER_1_MAN', 'COVER_2_ZONE', 'COVER_3_ZONE',
+                                          'COVER_4_ZONE', 'QUARTERS', 'COVER_0_MAN'], n),
+        'penalty_yards': np.nan,
+        'pre_penalty_yards_gained': yards_gained,
+        'yards_gained': yards_gained,
+        'expected_points': rng.normal(1.5, 1.5, n).round(3),
+        'expected_points_added': rng.normal(0, 1.2, n).round(3),
+        'home_team_win_probability_added': rng.normal(0, 0.02, n).round(4),
+        'visitor_team_win_probility_added': rng.normal(0, 0.02, n).round(4)
+    })
+
+def write_synthetic_dataset(out_dir='.', season=2023, week=1, **kwargs):
+    """
+    Generate a dataset and write it with the real file layout under out_dir:
+    train/input_{season}_w{week}.csv, train/output_{season}_w{week}.csv and
+    supplementary_data.csv. The supplementary file is shared by all weeks, so the new
+    plays are merged into an existing one (replacing rows with the same game_id and
+    play_id) rather than overwriting it.
+
+    Args:
+        out_dir: Root directory for the files
+        season: Season year
+        week: Week number
+        **kwargs: Passed to generate_tracking
+
+    Returns:
+        Dict of written paths (input, output, supplementary) and row counts
+    """
+    input_df, output_df, supplementary_df = generate_tracking(season=season, week=week, **kwargs)
+    paths = {
+        'input': os.path.join(out_dir, INPUT_FILE_PATTERN.format(season=season, week=week)),
+        'output': os.path.join(out_dir, OUTPUT_FILE_PATTERN.format(season=season, week=week)),
+        'supplementary': os.path.join(out_dir, SUPPLEMENTARY_FILE)
+    }
+    os.makedirs(os.path.dirname(paths['input']), exist_ok=True)
+    input_df.to_csv(paths['input'], index=False)
+    output_df.to_csv(paths['output'], index=False)
+    written_df = supplementary_df
+    if os.path.exists(paths['supplementary']):
+        existing_df = pd.read_csv(paths['supplementary'], low_memory=False)
+        written_df = (
+            pd.concat([existing_df, supplementary_df], ignore_index=True)
+            .drop_duplicates(['game_id', 'play_id'], keep='last')
+            .sort_values(['game_id', 'play_id'])
+        )
+    written_df.to_csv(paths['supplementary'], index=False)
+
+    print(f"Wrote {len(input_df):,} input rows, {len(output_df):,} output rows and "
+          f"{len(supplementary_df):,} plays to {out_dir} "
+          f"({len(written_df):,} plays in {SUPPLEMENTARY_FILE})")
+    return {**paths, 'input_rows': len(input_df), 'output_rows': len(output_df),
+            'plays': len(supplementary_df)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic tracking dataset.')
+    parser.add_argument('out_dir', nargs='?', default='synthetic')
+    parser.add_argument('--plays', type=int, default=200)
+    parser.add_argument('--min-frames', type=int, default=15)
+    parser.add_argument('--max-frames', type=int, default=40)
+    parser.add_argument('--offense', type=int, default=6)
+    parser.add_argument('--defense', type=int, default=5)
+    parser.add_argument('--season', type=int, default=2023)
+    parser.add_argument('--week', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--with-predictions', action='store_true')
+    args = parser.parse_args()
+
+    write_synthetic_dataset(
+        args.out_dir, season=args.season, week=args.week, n_plays=args.plays,
+        frames=(args.min_frames, args.max_frames), offense=args.offense,
+        defense=args.defense, seed=args.seed, with_predictions=args.with_predictions
+    )
@@ -1,16 +1,14 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import (
-    roc_auc_score, log_loss, precision_recall_curve, 
-    average_precision_score, classification_report, confusion_matrix
-)
-from sklearn.preprocessing import LabelEncoder
-import xgboost as xgb
 import pickle
+from data_loader import load_csv, SUPPLEMENTARY_MODEL_COLUMNS
+from instrumentation import timed, stage
 import warnings
 warnings.filterwarnings('ignore')
 
+# sklearn and xgboost are imported inside the functions that use them, so loading and
+# feature engineering work without them and the CLI starts quickly.
+
 def load_and_prepare_data(separation_file='train/input_with_separation.csv', 
                           supplementary_file='supplementary_data.csv'):
     """
@@ -18,19 +16,19 @@ def load_and_prepare_data(separation_file='train/input_with_separation.csv',
     """
     print("Loading data...")
     
-    # Load separation features data
+    # Load separation features data (one file or a list of weekly files)
     print("  Loading separation features data...")
-    df = pd.read_csv(separation_file, low_memory=False)
+    files = [separation_file] if isinstance(separation_file, str) else list(separation_file)
+    df = pd.concat([pd.read_csv(path, low_memory=False) for path in files], ignore_index=True)
     
     # Load supplementary data
     print("  Loading supplementary data...")
-    supp_df = pd.read_csv(supplementary_file, low_memory=False)
+    supp_df = load_csv(supplementary_file, columns=SUPPLEMENTARY_MODEL_COLUMNS)
     
     # Merge on game_id and play_id
     print("  Merging data...")
     df = df.merge(
-        supp_df[['game_id', 'play_id', 'pass_result', 'team_coverage_type', 
-                 'offense_formation', 'down', 'yards_to_go', 'yardline_number']],
+        supp_df,
         on=['game_id', 'play_id'],
         how='left'
     )
@@ -139,6 +137,8 @@ def prepare_features_for_modeling(df):
     Target model uses only real-time features (no future information).
     Catch model can use future features since we know the throw happened.
     """
+    from sklearn.preprocessing import LabelEncoder
+
     print("\nPreparing features for modeling...")
     
     # Real-time features (available before throw) - for target prediction
@@ -266,6 +266,10 @@ def train_target_model(X, y, feature_names, play_info, test_size=0.2, random_sta
     print("\n" + "="*60)
     print("Training Target Prediction Model")
     print("="*60)
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import (roc_auc_score, log_loss, average_precision_score,
+                                 precision_recall_curve)
+    import xgboost as xgb
     
     # Split by play to avoid data leakage
     unique_plays = play_info[['game_id', 'play_id']].drop_duplicates()
@@ -350,6 +354,10 @@ def train_catch_model(X, y, feature_names, play_info, test_size=0.2, random_stat
     print("\n" + "="*60)
     print("Training Catch Probability Model")
     print("="*60)
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import (roc_auc_score, log_loss, average_precision_score,
+                                 classification_report)
+    import xgboost as xgb
     
     # Split by play to avoid data leakage
     unique_plays = play_info[['game_id', 'play_id']].drop_duplicates()
@@ -434,41 +442,47 @@ def save_model(model, filename, feature_names, label_encoders=None):
         pickle.dump(model_data, f)
     print(f"\nModel saved to {filename}")
 
-def main():
+@timed('train')
+def main(separation_file='train/input_with_separation.csv',
+         supplementary_file='supplementary_data.csv', model_dir='models'):
     print("="*60)
     print("Catch Probability Model Training")
     print("="*60)
     
     # Load and prepare data
-    df = load_and_prepare_data()
-    
-    # Create target variables
-    df = create_target_variable(df)
+    with stage('load') as s:
+        df = load_and_prepare_data(separation_file, supplementary_file)
+        s['rows'] = len(df)
     
-    # Engineer features
-    df_receivers = engineer_features(df)
+    # Create target variables and engineer features
+    with stage('features', rows=len(df)):
+        df = create_target_variable(df)
+        df_receivers = engineer_features(df)
     
     # Prepare features for modeling
-    X_target, y_target, X_catch, y_catch, target_feature_names, catch_feature_names, label_encoders, df_final, play_info_target, play_info_catch = prepare_features_for_modeling(df_receivers)
+    with stage('prepare', rows=len(df_receivers)):
+        X_target, y_target, X_catch, y_catch, target_feature_names, catch_feature_names, label_encoders, df_final, play_info_target, play_info_catch = prepare_features_for_modeling(df_receivers)
     
     # Train target prediction model (real-time features only)
-    target_model, X_test_target, y_test_target, y_pred_target = train_target_model(
-        X_target, y_target, target_feature_names, play_info_target
-    )
-    save_model(target_model, 'models/target_prediction_model.pkl', target_feature_names, label_encoders)
+    with stage('train_target', rows=len(X_target)):
+        target_model, X_test_target, y_test_target, y_pred_target = train_target_model(
+            X_target, y_target, target_feature_names, play_info_target
+        )
+    save_model(target_model, f'{model_dir}/target_prediction_model.pkl', target_feature_names, label_encoders)
     
     # Train catch probability model (includes future features)
-    catch_model, X_test_catch, y_test_catch, y_pred_catch = train_catch_model(
-        X_catch, y_catch, catch_feature_names, play_info_catch
-    )
-    save_model(catch_model, 'models/catch_probability_model.pkl', catch_feature_names, label_encoders)
+    with stage('train_catch', rows=len(X_catch)):
+        catch_model, X_test_catch, y_test_catch, y_pred_catch = train_catch_model(
+            X_catch, y_catch, catch_feature_names, play_info_catch
+        )
+    save_model(catch_model, f'{model_dir}/catch_probability_model.pkl', catch_feature_names, label_encoders)
     
     print("\n" + "="*60)
     print("Training Complete!")
     print("="*60)
     print("\nModels saved:")
-    print("  - models/target_prediction_model.pkl")
-    print("  - models/catch_probability_model.pkl")
+    print(f"  - {model_dir}/target_prediction_model.pkl")
+    print(f"  - {model_dir}/catch_probability_model.pkl")
 
 if __name__ == '__main__':
     import os
@@ -47,6 +47,89 @@ const vizTeamColors = {
     'WAS': '#5A1414' // Commanders - Burgundy
 };
 
+// Per-frame fields stored as arrays in columnar play files
+const VIZ_FRAME_FIELDS = ['x', 'y', 's', 'a', 'dir', 'o',
+    'catch_probability', 'target_probability', 'yards_if_caught', 'expected_yards'];
+
+// Expand a columnar play file (format_version 2+) into the per-frame layout used below.
+// Precomputed paths and ball flight (format_version 3+; post-throw paths from 4) are kept
+// for direct lookups.
+function vizExpandColumnarPlay(data) {
+    if (!data || data.layout !== 'columnar') {
+        return data;
+    }
+
+    const expandFrames = (player) => {
+        const frames = new Array(player.frame_count);
+        for (let i = 0; i < player.frame_count; i++) {
+            const frame = { frame_id: player.frame_ids ? player.frame_ids[i] : player.frame_base + i };
+            VIZ_FRAME_FIELDS.forEach(field => {
+                const values = player[field];
+                if (values && values[i] !== null && values[i] !== undefined) {
+                    frame[field] = values[i];
+                }
+            });
+            frames[i] = frame;
+        }
+        return player.frame_step ? fillDecimatedFrames(frames) : frames;
+    };
+
+    // Decimated players (frame_step) keep every n-th frame: interpolate the rest linearly,
+    // taking the shorter way around for angles
+    const fillDecimatedFrames = (frames) => {
+        const filled = [];
+        frames.forEach((a, k) => {
+            filled.push(a);
+            const b = frames[k + 1];
+            if (!b) return;
+            for (let f = a.frame_id + 1; f < b.frame_id; f++) {
+                const t = (f - a.frame_id) / (b.frame_id - a.frame_id);
+                const frame = { frame_id: f };
+                VIZ_FRAME_FIELDS.forEach(field => {
+                    if (a[field] === undefined) return;
+                    if (b[field] === undefined) {
+                        frame[field] = a[field];
+                    } else if (field === 'dir' || field === 'o') {
+                        const delta = ((b[field] - a[field]) % 360 + 540) % 360 - 180;
+                        frame[field] = (a[field] + delta * t + 360) % 360;
+                    } else {
+                        frame[field] = a[field] + (b[field] - a[field]) * t;
+                    }
+                });
+                filled.push(frame);
+            }
+        });
+        return filled;
+    };
+
+    const players = {};
+    Object.entries(data.players || {}).forEach(([nflId, player]) => {
+        players[nflId] = {
+            name: player.name,
+            position: player.position,
+            side: player.side,
+            frames: expandFrames(player),
+            num_frames_output: player.num_frames_output,
+            path: player.path
+        };
+    });
+
+    const outputPlayers = {};
+    Object.entries(data.output_players || {}).forEach(([nflId, player]) => {
+        outputPlayers[nflId] = { frames: expandFrames(player) };
+    });
+
+    return Object.assign({}, data, { players: players, output_players: outputPlayers });
+}
+
+// Input frame with the given frame_id (frames are usually contiguous, so try by offset first)
+function vizInputFrameAt(player, frameId) {
+    if (player.frames.length === 0) return undefined;
+    const guess = player.frames[frameId - player.frames[0].frame_id];
+    if (guess && guess.frame_id === frameId) return guess;
+    return player.frames.find(f => f.frame_id === frameId);
+}
+
 // Function to initialize visualization with data
 function vizInitializePlayVisualization(data) {
     console.log('[Sandbox] Initializing play visualization');
@@ -65,6 +148,7 @@ function vizInitializePlayVisualization(data) {
     }
     
     console.log('[Sandbox] Play data received:', data.game_id, data.play_id);
+    data = vizExpandColumnarPlay(data);
     vizPlayData = data;
     
     // Calculate total frames: input frames + output frames
@@ -78,7 +162,9 @@ function vizInitializePlayVisualization(data) {
         });
     }
     // Total frames = input frames (max_frame) + output frames
-    vizPlayData.total_frames = vizPlayData.max_frame + maxOutputFrame;
+    if (!vizPlayData.total_frames) {
+        vizPlayData.total_frames = vizPlayData.max_frame + maxOutputFrame;
+    }
     console.log('[Sandbox] Total frames:', vizPlayData.total_frames);
     
     // Update slider max - scope to Section 11
@@ -130,6 +216,11 @@ function vizInitializePlayVisualization(data) {
     }
 }
 
+// Play file URL, versioned by content hash when the manifest provides one
+function vizPlayUrl(entry) {
+    return entry.sha256 ? `${entry.filename}?v=${entry.sha256.slice(0, 12)}` : entry.filename;
+}
+
 // Load the data - try to load from manifest first, otherwise use default play_data.json
 async function loadSandboxPlay() {
     console.log('[Sandbox] ===== loadSandboxPlay() CALLED =====');
@@ -160,7 +251,7 @@ async function loadSandboxPlay() {
         const randomPlay = playsManifest[Math.floor(Math.random() * playsManifest.length)];
         console.log('[Sandbox] Selected play:', randomPlay.filename);
         
-        const data = await d3.json(randomPlay.filename);
+        const data = await d3.json(vizPlayUrl(randomPlay));
         if (!data) {
             throw new Error('Failed to load play data');
         }
@@ -959,6 +1050,16 @@ function vizUpdatePlayDescription() {
 
 // Calculate ball position along parabolic trajectory
 function vizCalculateBallPosition(frame) {
+    // Precomputed flight (columnar files): one entry per frame
+    if (vizPlayData.ball) {
+        const i = Math.min(Math.max(frame, 1), vizPlayData.ball.x.length) - 1;
+        return {
+            x: vizPlayData.ball.x[i],
+            y: vizPlayData.ball.y[i],
+            visible: frame >= vizPlayData.ball.visible_from
+        };
+    }
+
     if (frame < vizPlayData.throw_frame) {
         // Ball hasn't been thrown yet
         return {
@@ -1335,8 +1436,25 @@ function vizUpdateVisualization() {
     
     // Draw players at current frame
     Object.entries(vizPlayData.players).forEach(([nflId, player]) => {
-        let frame = player.frames.find(f => f.frame_id === vizCurrentFrame);
+        let frame = null;
         let isOutputPlayer = false;
+        if (player.path) {
+            // Precomputed path (columnar files): input frames up to path.start, then the
+            // output or held position by index (version 3 paths start at frame 1)
+            const i = vizCurrentFrame - (player.path.start || 1);
+            if (i < 0) {
+                frame = vizInputFrameAt(player, vizCurrentFrame);
+                if (!frame) return;
+            } else {
+                if (player.path.x[i] === null || player.path.x[i] === undefined) return;
+                isOutputPlayer = player.path.output[i] === 1;
+                frame = isOutputPlayer
+                    ? { x: player.path.x[i], y: player.path.y[i], dir: 0, s: 0 }
+                    : vizInputFrameAt(player, vizCurrentFrame) || player.frames[player.frames.length - 1];
+            }
+        } else {
+            frame = player.frames.find(f => f.frame_id === vizCurrentFrame);
+        }
         
         // If player not in current input frame and we're past throw_frame,
         // check if they're in output data
@@ -1594,7 +1712,7 @@ async function vizRandomizePlay() {
         btn.disabled = true;
         
         // Load the selected play's JSON file
-        const data = await d3.json(randomPlay.filename);
+        const data = await d3.json(vizPlayUrl(randomPlay));
         if (!data) {
             throw new Error('Failed to load play data');
         }